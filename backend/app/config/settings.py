@@ -12,6 +12,19 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 CHAT_MODEL = os.getenv("CHAT_MODEL")  # expected to be a full model resource like 'models/text-bison-001' or 'models/gemini-1.0'
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
 
+# === GEMINI CLIENT ===
+# One pooled keep-alive HTTP client per process. Requests time out after GEMINI_TIMEOUT_SECONDS
+# (GEMINI_CONNECT_TIMEOUT_SECONDS to connect), are retried up to GEMINI_MAX_RETRIES times on
+# 429/5xx and network errors with jittered exponential backoff from GEMINI_BACKOFF_SECONDS, and
+# at most GEMINI_MAX_CONCURRENCY are in flight at once.
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "15"))
+GEMINI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_CONNECT_TIMEOUT_SECONDS", "5"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_BACKOFF_SECONDS = float(os.getenv("GEMINI_BACKOFF_SECONDS", "0.5"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "16"))
+
 # === PATH CONFIGURATIONS ===
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
 
@@ -20,6 +33,143 @@ RAW_PPT_DIR = os.path.join(DATA_DIR, "raw_ppt")
 EXTRACTED_TEXT_DIR = os.path.join(DATA_DIR, "extracted_texts")
 EMBEDDINGS_DIR = os.path.join(DATA_DIR, "embeddings")
 
+# === VECTOR INDEX CONFIG ===
+# FAISS index type: flat | ivf_flat | hnsw | ivf_pq | sq8 | sq_fp16
+# (sq8 / sq_fp16 keep 1 / 2 bytes per dimension of the L2-normalized vectors, scored by inner product)
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+# IVF: number of centroids (0 = about 4*sqrt(corpus size)) and lists probed per query
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# HNSW: graph degree and search/construction beam widths
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+# IVF-PQ: sub-quantizers (must divide the embedding dimension) and bits per code
+PQ_M = int(os.getenv("PQ_M", "48"))
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+# Compressed types (ivf_pq, sq8, sq_fp16) fetch this many candidates and re-score them exactly
+# from the float32 vectors on disk (0 = rank by the compressed codes alone)
+INDEX_RERANK_CANDIDATES = int(os.getenv("INDEX_RERANK_CANDIDATES", "50"))
+# Trained indexes fall back to flat below this many vectors, and retrain once the
+# corpus grows past INDEX_RETRAIN_FACTOR times the size they were trained on
+INDEX_MIN_TRAIN_SIZE = int(os.getenv("INDEX_MIN_TRAIN_SIZE", "5000"))
+INDEX_RETRAIN_FACTOR = float(os.getenv("INDEX_RETRAIN_FACTOR", "4.0"))
+# Open the FAISS index memory-mapped and read-only, so uvicorn workers share its pages
+INDEX_MMAP = os.getenv("INDEX_MMAP", "false").lower() in ("1", "true", "yes")
+# How often a worker checks the index generation file for writes by other workers (0 disables)
+INDEX_RELOAD_INTERVAL_SECONDS = float(os.getenv("INDEX_RELOAD_INTERVAL_SECONDS", "1"))
+
+# Split the index into this many shards (decks routed by name hash), searched in parallel.
+# Raising it above 1 moves an existing single index into the shards on startup.
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))
+
+# Upload-time embedding cache (entries of ~1.5 KB each for MiniLM; 0 disables the cache)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+# Index commits rewrite the cache file only once this many new entries are unsaved; the rest
+# is written on shutdown
+EMBEDDING_CACHE_SAVE_EVERY = int(os.getenv("EMBEDDING_CACHE_SAVE_EVERY", "2000"))
+
+# Query micro-batching: concurrent chat queries arriving within the wait window are
+# encoded and searched together, up to the max batch size
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+# Chat retrieval: dense (FAISS), lexical (BM25) or hybrid (both, fused with reciprocal rank fusion).
+# Hybrid takes HYBRID_CANDIDATES hits from each side; a hit ranked r scores weight / (RRF_K + r).
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+# Per-stage latency budgets reported with each chat response (stages over budget are logged)
+DENSE_BUDGET_MS = float(os.getenv("DENSE_BUDGET_MS", "50"))
+LEXICAL_BUDGET_MS = float(os.getenv("LEXICAL_BUDGET_MS", "20"))
+FUSION_BUDGET_MS = float(os.getenv("FUSION_BUDGET_MS", "2"))
+
+# === WORKER POOLS ===
+# CPU-heavy work runs on bounded thread pools; once workers plus queue slots are taken,
+# requests get 503 with Retry-After instead of piling up
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "8"))
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "4"))
+QUERY_QUEUE_MAX = int(os.getenv("QUERY_QUEUE_MAX", "256"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "2"))
+
+# === UPLOADS ===
+# Uploads are streamed to disk in fixed-size chunks and rejected once they exceed the limit
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024")) * 1024
+
+# === EXTRACTION ===
+# Processes used by batch extraction over RAW_PPT_DIR (0 = one per CPU)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "0"))
+
+# === CHUNKING ===
+# Chunks are packed from whole slides and shapes up to a target size in estimated tokens
+# (words and punctuation; MiniLM truncates at 256 word pieces). Chunks cut mid-slide repeat
+# the last CHUNK_OVERLAP_TOKENS of the previous chunk.
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "128"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "24"))
+
+# === EMBEDDINGS FILES ===
+# vector_store encodes the chunks of every pending extracted text in one pass, EMBED_BATCH_SIZE
+# chunks per model call, and saves them as <deck>_embeddings.npy (float16) plus a JSON manifest
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# === METRICS ===
+# Per-process stage latency histograms, counters and gauges at GET /metrics (Prometheus text
+# format). SERVER_TIMING adds the stages timed while handling a request to its Server-Timing
+# header. PROFILER_ENABLED allows GET /metrics/profile, which samples every thread's stack
+# every PROFILER_INTERVAL_MS for up to PROFILER_MAX_SECONDS and returns folded stacks.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
+
+# === RERANKING ===
+# Optional second stage for chat retrieval: RERANK_CANDIDATES retrieved chunks are scored against
+# the question by a local cross-encoder, RERANK_BATCH_SIZE pairs at a time, until RERANK_BUDGET_MS
+# runs out (0 = no limit); candidates left unscored keep their retrieval order. Scores are cached
+# per (question, chunk) in an LRU of RERANK_CACHE_ENTRIES.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", "20000"))
+
+# === CONTEXT BUILDER ===
+# The Gemini prompt is assembled from the top CONTEXT_TOP_K retrieved chunks: near-duplicates
+# (estimated word-shingle Jaccard >= CONTEXT_DEDUP_THRESHOLD) are dropped, the rest are packed
+# best-first into CONTEXT_TOKEN_BUDGET estimated tokens and cited in slide order
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.7"))
+
+# === LEXICAL SEARCH ===
+# BM25 inverted index over the sentences of every embeddings file, updated at ingest time
+LEXICAL_INDEX_PATH = os.path.join(EMBEDDINGS_DIR, "lexical")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# === INGESTION JOBS ===
+# Uploads are queued in a local SQLite database and processed by INGEST_WORKERS threads
+INGESTION_DB_PATH = os.path.join(DATA_DIR, "ingestion_jobs.sqlite3")
+# A running job whose worker has not sent a heartbeat for this long is requeued
+# (heartbeats are sent every third of it)
+INGEST_JOB_STALE_SECONDS = float(os.getenv("INGEST_JOB_STALE_SECONDS", "30"))
+
+# === QUERY CACHE ===
+# Chat retrieval results and Gemini answers for repeated questions, keyed by normalized query,
+# scope and index generation (an upload changes the generation, so stale entries are never served).
+# Backend: memory (per process), sqlite (shared by the workers on one host) or none.
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory").lower()
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "10000"))
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+QUERY_CACHE_DB_PATH = os.path.join(DATA_DIR, "query_cache.sqlite3")
+
 # === SERVER CONFIG ===
 APP_NAME = "RAG PPT Chatbot"
 HOST = "0.0.0.0"
@@ -1,20 +1,129 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from app.routes.upload_routes import router as upload_router
 from app.routes.chat_routes import router as chat_router
+from app.routes.metrics_routes import router as metrics_router
+from app.services.sharded_retriever import create_retriever
+from app.services.query_batcher import QueryBatcher
+from app.services.query_cache import get_query_cache
+from app.services.reranker import Reranker
+from app.services.embeddings_catalog import get_embeddings_catalog
+from app.services.gemini_client import get_gemini_client, close_gemini_client
+from app.services.worker_pool import WorkerPool, WorkerPoolFull
+from app.services.ingestion_jobs import JobStore, IngestionQueue, run_ppt_pipeline
+from app.config.settings import (
+    INGEST_WORKERS, INGEST_QUEUE_MAX, QUERY_WORKERS, QUERY_QUEUE_MAX, MAX_UPLOAD_SIZE_MB, RERANK_ENABLED, SERVER_TIMING
+)
+from app.utils.logger import logger
+from app.utils.metrics import registry, server_timing, start_server_timing
 import os
+import time
+import functools
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and FAISS index once per process; routes share it via Depends
+    app.state.retriever = create_retriever()
+    logger.info(f"{type(app.state.retriever).__name__} initialized.")
+    # Separate pools so a large upload cannot starve chat queries
+    app.state.ingest_pool = WorkerPool("ingest", INGEST_WORKERS, INGEST_QUEUE_MAX)
+    app.state.query_pool = WorkerPool("query", QUERY_WORKERS, QUERY_QUEUE_MAX)
+    app.state.query_batcher = QueryBatcher(app.state.retriever, pool=app.state.query_pool)
+    await app.state.query_batcher.start()
+    # Repeated questions are answered from the cache until an upload changes the index
+    app.state.query_cache = get_query_cache()
+    # Optional cross-encoder second stage; its model is loaded once here, like the embedding model
+    app.state.reranker = Reranker() if RERANK_ENABLED else None
+    # Generator answers re-read an embeddings file only after it changes on disk
+    app.state.embeddings_catalog = get_embeddings_catalog()
+    # One keep-alive connection pool for every Gemini call in this process
+    app.state.gemini_client = get_gemini_client()
+    # Uploads are processed in the background; jobs left over from a previous run resume
+    app.state.ingestion_queue = IngestionQueue(JobStore(), functools.partial(run_ppt_pipeline, app.state.retriever))
+    app.state.ingestion_queue.start()
+    yield
+    app.state.ingestion_queue.stop()
+    app.state.ingestion_queue.store.close()
+    app.state.ingestion_queue = None
+    await app.state.query_batcher.stop()
+    app.state.ingest_pool.shutdown()
+    app.state.query_pool.shutdown()
+    app.state.query_batcher = None
+    app.state.query_cache = None
+    app.state.reranker = None
+    app.state.embeddings_catalog = None
+    await close_gemini_client()
+    app.state.gemini_client = None
+    if hasattr(app.state.retriever, "close"):
+        app.state.retriever.close()
+    app.state.retriever = None
+
 
 # Initialize FastAPI
 app = FastAPI(
     title="RAG PPT Chatbot",
     description="Upload PPT files and chat with the content using Gemini-powered RAG pipeline.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.exception_handler(WorkerPoolFull)
+async def worker_pool_full_handler(request, exc: WorkerPoolFull):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+
+# Allowance for multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    # Refuse uploads whose declared size is over the limit before any of the body is read;
+    # stream_upload_to_disk enforces the same limit for chunked uploads without Content-Length
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length and length.isdigit():
+        if int(length) > MAX_UPLOAD_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse({"detail": f"File exceeds the {MAX_UPLOAD_SIZE_MB} MB upload limit."}, status_code=413)
+    return await call_next(request)
+
+
+def _route_label(scope) -> str:
+    # Path template of the matched route, e.g. /api/upload/upload/jobs/{job_id}, so IDs and deck
+    # names stay out of the labels (every path parameter of this app is a trailing segment)
+    if scope.get("route") is None:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        value = str(value)
+        if value and path.endswith("/" + value):
+            path = path[:-len(value)] + "{" + name + "}"
+    return path
+
+
+@app.middleware("http")
+async def record_request_timing(request, call_next):
+    # Time to the response headers (a stream's body is still being sent)
+    start = time.perf_counter()
+    token = start_server_timing() if SERVER_TIMING else None
+    try:
+        response = await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - start
+        timing = server_timing(token, elapsed * 1000) if token is not None else None
+    registry.observe("http_request_seconds", elapsed, "Time to the response headers, by route.",
+                     route=_route_label(request.scope), method=request.method, status=str(response.status_code))
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
+
 # Include API Routers
 app.include_router(upload_router, prefix="/api/upload", tags=["Upload"])
 app.include_router(chat_router, prefix="/api/chat", tags=["Chat"])
+app.include_router(metrics_router)
 
 # Serve all static files from your moved 'static' folder
 static_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../static")
@@ -1,11 +1,17 @@
 import os
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import JSONResponse
+import json
+import time
+from contextlib import aclosing
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.config.settings import EMBEDDINGS_DIR
-from app.services.generator import generate_answer
-from app.services.ppt_retriever import PPTRetriever
-from app.config.settings import GEMINI_API_KEY
-import requests
+from app.services.generator import stream_gemini_answer
+from app.services.context_builder import build_context
+from app.services.hybrid_retriever import HybridRetriever, RETRIEVAL_MODES
+from app.services.worker_pool import WorkerPoolFull
+from app.routes.dependencies import get_hybrid_retriever, get_query_cache, get_gemini, get_catalog
+from app.config.settings import CHAT_MODEL, RETRIEVAL_MODE, CONTEXT_TOP_K
+from app.services.gemini_client import GeminiClient, GeminiError
 from app.utils.logger import logger
 
 router = APIRouter(
@@ -13,97 +19,206 @@ router = APIRouter(
     tags=["chat"]
 )
 
+# Hits a retrieval-only answer (GET /api/chat/, or the stream without a Gemini key) is made of
+ANSWER_HITS = 3
+
+
+def _joined_answer(hits: list) -> str:
+    return "\n---\n".join(hit["text"] for hit in hits[:ANSWER_HITS])
+
 # Endpoint to list all available embeddings files
 @router.get("/embeddings-list", response_class=JSONResponse)
-def list_embeddings():
+def list_embeddings(request: Request):
     try:
         files = [f for f in os.listdir(EMBEDDINGS_DIR) if f.endswith("_embeddings.json")]
-        return {"embeddings": files}
+        # Decks in the FAISS index can be searched on their own too (embeddings_file=<deck>)
+        retriever = getattr(request.app.state, "retriever", None)
+        decks = sorted(retriever.list_decks()) if retriever is not None else []
+        return {"embeddings": files, "decks": decks}
     except Exception as e:
         logger.error(f"Failed to list embeddings: {e}")
         raise HTTPException(status_code=500, detail="Failed to list embeddings files.")
 
 
+@router.get("/cache-stats", response_class=JSONResponse)
+def cache_stats(cache=Depends(get_query_cache)):
+    """
+    Report query cache size and hit rate.
+
+    Returns:
+        dict: {"enabled": False} when caching is off, else QueryCache.stats().
+    """
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/catalog-stats", response_class=JSONResponse)
+def catalog_stats(catalog=Depends(get_catalog)):
+    """
+    Report how many embeddings files the generator's lexical index tracks, and how often a
+    query found them all unchanged.
+
+    Returns:
+        dict: EmbeddingsCatalog.stats().
+    """
+    return catalog.stats()
+
+
 # Endpoint to check Gemini API key and list available models
 @router.get("/gemini-models-check", response_class=JSONResponse)
-def gemini_models_check():
+async def gemini_models_check(client: GeminiClient = Depends(get_gemini)):
     """
     Check Gemini API key and list available models for this key.
     """
-    if not GEMINI_API_KEY:
+    if not client.configured:
         return JSONResponse({"ok": False, "error": "GEMINI_API_KEY not set in backend."}, status_code=400)
-    url = "https://generativelanguage.googleapis.com/v1/models"
-    params = {"key": GEMINI_API_KEY}
     try:
-        resp = requests.get(url, params=params, timeout=10)
-        if resp.status_code != 200:
-            return JSONResponse({"ok": False, "error": f"Gemini API error: {resp.status_code} {resp.text}"}, status_code=resp.status_code)
-        data = resp.json()
+        data = await client.list_models()
         models = [m.get("name", "") for m in data.get("models", [])]
         return {"ok": True, "models": models, "raw": data}
-    except Exception as e:
+    except GeminiError as e:
+        if e.status_code is not None:
+            return JSONResponse({"ok": False, "error": f"{e} {e.body}"}, status_code=e.status_code)
         logger.error(f"Gemini models check failed: {e}")
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
 
 
 @router.get("/gemini-test", response_class=JSONResponse)
-def gemini_test(model: str = None, prompt: str = "Hello"):
+async def gemini_test(model: str = None, prompt: str = "Hello", client: GeminiClient = Depends(get_gemini)):
     """
     Attempt a small Gemini generation using the provided model (or CHAT_MODEL from settings).
     Returns basic response info to help debug 404 / permission issues.
     """
-    from app.config.settings import CHAT_MODEL, GEMINI_API_KEY
-    if not GEMINI_API_KEY:
+    if not client.configured:
         return JSONResponse({"ok": False, "error": "GEMINI_API_KEY not set."}, status_code=400)
 
     model_to_try = model or CHAT_MODEL or 'models/gemini-1.0'
-    url_text = f"https://generativelanguage.googleapis.com/v1/{model_to_try}:generateText"
-    url_content = f"https://generativelanguage.googleapis.com/v1/{model_to_try}:generateContent"
-    headers = {"Content-Type": "application/json"}
-    params = {"key": GEMINI_API_KEY}
-    data = {"contents": [{"parts": [{"text": prompt}]}]}
-
     try:
-        # try generateText
-        resp = requests.post(url_text, headers=headers, params=params, json=data, timeout=12)
-        if resp.status_code == 404:
-            # try generateContent
-            resp = requests.post(url_content, headers=headers, params=params, json=data, timeout=12)
-
-        # return status and body (truncated)
-        body = None
-        try:
-            body = resp.json()
-        except Exception:
-            body = resp.text
-
-        return {"ok": resp.ok, "status_code": resp.status_code, "body": body}
-    except Exception as e:
+        # Tries the endpoint this model answered on before, then the others
+        endpoint, body = await client.generate_content(model_to_try, prompt)
+        return {"ok": True, "status_code": 200, "endpoint": endpoint, "body": body}
+    except GeminiError as e:
+        if e.status_code is not None:
+            return {"ok": False, "status_code": e.status_code, "body": e.body}
         logger.error(f"gemini_test failed: {e}")
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
 
 
+def _resolve_scope(query: str, embeddings_file: str, mode: str, retriever: HybridRetriever):
+    """Validate a chat request and return the deck it is scoped to (None for all decks)."""
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(RETRIEVAL_MODES)}.")
+    if not embeddings_file or embeddings_file == "ALL":
+        return None
+    # Scoped queries only read the chosen deck's vectors and postings
+    deck = retriever.find_deck(embeddings_file)
+    if deck is None:
+        raise HTTPException(status_code=404, detail=f"Deck not indexed: {embeddings_file}")
+    return deck
+
+
 @router.get("/")
-def chat(query: str = Query(..., description="User question"),
-         embeddings_file: str = Query(None, description="Name of embeddings JSON file (optional). Use 'ALL' to search all files")):
+async def chat(query: str = Query(..., description="User question"),
+               embeddings_file: str = Query(None, description="Deck or embeddings file to search (optional). Use 'ALL' to search all decks"),
+               mode: str = Query(RETRIEVAL_MODE, description="Retrieval mode: dense, lexical or hybrid"),
+               retriever: HybridRetriever = Depends(get_hybrid_retriever)):
     """
     Query the RAG chatbot and return a generated answer.
 
     Args:
         query (str): The question from the user.
-        embeddings_file (str): Embeddings file to search for context.
+        embeddings_file (str): Deck (or its embeddings file name) to search; None or 'ALL' searches every deck.
+        mode (str): dense (FAISS), lexical (BM25) or hybrid (both, rank-fused).
 
     Returns:
-        dict: Generated answer.
+        dict: Generated answer, the deck searched (None for all), the mode used and per-stage
+            retrieval timings against their budgets.
     """
-    if not query.strip():
-        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    deck = _resolve_scope(query, embeddings_file, mode, retriever)
     try:
-        # Use FAISS-based semantic retrieval
-        retriever = PPTRetriever()
-        top_chunks = retriever.retrieve(query, top_k=3)
-        answer = "\n---\n".join(top_chunks)
-        return {"query": query, "answer": answer}
+        # Dense search is batched with other in-flight queries; lexical search runs alongside it
+        hits, timings = await retriever.search(query, top_k=ANSWER_HITS, mode=mode, deck=deck)
+        answer = _joined_answer(hits)
+        return {"query": query, "answer": answer, "deck": deck, "mode": mode, "timings": timings}
+    except WorkerPoolFull:
+        raise
     except Exception as e:
         logger.error(f" Failed to generate answer for query '{query}': {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate answer: {e}")
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _chat_events(query: str, deck: str, mode: str, hits: list, timings: dict,
+                       client: GeminiClient, started: float):
+    """Server-sent events for one chat answer: retrieval, then token pieces, then done (or error)."""
+    built = build_context(query, hits)
+    yield _sse("retrieval", {"query": query, "deck": deck, "mode": mode, "timings": timings,
+                             "hits": [{k: hit.get(k) for k in ("text", "deck", "slides", "score", "rerank_score")} for hit in hits],
+                             "context": {k: built[k] for k in ("citations", "tokens_before", "tokens_after",
+                                                                "duplicates", "over_budget")}})
+    context = built["context"]
+    if client.configured:
+        pieces = stream_gemini_answer(query, context, client)
+    else:
+        # Without Gemini the answer is the best chunks, joined as GET /api/chat/ returns them
+        pieces = _single(_joined_answer(hits))
+    answer, first_token_ms = [], None
+    try:
+        # aclosing: a client that disconnects mid-answer must not leave the Gemini stream open
+        async with aclosing(pieces):
+            async for piece in pieces:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                answer.append(piece)
+                yield _sse("token", {"text": piece})
+    except Exception as e:
+        logger.error(f"Streaming answer for query '{query}' failed: {e}")
+        yield _sse("error", {"detail": str(e)})
+        return
+    yield _sse("done", {"answer": "".join(answer),
+                        "ttft_ms": round(first_token_ms, 2) if first_token_ms is not None else None,
+                        "total_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+
+async def _single(text: str):
+    yield text
+
+
+@router.get("/stream")
+async def chat_stream(query: str = Query(..., description="User question"),
+                      embeddings_file: str = Query(None, description="Deck or embeddings file to search (optional). Use 'ALL' to search all decks"),
+                      mode: str = Query(RETRIEVAL_MODE, description="Retrieval mode: dense, lexical or hybrid"),
+                      retriever: HybridRetriever = Depends(get_hybrid_retriever),
+                      client: GeminiClient = Depends(get_gemini)):
+    """
+    Stream a chat answer as server-sent events.
+
+    Events, in order: "retrieval" (the hits, deck, mode, timings, and the citations and prompt token
+    counts of the context built from the hits), one "token" per piece of the answer as Gemini
+    generates it, then "done" with the full answer, time to first token and total time (ms since
+    the request arrived). A failure after streaming started ends with an "error" event.
+
+    Args:
+        query (str): The question from the user.
+        embeddings_file (str): Deck (or its embeddings file name) to search; None or 'ALL' searches every deck.
+        mode (str): dense (FAISS), lexical (BM25) or hybrid (both, rank-fused).
+    """
+    started = time.perf_counter()
+    deck = _resolve_scope(query, embeddings_file, mode, retriever)
+    # Retrieval runs before the response starts, so its failures are still plain HTTP errors
+    try:
+        hits, timings = await retriever.search(query, top_k=CONTEXT_TOP_K, mode=mode, deck=deck)
+    except WorkerPoolFull:
+        raise
+    except Exception as e:
+        logger.error(f" Failed to retrieve context for query '{query}': {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate answer: {e}")
+    return StreamingResponse(_chat_events(query, deck, mode, hits, timings, client, started),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,86 @@
+from fastapi import Request, HTTPException, Depends
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.gemini_client import GeminiClient, get_gemini_client
+from app.services.embeddings_catalog import EmbeddingsCatalog, get_embeddings_catalog
+from app.services.worker_pool import WorkerPool
+from app.services.ingestion_jobs import IngestionQueue
+
+
+def get_retriever(request: Request) -> PPTRetriever:
+    """
+    Return the process-wide PPTRetriever created in the app lifespan.
+
+    Raises:
+        HTTPException: 503 if the app has not finished starting up.
+    """
+    retriever = getattr(request.app.state, "retriever", None)
+    if retriever is None:
+        raise HTTPException(status_code=503, detail="Retriever is not initialized yet.")
+    return retriever
+
+
+def get_query_batcher(request: Request) -> QueryBatcher:
+    """
+    Return the process-wide QueryBatcher that fronts the shared retriever.
+
+    Raises:
+        HTTPException: 503 if the app has not finished starting up.
+    """
+    batcher = getattr(request.app.state, "query_batcher", None)
+    if batcher is None:
+        raise HTTPException(status_code=503, detail="Query batcher is not initialized yet.")
+    return batcher
+
+
+def get_query_cache(request: Request):
+    """Return the process-wide QueryCache, or None if caching is off or the app has not started."""
+    return getattr(request.app.state, "query_cache", None)
+
+
+def get_reranker(request: Request):
+    """Return the process-wide cross-encoder Reranker, or None if reranking is off or the app has not started."""
+    return getattr(request.app.state, "reranker", None)
+
+
+def get_hybrid_retriever(batcher: QueryBatcher = Depends(get_query_batcher),
+                         cache=Depends(get_query_cache), reranker=Depends(get_reranker)) -> HybridRetriever:
+    """Wrap the shared QueryBatcher for dense, lexical or hybrid chat retrieval."""
+    return HybridRetriever(batcher, cache=cache, reranker=reranker)
+
+
+def get_gemini(request: Request) -> GeminiClient:
+    """Return the process-wide pooled Gemini client (opened on first use outside the app lifespan)."""
+    return getattr(request.app.state, "gemini_client", None) or get_gemini_client()
+
+
+def get_catalog(request: Request) -> EmbeddingsCatalog:
+    """Return the process-wide catalog of embeddings files the generator searches through."""
+    return getattr(request.app.state, "embeddings_catalog", None) or get_embeddings_catalog()
+
+
+def get_ingest_pool(request: Request) -> WorkerPool:
+    """
+    Return the bounded pool that runs PPT parsing, encoding and index writes.
+
+    Raises:
+        HTTPException: 503 if the app has not finished starting up.
+    """
+    pool = getattr(request.app.state, "ingest_pool", None)
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Ingest pool is not initialized yet.")
+    return pool
+
+
+def get_ingestion_queue(request: Request) -> IngestionQueue:
+    """
+    Return the background ingestion queue that processes uploaded decks.
+
+    Raises:
+        HTTPException: 503 if the app has not finished starting up.
+    """
+    queue = getattr(request.app.state, "ingestion_queue", None)
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Ingestion queue is not initialized yet.")
+    return queue
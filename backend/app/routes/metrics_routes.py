@@ -0,0 +1,118 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.config.settings import METRICS_ENABLED, PROFILER_ENABLED, PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS
+from app.utils.metrics import Sample, registry
+from app.utils.profiler import ProfilerBusy, folded_text, sample_stacks
+
+router = APIRouter(tags=["Metrics"])
+
+# Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _hits_and_misses(name: str, help_text: str, stats: dict, **labels) -> list:
+    return [Sample(name, "counter", help_text, {**labels, "result": "hit"}, stats.get("hits")),
+            Sample(name, "counter", help_text, {**labels, "result": "miss"}, stats.get("misses"))]
+
+
+def app_samples(state) -> list:
+    """
+    Read counters and gauges from the components in app.state (those not started yet are skipped).
+
+    Returns:
+        list: Samples for MetricsRegistry.render().
+    """
+    samples = []
+    retriever = getattr(state, "retriever", None)
+    if retriever is not None:
+        stats = retriever.stats()
+        samples += [Sample("index_chunks", "gauge", "Chunks in the FAISS index.", None, stats["num_chunks"]),
+                    Sample("index_decks", "gauge", "Decks in the FAISS index.", None, stats["num_decks"])]
+        if stats.get("embedding_cache"):
+            samples += _hits_and_misses("embedding_cache_lookups_total", "Chunk embedding cache lookups.",
+                                        stats["embedding_cache"])
+    batcher = getattr(state, "query_batcher", None)
+    if batcher is not None:
+        stats = batcher.stats()
+        samples += [Sample("query_queue_depth", "gauge", "Chat queries waiting for a batch.", None, stats["queued"]),
+                    Sample("query_batches_total", "counter", "Batched dense searches run.", None, stats["batches"])]
+    for name in ("ingest_pool", "query_pool"):
+        pool = getattr(state, name, None)
+        if pool is not None:
+            stats = pool.stats()
+            samples += [Sample("worker_pool_pending", "gauge", "Jobs queued or running per worker pool.",
+                               {"pool": stats["name"]}, stats["pending"]),
+                        Sample("worker_pool_rejected_total", "counter", "Jobs refused because a pool was full.",
+                               {"pool": stats["name"]}, stats["rejected"])]
+    ingestion = getattr(state, "ingestion_queue", None)
+    if ingestion is not None:
+        samples.append(Sample("ingest_queue_depth", "gauge", "Uploads waiting to be processed.", None,
+                              ingestion.stats()["queued"]))
+    cache = getattr(state, "query_cache", None)
+    if cache is not None:
+        stats = cache.stats()
+        samples += _hits_and_misses("query_cache_lookups_total", "Query cache lookups.", stats)
+        samples.append(Sample("query_cache_entries", "gauge", "Entries in the query cache.", None, stats["entries"]))
+    reranker = getattr(state, "reranker", None)
+    if reranker is not None:
+        stats = reranker.stats()
+        samples += [Sample("rerank_pairs_total", "counter", "Question-chunk pairs scored by the cross-encoder.",
+                           {"source": "model"}, stats["scored"]),
+                    Sample("rerank_pairs_total", "counter", "Question-chunk pairs scored by the cross-encoder.",
+                           {"source": "cache"}, stats["cache_hits"])]
+    catalog = getattr(state, "embeddings_catalog", None)
+    if catalog is not None:
+        stats = catalog.stats()
+        samples += _hits_and_misses("catalog_lookups_total", "Generator lookups that found every embeddings file unchanged.",
+                                    {"hits": stats["hits"], "misses": stats["lookups"] - stats["hits"]})
+    client = getattr(state, "gemini_client", None)
+    if client is not None:
+        stats = client.stats()
+        samples += [Sample("gemini_requests_total", "counter", "HTTP requests sent to Gemini, retries included.",
+                           None, stats["requests"]),
+                    Sample("gemini_retries_total", "counter", "Gemini requests retried after a 429/5xx or network error.",
+                           None, stats["retries"])]
+    return samples
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(request: Request):
+    """
+    Per-stage latency histograms, counters and gauges of this worker, in Prometheus text format.
+
+    Raises:
+        HTTPException: 404 if METRICS_ENABLED is off.
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(registry.render(app_samples(request.app.state)), media_type=METRICS_CONTENT_TYPE)
+
+
+@router.get("/metrics/profile")
+async def profile(seconds: float = Query(5, gt=0, description="How long to sample for"),
+                  interval_ms: float = Query(PROFILER_INTERVAL_MS, gt=0, description="Time between samples"),
+                  format: str = Query("folded", description="folded (flame graph input) or json")):
+    """
+    Sample every thread's Python stack in this worker for a few seconds (see profiler.sample_stacks).
+
+    Args:
+        seconds (float): Sampling time, capped at PROFILER_MAX_SECONDS.
+        interval_ms (float): Time between samples.
+        format (str): "folded" for one "stack count" line per stack, or "json".
+
+    Raises:
+        HTTPException: 404 if PROFILER_ENABLED is off, 400 for an unknown format, 409 if
+            another profile is running.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set PROFILER_ENABLED=true).")
+    if format not in ("folded", "json"):
+        raise HTTPException(status_code=400, detail="format must be one of: folded, json.")
+    try:
+        result = await asyncio.to_thread(sample_stacks, min(seconds, PROFILER_MAX_SECONDS), interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        return JSONResponse(result)
+    return PlainTextResponse(folded_text(result))
@@ -1,10 +1,11 @@
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from app.config.settings import RAW_PPT_DIR
-from app.services.ppt_loader import process_ppt
-from app.services.vector_store import process_text_for_embeddings
-import re
 from app.services.ppt_retriever import PPTRetriever
+from app.services.ingestion_jobs import IngestionQueue
+from app.services.worker_pool import WorkerPool, WorkerPoolFull
+from app.routes.dependencies import get_retriever, get_ingest_pool, get_ingestion_queue
+from app.utils.file_utils import stream_upload_to_disk, commit_upload, discard_upload, UploadTooLarge
 from app.utils.logger import logger
 
 router = APIRouter(
@@ -13,51 +14,138 @@ router = APIRouter(
 )
 
 
-@router.post("/ppt")
-async def upload_ppt(file: UploadFile = File(...), generate_embeddings: bool = True):
+def _discard_job_upload(ppt_path: str):
+    discard_upload(ppt_path)
+    os.rmdir(os.path.dirname(ppt_path))
+
+
+@router.post("/ppt", status_code=202)
+async def upload_ppt(request: Request, file: UploadFile = File(...), generate_embeddings: bool = True,
+                     jobs: IngestionQueue = Depends(get_ingestion_queue)):
     """
-    Upload a PPT file, extract text, and optionally generate embeddings.
+    Upload a PPT file and queue it for text extraction, chunking and indexing.
+
+    The file is streamed to RAW_PPT_DIR in fixed-size chunks (hashed and size-checked on
+    the way) and renamed to RAW_PPT_DIR/<job_id>/<filename> once complete, so a job still
+    queued for an earlier upload of the deck keeps reading its own file. Returns immediately
+    with a job ID; poll GET /jobs/{job_id} for progress. Uploading the content the deck's
+    latest job is queued, running or indexed with returns that job.
 
     Args:
         file (UploadFile): Uploaded PPTX file.
         generate_embeddings (bool): Whether to generate embeddings immediately.
 
     Returns:
-        dict: Paths of saved text and embeddings.
+        dict: Job ID, status and the saved PPT path.
     """
     # Validate file extension
     if not file.filename.lower().endswith(".pptx"):
         raise HTTPException(status_code=400, detail="Only .pptx files are allowed.")
+    # Fail fast before copying the body if the job could not be queued
+    if jobs.is_full():
+        raise WorkerPoolFull("ingestion queue")
 
-    # Save uploaded file
-    ppt_path = os.path.join(RAW_PPT_DIR, file.filename)
     try:
-        contents = await file.read()
-        with open(ppt_path, "wb") as f:
-            f.write(contents)
-        logger.info(f" Uploaded PPT: {file.filename}")
+        upload = await stream_upload_to_disk(file, RAW_PPT_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f" Failed to save uploaded PPT: {e}")
         raise HTTPException(status_code=500, detail="Failed to save PPT.")
 
-    # Extract text
-    txt_path = process_ppt(ppt_path)
-
-    # Semantic chunking and FAISS index update
-    retriever = PPTRetriever()
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text = f.read()
-    # Simple chunking: split by double newlines or every 500 chars
-    chunks = [chunk.strip() for chunk in re.split(r'\n\n+', text) if chunk.strip()]
-    if not chunks or len(chunks) < 2:
-        # fallback: fixed-size chunks
-        chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-    retriever.create_index(chunks)
+    job = jobs.store.find_duplicate(file.filename, upload["sha256"])
+    duplicate = job is not None
+    if duplicate:
+        discard_upload(upload["temp_path"])
+    else:
+        job_id = jobs.store.new_id()
+        ppt_path = os.path.join(RAW_PPT_DIR, job_id, file.filename)
+        os.makedirs(os.path.dirname(ppt_path), exist_ok=True)
+        commit_upload(upload["temp_path"], ppt_path)
+        logger.info(f" Uploaded PPT: {file.filename} ({upload['size']} bytes)")
+        try:
+            job, duplicate = jobs.submit(file.filename, ppt_path, upload["sha256"], job_id=job_id)
+        except WorkerPoolFull:
+            _discard_job_upload(ppt_path)
+            raise
+        if duplicate:
+            # Another request queued the same content in the meantime
+            _discard_job_upload(ppt_path)
 
     return {
-        "ppt_path": ppt_path,
-        "extracted_text_path": txt_path,
-        "faiss_index_path": retriever.index_path,
-        "faiss_chunks_path": retriever.chunk_path,
-        "num_chunks": len(chunks)
+        "job_id": job["id"],
+        "status": job["status"],
+        "deck": file.filename,
+        "duplicate": duplicate,
+        "ppt_path": job["ppt_path"],
+        "status_url": str(request.url_for("get_job", job_id=job["id"]))
     }
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, jobs: IngestionQueue = Depends(get_ingestion_queue)):
+    """
+    Report an ingestion job's status, current stage and per-slide progress.
+
+    Returns:
+        dict: Job record (status, stage, progress, slides_done, slides_total, result, error).
+    """
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.get("/jobs")
+def list_jobs(limit: int = 50, jobs: IngestionQueue = Depends(get_ingestion_queue)):
+    """
+    List the most recent ingestion jobs.
+
+    Returns:
+        dict: Jobs, newest first.
+    """
+    return {"jobs": jobs.store.list(limit=limit)}
+
+
+@router.get("/decks")
+def list_decks(retriever: PPTRetriever = Depends(get_retriever)):
+    """
+    List indexed decks.
+
+    Returns:
+        dict: Mapping of deck name to number of indexed chunks.
+    """
+    return {"decks": retriever.list_decks()}
+
+
+@router.get("/stats")
+def retriever_stats(retriever: PPTRetriever = Depends(get_retriever)):
+    """
+    Report index size and embedding cache hit/miss counters.
+
+    Returns:
+        dict: Retriever statistics.
+    """
+    return retriever.stats()
+
+
+@router.delete("/ppt/{deck}")
+async def delete_deck(deck: str, retriever: PPTRetriever = Depends(get_retriever),
+                      pool: WorkerPool = Depends(get_ingest_pool),
+                      jobs: IngestionQueue = Depends(get_ingestion_queue)):
+    """
+    Remove a deck's chunks from the FAISS index without touching other decks.
+
+    Args:
+        deck (str): Deck name (the uploaded file name).
+
+    Returns:
+        dict: Deck name and number of chunks removed.
+    """
+    removed = await pool.run(retriever.remove_deck, deck)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Deck not indexed: {deck}")
+    # Uploading the same file again should re-index it rather than dedupe to the old job
+    jobs.store.mark_removed(deck)
+    logger.info(f" Removed deck from index: {deck} ({removed} chunks)")
+    return {"deck": deck, "removed_chunks": removed}
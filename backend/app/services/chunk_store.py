@@ -0,0 +1,204 @@
+import os
+import json
+from collections.abc import Mapping
+import numpy as np
+from app.utils.file_utils import atomic_write, save_npy
+
+FORMAT_VERSION = 1
+
+# Column files stored next to the <base>.json header
+_COLUMN_SUFFIXES = ("_ids.npy", "_offsets.npy", "_text.bin", "_deck.npy", "_slides.npy")
+
+
+def _load_column(path):
+    # Plain ndarray views over the map: slicing np.memmap itself is several times slower
+    return np.asarray(np.load(path, mmap_mode='r'))
+
+
+def _load_blob(path):
+    # np.memmap refuses zero-length files
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype='uint8')
+    return np.asarray(np.memmap(path, dtype='uint8', mode='r'))
+
+
+class ChunkStore(Mapping):
+    """
+    Immutable chunk table: a {chunk_id: text} mapping with deck and slide-range columns.
+
+    On disk a store is a set of columns sharing a base path:
+        <base>_ids.npy      int64 chunk IDs, ascending
+        <base>_offsets.npy  int64 byte offsets of each chunk in the text blob (N + 1 entries)
+        <base>_text.bin     UTF-8 text of every chunk, back to back
+        <base>_deck.npy     int32 position of each chunk's deck in the header's deck list
+        <base>_slides.npy   int32 (N, 2) first and last slide of each chunk (0 = unknown)
+        <base>.json         deck names plus caller metadata, written last
+    load() memory-maps the columns, so opening a store takes the same time at any corpus
+    size and a lookup decodes only the chunk it returns.
+    """
+
+    def __init__(self, ids, offsets, blob, deck_codes, slides, deck_names):
+        self.ids = ids
+        self.offsets = offsets
+        self.blob = blob
+        self.deck_codes = deck_codes
+        self.slides = slides
+        self.deck_names = list(deck_names)
+        self._deck_runs = None
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype='int64'), np.zeros(1, dtype='int64'), np.empty(0, dtype='uint8'),
+                   np.empty(0, dtype='int32'), np.zeros((0, 2), dtype='int32'), [])
+
+    @classmethod
+    def from_dict(cls, chunks: dict, deck_of: dict, slides: dict = None):
+        """Build a store from the {id: text}, {id: deck} and {id: (first, last)} dicts of the old pickle registry."""
+        ids = sorted(chunks)
+        names = list(dict.fromkeys(deck_of[chunk_id] for chunk_id in ids))
+        codes = {deck: code for code, deck in enumerate(names)}
+        encoded = [chunks[chunk_id].encode('utf-8') for chunk_id in ids]
+        ranges = [(slides or {}).get(chunk_id) or (0, 0) for chunk_id in ids]
+        return cls(np.array(ids, dtype='int64'),
+                   np.concatenate([np.zeros(1, dtype='int64'), np.cumsum([len(b) for b in encoded], dtype='int64')]),
+                   np.frombuffer(b"".join(encoded), dtype='uint8'),
+                   np.array([codes[deck_of[chunk_id]] for chunk_id in ids], dtype='int32'),
+                   np.array(ranges, dtype='int32').reshape(-1, 2), names)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, chunk_id):
+        return self._row(chunk_id) >= 0
+
+    def __getitem__(self, chunk_id):
+        row = self._row(chunk_id)
+        if row < 0:
+            raise KeyError(chunk_id)
+        return self._text(row)
+
+    def _row(self, chunk_id) -> int:
+        row = int(np.searchsorted(self.ids, chunk_id))
+        return row if row < len(self.ids) and self.ids[row] == chunk_id else -1
+
+    def _text(self, row: int) -> str:
+        return bytes(self.blob[self.offsets[row]:self.offsets[row + 1]]).decode('utf-8')
+
+    def lookup(self, chunk_id) -> dict:
+        """Return {"text", "deck", "slides"} for one chunk (slides is None if unknown), or None if absent."""
+        row = self._row(chunk_id)
+        if row < 0:
+            return None
+        first, last = (int(n) for n in self.slides[row])
+        return {"text": self._text(row), "deck": self.deck_names[self.deck_codes[row]],
+                "slides": (first, last) if first else None}
+
+    def deck_ids(self, deck: str) -> list:
+        if deck not in self.deck_names:
+            return []
+        return self.ids[self.deck_codes == self.deck_names.index(deck)].tolist()
+
+    def deck_rows(self, deck: str):
+        """
+        Rows holding deck's chunks: a slice when they are contiguous (replace_deck appends each
+        deck as one block, so they normally are), else an index array. Empty slice if unknown.
+        """
+        if deck not in self.deck_names:
+            return slice(0, 0)
+        code = self.deck_names.index(deck)
+        if self._deck_runs is None:
+            # One pass over the deck column, cached: the store never changes
+            starts = np.flatnonzero(np.diff(self.deck_codes, prepend=-1)) if len(self.deck_codes) else np.empty(0, 'int64')
+            ends = np.append(starts[1:], len(self.deck_codes))
+            runs = {}
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                runs.setdefault(int(self.deck_codes[start]), []).append((start, end))
+            self._deck_runs = runs
+        runs = self._deck_runs.get(code, [])
+        if len(runs) == 1:
+            return slice(*runs[0])
+        return np.flatnonzero(self.deck_codes == code)
+
+    def deck_counts(self) -> dict:
+        counts = np.bincount(self.deck_codes, minlength=len(self.deck_names))
+        return {deck: int(n) for deck, n in zip(self.deck_names, counts) if n}
+
+    def replace_deck(self, deck: str, ids, texts: list, slide_ranges=None):
+        """
+        Return a new store where deck holds exactly texts under ids (no texts = deck removed).
+
+        New IDs must be larger than every ID already in the store, as the retriever's
+        never-reused IDs are.
+        """
+        keep = self.deck_codes != (self.deck_names.index(deck) if deck in self.deck_names else -1)
+        lengths = np.diff(self.offsets)
+        blob = self.blob[np.repeat(keep, lengths)]
+        chunk_ids, codes, slides, lengths = self.ids[keep], self.deck_codes[keep], self.slides[keep], lengths[keep]
+
+        # Drop names of decks that no longer have chunks
+        used = np.unique(codes)
+        remap = np.full(len(self.deck_names) + 1, -1, dtype='int32')
+        remap[used] = np.arange(len(used), dtype='int32')
+        codes = remap[codes]
+        names = [self.deck_names[code] for code in used]
+
+        if len(texts):
+            new_ids = np.asarray(ids, dtype='int64')
+            if len(chunk_ids) and new_ids.min() <= chunk_ids.max():
+                raise ValueError("New chunk IDs must be larger than the IDs already stored.")
+            encoded = [text.encode('utf-8') for text in texts]
+            new_slides = np.asarray(slide_ranges if slide_ranges is not None else [(0, 0)] * len(texts),
+                                    dtype='int32').reshape(-1, 2)
+            names.append(deck)
+            chunk_ids = np.concatenate([chunk_ids, new_ids])
+            codes = np.concatenate([codes, np.full(len(texts), len(names) - 1, dtype='int32')])
+            slides = np.concatenate([slides, new_slides])
+            lengths = np.concatenate([lengths, np.array([len(b) for b in encoded], dtype='int64')])
+            blob = np.concatenate([blob, np.frombuffer(b"".join(encoded), dtype='uint8')])
+
+        offsets = np.concatenate([np.zeros(1, dtype='int64'), np.cumsum(lengths, dtype='int64')])
+        return ChunkStore(chunk_ids, offsets, blob, codes, slides, names)
+
+    def save(self, base_path: str, **meta):
+        """Write the columns, then the header with deck names and meta (which load() returns)."""
+        atomic_write(base_path + "_ids.npy", lambda tmp: save_npy(tmp, self.ids))
+        atomic_write(base_path + "_offsets.npy", lambda tmp: save_npy(tmp, self.offsets))
+        atomic_write(base_path + "_text.bin", lambda tmp: np.ascontiguousarray(self.blob).tofile(tmp))
+        atomic_write(base_path + "_deck.npy", lambda tmp: save_npy(tmp, self.deck_codes))
+        atomic_write(base_path + "_slides.npy", lambda tmp: save_npy(tmp, self.slides))
+        header = {"format": FORMAT_VERSION, "count": len(self.ids), "decks": self.deck_names, **meta}
+
+        def write_header(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(header, f)
+        atomic_write(base_path + ".json", write_header)
+
+    @classmethod
+    def exists(cls, base_path: str) -> bool:
+        return os.path.exists(base_path + ".json")
+
+    @classmethod
+    def load(cls, base_path: str) -> tuple:
+        """
+        Memory-map a saved store.
+
+        Returns:
+            tuple: (ChunkStore, header dict with the meta passed to save()).
+        """
+        with open(base_path + ".json", 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        store = cls(_load_column(base_path + "_ids.npy"), _load_column(base_path + "_offsets.npy"),
+                    _load_blob(base_path + "_text.bin"), _load_column(base_path + "_deck.npy"),
+                    _load_column(base_path + "_slides.npy"), header["decks"])
+        if len(store.ids) != header["count"]:
+            raise ValueError(f"Chunk store at {base_path} is incomplete ({len(store.ids)} of {header['count']} chunks).")
+        return store, header
+
+    @classmethod
+    def remove(cls, base_path: str):
+        for path in [base_path + ".json"] + [base_path + suffix for suffix in _COLUMN_SUFFIXES]:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,103 @@
+import re
+from collections import namedtuple
+from itertools import groupby
+from app.config.settings import CHUNK_TARGET_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# A retrieval chunk built from one or more slides of a deck.
+#   slide_start / slide_end: first and last slide (1-based) the text comes from
+#   tokens:                  estimated token count of text
+Chunk = namedtuple("Chunk", ["text", "deck", "slide_start", "slide_end", "tokens"])
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Estimate tokens as words plus punctuation marks (close to word-piece counts for English)."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _word_tokens(text: str) -> list:
+    """Split text on whitespace into (word, estimated tokens) pairs."""
+    return [(word, 1 if word.isalnum() else count_tokens(word) or 1) for word in text.split()]
+
+
+class _ChunkBuilder:
+    """Accumulates words (tagged with their slide and whether they start a shape) into chunks."""
+
+    def __init__(self, target_tokens: int, overlap_tokens: int):
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        self.chunks = []
+        self.deck = None
+        self._words = []   # (word, tokens, slide, starts_unit)
+        self._tokens = 0
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens
+
+    def add_unit(self, words: list, unit_tokens: int, slide: int):
+        """Add one shape's (word, tokens) pairs, splitting them across chunks only if the shape is too long."""
+        if self._words and self._tokens + unit_tokens > self.target_tokens:
+            # Start the shape in a fresh chunk, with overlap only if that still leaves room for it
+            self.flush(overlap=unit_tokens + self.overlap_tokens <= self.target_tokens)
+        starts_unit = True
+        for word, tokens in words:
+            if self._words and self._tokens + tokens > self.target_tokens:
+                self.flush(overlap=True)
+            self._words.append((word, tokens, slide, starts_unit))
+            self._tokens += tokens
+            starts_unit = False
+
+    def flush(self, overlap: bool = False):
+        if not self._words:
+            return
+        parts = []
+        for word, _, _, starts_unit in self._words:
+            if parts:
+                parts.append("\n" if starts_unit else " ")
+            parts.append(word)
+        self.chunks.append(Chunk("".join(parts), self.deck, self._words[0][2], self._words[-1][2], self._tokens))
+
+        carried, carried_tokens = [], 0
+        if overlap:
+            for entry in reversed(self._words):
+                if carried_tokens + entry[1] > self.overlap_tokens:
+                    break
+                carried.append(entry)
+                carried_tokens += entry[1]
+        self._words = carried[::-1]
+        self._tokens = carried_tokens
+
+
+def chunk_records(records, target_tokens: int = CHUNK_TARGET_TOKENS,
+                  overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> list:
+    """
+    Pack slide records into retrieval chunks of about target_tokens.
+
+    Slides are kept whole when they fit in the current chunk, otherwise a new chunk starts
+    at the slide boundary. A slide longer than the target is split between shapes, and a
+    single shape longer than the target between words; those mid-slide cuts carry the last
+    overlap_tokens of the previous chunk over. Runs in time linear in the number of words.
+
+    Args:
+        records (iterable): SlideRecords (or anything with deck, slide and text) in slide order.
+        target_tokens (int): Maximum estimated tokens per chunk.
+        overlap_tokens (int): Tokens repeated across mid-slide cuts (capped at half the target).
+
+    Returns:
+        list: Chunk tuples in document order.
+    """
+    builder = _ChunkBuilder(target_tokens, min(overlap_tokens, target_tokens // 2))
+    for (deck, slide), slide_records in groupby(records, key=lambda r: (r.deck, r.slide)):
+        units = [words for words in (_word_tokens(record.text) for record in slide_records) if words]
+        unit_tokens = [sum(tokens for _, tokens in words) for words in units]
+        if deck != builder.deck:
+            builder.flush()
+            builder.deck = deck
+        elif builder.tokens + sum(unit_tokens) > target_tokens:
+            builder.flush()
+        for words, tokens in zip(units, unit_tokens):
+            builder.add_unit(words, tokens, slide)
+    builder.flush()
+    return builder.chunks
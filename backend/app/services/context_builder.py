@@ -0,0 +1,102 @@
+import re
+import zlib
+import numpy as np
+from app.config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD
+from app.services.chunker import count_tokens
+
+_WORD_RE = re.compile(r"\w+")
+# MinHash: NUM_PERM universal hashes (a * x + b) mod a Mersenne prime over 32-bit shingle hashes
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(0)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+PROMPT_TEMPLATE = ("{query}\n\nAnswer from these slide excerpts and cite the ones you use like [1].\n\n"
+                   "{context}")
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of a text's word 3-shingles; equal positions estimate Jaccard similarity."""
+    words = _WORD_RE.findall(text.lower())
+    n = max(1, len(words) - SHINGLE_WORDS + 1)
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(n)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # a, b, x < 2^32 keeps a * x + b below 2^64
+    return (((hashes[:, None] * _A) + _B) % _PRIME).min(axis=0)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+def cite(hit: dict) -> str:
+    """Citation label for a hit, e.g. "Roadmap.pptx, slides 3-4"."""
+    deck = hit.get("deck") or hit.get("source") or "unknown deck"
+    slides = hit.get("slides")
+    if not slides:
+        return deck
+    first, last = slides
+    return f"{deck}, slide {first}" if first == last else f"{deck}, slides {first}-{last}"
+
+
+def naive_context(hits: list) -> str:
+    """The retrieved chunks joined as they are, the context the prompt held before this stage."""
+    return "\n---\n".join(hit["text"] for hit in hits)
+
+
+def build_prompt(query: str, context: str) -> str:
+    return PROMPT_TEMPLATE.format(context=context, query=query) if context else query
+
+
+def build_context(query: str, hits: list, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                  dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> dict:
+    """
+    Assemble the excerpts block of a Gemini prompt from retrieved chunks.
+
+    Hits are taken best first; a hit whose estimated Jaccard similarity to one already kept
+    reaches dedup_threshold is dropped, as is one that no longer fits in token_budget. The kept
+    excerpts are then put back in reading order (deck, then slide) and numbered for citation.
+
+    Args:
+        query (str): The user question.
+        hits (list): Retrieved chunks best first, shaped like PPTRetriever.search hits (lexical
+            index hits with "source" instead of "deck" also work).
+        token_budget (int): Estimated tokens the excerpts may take, citation headers included.
+        dedup_threshold (float): Similarity at or above which a hit counts as a duplicate.
+
+    Returns:
+        dict: "context" (the numbered excerpts), "prompt", "citations" ([{n, id, deck, slides}]),
+            "tokens_before" (prompt tokens with the hits joined as they are), "tokens_after",
+            "duplicates" and "over_budget" (numbers of hits dropped).
+    """
+    kept, signatures, duplicates, over_budget, used = [], [], 0, 0, 0
+    for hit in hits:
+        signature = minhash(hit["text"])
+        if any(similarity(signature, other) >= dedup_threshold for other in signatures):
+            duplicates += 1
+            continue
+        cost = count_tokens(cite(hit)) + count_tokens(hit["text"]) + 4
+        if used + cost > token_budget:
+            over_budget += 1
+            continue
+        kept.append(hit)
+        signatures.append(signature)
+        used += cost
+
+    kept.sort(key=lambda hit: (hit.get("deck") or hit.get("source") or "", (hit.get("slides") or (0, 0))[0]))
+    citations = [{"n": n, "id": hit.get("id"), "deck": hit.get("deck") or hit.get("source"),
+                  "slides": hit.get("slides")} for n, hit in enumerate(kept, start=1)]
+    context = "\n\n".join(f"[{n}] {cite(hit)}\n{hit['text']}" for n, hit in enumerate(kept, start=1))
+    prompt = build_prompt(query, context)
+    naive = naive_context(hits)
+    return {
+        "context": context,
+        "prompt": prompt,
+        "citations": citations,
+        "tokens_before": count_tokens(f"{query}\nContext: {naive}" if naive else query),
+        "tokens_after": count_tokens(prompt),
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+    }
@@ -0,0 +1,155 @@
+import os
+import hashlib
+import threading
+import unicodedata
+import re
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from app.config.settings import EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_SAVE_EVERY
+from app.utils.logger import logger
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize text before hashing so whitespace-only edits still hit the cache."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Persistent LRU cache of chunk embeddings keyed by (model name, SHA-1 of normalized text).
+
+    Entries are stored on disk as a single .npz holding a (N, 20) uint8 array of keys and a
+    (N, dim) float32 matrix, ordered from least to most recently used. Rewriting it costs the
+    whole cache, so save_if_due only writes once save_every new entries are unsaved; call save
+    on shutdown for the rest.
+    """
+
+    def __init__(self, model_name: str, path: str, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 save_every: int = EMBEDDING_CACHE_SAVE_EVERY):
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._dirty = False
+        # Entries added since the last save
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        # Retrievers sharing one cache (index shards) may save at the same time
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_chunk_text(text)}".encode("utf-8")).digest()
+
+    def encode(self, texts: list, encode_fn) -> np.ndarray:
+        """
+        Return float32 embeddings for texts, calling encode_fn only on cache misses.
+
+        Args:
+            texts (list): Chunk texts.
+            encode_fn (callable): Batch encoder, list[str] -> (n, dim) array.
+
+        Returns:
+            np.ndarray: (len(texts), dim) embeddings in input order.
+        """
+        keys = [self.key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for k in keys:
+                vector = self._entries.get(k)
+                if vector is not None:
+                    self._entries.move_to_end(k)
+                    found[k] = vector
+        # Duplicate texts within one batch are encoded once
+        miss_texts = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in miss_texts:
+                miss_texts[k] = t
+        missing = list(miss_texts)
+        if missing:
+            encoded = np.asarray(encode_fn([miss_texts[k] for k in missing]), dtype="float32")
+            found.update(zip(missing, encoded))
+            self._put(zip(missing, encoded))
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0), dtype="float32")
+
+    def _put(self, items):
+        with self._lock:
+            for k, vector in items:
+                if k not in self._entries:
+                    self._unsaved += 1
+                self._entries[k] = np.array(vector, dtype="float32")
+                self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "unsaved": self._unsaved,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save."""
+        with self._save_lock:
+            self._save()
+
+    def save_if_due(self):
+        """Write the cache to disk once at least save_every new entries are unsaved."""
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def _save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            keys = np.frombuffer(b"".join(self._entries.keys()), dtype=np.uint8).reshape(-1, 20)
+            vectors = np.stack(list(self._entries.values())) if self._entries else np.zeros((0, 0), dtype="float32")
+            self._dirty = False
+            unsaved, self._unsaved = self._unsaved, 0
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            # A unique name, so another process saving the same cache cannot interleave with this write
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, keys=keys, vectors=vectors)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save embedding cache {self.path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self._dirty = True
+                self._unsaved += unsaved
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                keys, vectors = data["keys"], data["vectors"]
+            start = max(0, len(keys) - self.max_entries)
+            with self._lock:
+                self._entries = OrderedDict((k.tobytes(), v) for k, v in zip(keys[start:], vectors[start:]))
+            logger.info(f"Loaded {len(self._entries)} cached embeddings from {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to load embedding cache {self.path}: {e}")
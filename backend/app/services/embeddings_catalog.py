@@ -0,0 +1,179 @@
+import os
+import threading
+from app.services import vector_store
+from app.services.lexical_index import LexicalIndex, index_source, load_lexical_index, remove_source
+from app.utils.logger import logger
+
+EMBEDDINGS_SUFFIX = "_embeddings.json"
+
+
+def _stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class EmbeddingsCatalog:
+    """
+    Keeps the generator's lexical index in step with the *_embeddings.json files on disk.
+
+    The index already holds each file's cleaned, split sentences (memory-mapped), so a query
+    only needs to know whether a file changed since it was indexed. The catalog remembers the
+    (mtime, size) each file was indexed at and lists the directory again only when the
+    directory's own mtime changes (every save renames a file into it) or after invalidate();
+    a query scoped to one file also stats that file. New or changed files are loaded and
+    re-split, deleted ones dropped from the index; anything else costs no file reads.
+
+    A file seen for the first time counts as indexed when the index has it and was saved
+    after the file was written, as vector_store does on every save. save_embeddings also
+    invalidates the file in this process's catalog, so a rewrite that leaves (mtime, size) as
+    they were is still picked up here.
+    """
+
+    def __init__(self, embeddings_dir: str = None, index_path: str = None):
+        # None follows vector_store's paths, so both always look at the same files
+        self._embeddings_dir = embeddings_dir
+        self._index_path = index_path
+        # file name -> (mtime_ns, size) it was indexed at; only files present on disk
+        self._stamps = {}
+        self._dir_stamp = None
+        self._forced = set()
+        self._force_all = False
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.scans = 0
+        self.refreshes = 0
+        self.removals = 0
+
+    @property
+    def embeddings_dir(self) -> str:
+        return self._embeddings_dir or vector_store.EMBEDDINGS_DIR
+
+    @property
+    def index_path(self) -> str:
+        return self._index_path or vector_store.LEXICAL_INDEX_PATH
+
+    def __contains__(self, embeddings_file: str) -> bool:
+        return embeddings_file in self._stamps
+
+    def __len__(self):
+        return len(self._stamps)
+
+    def _indexed_at(self):
+        stamp = _stamp(self.index_path + ".json")
+        return stamp[0] if stamp else -1
+
+    def _check(self, embeddings_file: str, index: LexicalIndex, indexed_at: int) -> bool:
+        """Bring one file's sentences up to date. Returns whether the index had to change."""
+        stamp = _stamp(os.path.join(self.embeddings_dir, embeddings_file))
+        indexed = embeddings_file in index.docs.deck_names
+        if stamp is None:
+            self._stamps.pop(embeddings_file, None)
+            self._forced.discard(embeddings_file)
+            if not indexed:
+                return False
+            remove_source(embeddings_file, self.index_path)
+            self.removals += 1
+            return True
+        if not (self._force_all or embeddings_file in self._forced):
+            if self._stamps.get(embeddings_file) == stamp:
+                return False
+            # Strictly older: a file written in the same mtime tick as the index save may be newer
+            if indexed and stamp[0] < indexed_at:
+                self._stamps[embeddings_file] = stamp
+                return False
+
+        embeddings = vector_store.load_embeddings(embeddings_file, self.embeddings_dir)
+        count = index_source(embeddings_file, vector_store.embeddings_text(embeddings), self.index_path)
+        if not count:
+            logger.warning(f"Embeddings file '{embeddings_file}' contains no text after cleaning.")
+        self._stamps[embeddings_file] = stamp
+        self._forced.discard(embeddings_file)
+        self.refreshes += 1
+        return True
+
+    def _scan(self) -> bool:
+        index, indexed_at = load_lexical_index(self.index_path), self._indexed_at()
+        names = {f for f in os.listdir(self.embeddings_dir) if f.endswith(EMBEDDINGS_SUFFIX)}
+        changed = False
+        for name in sorted(names | set(index.docs.deck_names) | set(self._stamps)):
+            changed |= self._check(name, index, indexed_at)
+        self._force_all = False
+        self.scans += 1
+        return changed
+
+    def index(self, embeddings_file: str = None) -> LexicalIndex:
+        """
+        Return the lexical index after refreshing whatever changed on disk.
+
+        Args:
+            embeddings_file (str, optional): The file the query is scoped to; it is checked
+                even when the directory looks unchanged.
+
+        Returns:
+            LexicalIndex: The current index (see load_lexical_index).
+        """
+        with self._lock:
+            self.lookups += 1
+            changed = False
+            if not LexicalIndex.exists(self.index_path):
+                # Embeddings files written before the lexical index existed are indexed once, on first use
+                vector_store.rebuild_lexical_index(self.embeddings_dir, self.index_path)
+                self._stamps.clear()
+                self._dir_stamp = None
+                changed = True
+            # Stamp before listing, so a file saved during the scan triggers another one
+            dir_stamp = _stamp(self.embeddings_dir)
+            if dir_stamp != self._dir_stamp or self._forced or self._force_all:
+                changed |= self._scan()
+                self._dir_stamp = dir_stamp
+            elif embeddings_file:
+                changed |= self._check(embeddings_file, load_lexical_index(self.index_path), self._indexed_at())
+            self.hits += not changed
+            return load_lexical_index(self.index_path)
+
+    def invalidate(self, embeddings_file: str = None):
+        """Re-read embeddings_file (default: every file) on the next lookup, whatever its stamp."""
+        with self._lock:
+            if embeddings_file:
+                self._forced.add(embeddings_file)
+            else:
+                self._force_all = True
+
+    def stats(self) -> dict:
+        index = load_lexical_index(self.index_path)
+        return {
+            "files": len(self._stamps),
+            "sentences": len(index),
+            "text_mb": round(len(index.docs.blob) / (1024 * 1024), 2),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "scans": self.scans,
+            "refreshes": self.refreshes,
+            "removals": self.removals,
+        }
+
+
+_default_catalog = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_embeddings_catalog() -> EmbeddingsCatalog:
+    """Return the process-wide catalog the generator searches through."""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = EmbeddingsCatalog()
+        return _default_catalog
+
+
+def invalidate_embeddings_file(embeddings_file: str):
+    """Have the process-wide catalog, if one was created, re-read embeddings_file on its next lookup."""
+    with _default_catalog_lock:
+        catalog = _default_catalog
+    if catalog is not None:
+        catalog.invalidate(embeddings_file)
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import random
+import threading
+import httpx
+from app.config.settings import (
+    GEMINI_API_KEY, GEMINI_BASE_URL, GEMINI_TIMEOUT_SECONDS, GEMINI_CONNECT_TIMEOUT_SECONDS,
+    GEMINI_MAX_RETRIES, GEMINI_BACKOFF_SECONDS, GEMINI_MAX_CONCURRENCY, GEMINI_MAX_CONNECTIONS
+)
+from app.utils.logger import logger
+
+# Generation methods, in the order they are tried for a model not seen before
+GENERATE_ENDPOINTS = ("generateContent", "generateText")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GeminiError(Exception):
+    """A Gemini request that failed after retries, with the last HTTP status (None for network errors)."""
+
+    def __init__(self, message: str, status_code: int = None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+def extract_text(result) -> str:
+    """Return the generated text from a generateContent or generateText response."""
+    if isinstance(result, dict):
+        if result.get('candidates'):
+            return result['candidates'][0]['content']['parts'][0]['text']
+        if result.get('outputs'):
+            out = result['outputs'][0]
+            if isinstance(out, dict) and isinstance(out.get('content'), list):
+                for c in out['content']:
+                    if isinstance(c, dict) and 'text' in c:
+                        return c['text']
+    # Unknown shape: a short preview of the raw response
+    return str(result)[:1000]
+
+
+def candidate_text(chunk) -> str:
+    """Text of one streamed response chunk ("" for chunks that only carry metadata)."""
+    candidates = chunk.get('candidates') if isinstance(chunk, dict) else None
+    if not candidates:
+        return ""
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return "".join(part.get('text', '') for part in parts)
+
+
+class GeminiClient:
+    """
+    Async Gemini REST client sharing one pool of keep-alive connections.
+
+    Remembers which generation endpoint each model answered on, so after the first call an
+    answer costs one round trip instead of a 404 followed by a retry on the other endpoint.
+    """
+
+    def __init__(self, api_key: str = GEMINI_API_KEY, base_url: str = GEMINI_BASE_URL,
+                 timeout: float = GEMINI_TIMEOUT_SECONDS, connect_timeout: float = GEMINI_CONNECT_TIMEOUT_SECONDS,
+                 max_retries: int = GEMINI_MAX_RETRIES, backoff: float = GEMINI_BACKOFF_SECONDS,
+                 max_concurrency: int = GEMINI_MAX_CONCURRENCY, max_connections: int = GEMINI_MAX_CONNECTIONS,
+                 transport=None):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self.retries = 0
+        # model -> generation endpoint that answered for it
+        self.endpoints = {}
+        # Models whose streaming endpoint 404'd; they are answered by generate() straight away
+        self.unstreamable = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            # A header rather than ?key= keeps the key out of URLs in logs
+            headers["x-goog-api-key"] = api_key
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/", headers=headers, transport=transport,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def close(self):
+        await self._client.aclose()
+
+    def _delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.replace(".", "", 1).isdigit():
+            return float(retry_after)
+        # Full jitter, so clients that failed together do not retry together
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send one request through the pool, retrying 429/5xx responses and network errors.
+
+        Returns:
+            httpx.Response: The first response that is not retried (which may be a 4xx).
+
+        Raises:
+            GeminiError: If every attempt failed with a network error or a retryable status.
+        """
+        for attempt in range(self.max_retries + 1):
+            response, error = None, None
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    response = await self._client.request(method, path, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            delay = self._delay(attempt, response)
+            logger.warning(f"Gemini {method} {path} failed ({error or response.status_code}); "
+                           f"retrying in {delay:.2f} s")
+            await asyncio.sleep(delay)
+        if response is None:
+            raise GeminiError(f"Gemini API error: request failed: {error}")
+        raise GeminiError(f"Gemini API error: {response.status_code}", response.status_code, _body(response))
+
+    async def list_models(self) -> dict:
+        """Return the models listing for this key."""
+        response = await self.request("GET", "models")
+        if response.status_code != 200:
+            raise GeminiError(f"Gemini API error: {response.status_code}", response.status_code, _body(response))
+        return response.json()
+
+    async def generate_content(self, model: str, prompt: str) -> tuple:
+        """
+        Generate from prompt on model, trying the model's known endpoint first.
+
+        Returns:
+            tuple: (endpoint used, JSON response).
+
+        Raises:
+            GeminiError: If no endpoint exists for the model (404) or the request fails.
+        """
+        model = model if model.startswith("models/") else f"models/{model}"
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        known = self.endpoints.get(model)
+        response = None
+        for endpoint in sorted(GENERATE_ENDPOINTS, key=lambda e: e != known):
+            response = await self.request("POST", f"{model}:{endpoint}", json=payload)
+            if response.status_code == 404:
+                continue
+            if response.status_code != 200:
+                raise GeminiError(f"Gemini API error: {response.status_code}", response.status_code, _body(response))
+            self.endpoints[model] = endpoint
+            return endpoint, response.json()
+        self.endpoints.pop(model, None)
+        raise GeminiError("Gemini API error: 404 Not Found. Check your API key and model name "
+                          "— try listing available models.", 404, _body(response))
+
+    async def generate(self, model: str, prompt: str) -> str:
+        """Generate from prompt on model and return the text."""
+        _, result = await self.generate_content(model, prompt)
+        return extract_text(result)
+
+    async def stream_generate(self, model: str, prompt: str):
+        """
+        Yield the generated text in pieces as Gemini produces them (streamGenerateContent, SSE).
+
+        Failures before the first piece are retried like request(); a model without a streaming
+        endpoint (404) falls back to generate() and yields its whole answer at once.
+
+        Raises:
+            GeminiError: If the request fails, or the stream breaks after text was yielded.
+        """
+        model = model if model.startswith("models/") else f"models/{model}"
+        if model in self.unstreamable:
+            yield await self.generate(model, prompt)
+            return
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        for attempt in range(self.max_retries + 1):
+            response, error, started = None, None, False
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    async with self._client.stream("POST", f"{model}:streamGenerateContent",
+                                                   params={"alt": "sse"}, json=payload) as response:
+                        if response.status_code == 200:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                text = candidate_text(json.loads(line[5:]))
+                                if text:
+                                    started = True
+                                    yield text
+                            return
+                        await response.aread()
+                except httpx.TransportError as e:
+                    if started:
+                        raise GeminiError(f"Gemini API error: stream interrupted: {e}")
+                    error = e
+            if response is not None and response.status_code == 404:
+                self.unstreamable.add(model)
+                yield await self.generate(model, prompt)
+                return
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                raise GeminiError(f"Gemini API error: {response.status_code}", response.status_code, _body(response))
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            delay = self._delay(attempt, response)
+            logger.warning(f"Gemini stream for {model} failed ({error or response.status_code}); "
+                           f"retrying in {delay:.2f} s")
+            await asyncio.sleep(delay)
+        if response is None:
+            raise GeminiError(f"Gemini API error: request failed: {error}")
+        raise GeminiError(f"Gemini API error: {response.status_code}", response.status_code, _body(response))
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retries": self.retries, "endpoints": dict(self.endpoints),
+                "max_concurrency": self.max_concurrency}
+
+
+def _body(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """Return the process-wide GeminiClient, created on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = GeminiClient()
+        return _default_client
+
+
+async def close_gemini_client():
+    """Close the process-wide client's connections; the next get_gemini_client() opens a new one."""
+    global _default_client
+    with _default_client_lock:
+        client, _default_client = _default_client, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from app.config.settings import (
+    RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K, HYBRID_DENSE_WEIGHT, HYBRID_LEXICAL_WEIGHT,
+    DENSE_BUDGET_MS, LEXICAL_BUDGET_MS, FUSION_BUDGET_MS
+)
+from app.utils.logger import logger
+from app.utils.metrics import observe_stage
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+
+def _dedupe_key(hit: dict) -> str:
+    # The same chunk from both searches, or the same text filed under two decks, is one result
+    return " ".join(hit["text"].lower().split())
+
+
+def reciprocal_rank_fusion(ranked_lists: dict, weights: dict = None, k: int = RRF_K, top_k: int = 3) -> list:
+    """
+    Fuse ranked hit lists with weighted reciprocal rank fusion.
+
+    A hit at 1-based rank r in a list adds weight / (k + r) to its score, so only ranks matter
+    and BM25 and L2 scores never have to be put on one scale.
+
+    Args:
+        ranked_lists (dict): {list name: hits best first}, hits shaped like PPTRetriever.search results.
+        weights (dict, optional): {list name: weight}; missing names weigh 1.
+        k (int): Rank offset; larger values flatten the gap between top and lower ranks.
+        top_k (int): Number of fused hits to return.
+
+    Returns:
+        list: Deduplicated hits best first, with the fused score and their rank in each list ("ranks").
+    """
+    weights = weights or {}
+    fused = {}
+    for name, hits in ranked_lists.items():
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(_dedupe_key(hit), {**hit, "score": 0.0, "ranks": {}})
+            if name in entry["ranks"]:
+                continue
+            entry["ranks"][name] = rank
+            entry["score"] += weights.get(name, 1.0) / (k + rank)
+    return sorted(fused.values(), key=lambda hit: hit["score"], reverse=True)[:top_k]
+
+
+class HybridRetriever:
+    """
+    Chat retrieval in dense, lexical or hybrid mode on top of the shared QueryBatcher.
+
+    Dense search goes through the batcher as before; BM25 search over the same chunks runs on
+    the batcher's query pool at the same time, and hybrid mode fuses the two candidate lists.
+    With a Reranker, a wider candidate list is re-ordered by its cross-encoder (on the same
+    pool) before the top_k are taken. With a QueryCache, results for a question already asked at the current index generation
+    are returned without searching.
+    """
+
+    def __init__(self, batcher, candidates: int = HYBRID_CANDIDATES, rrf_k: int = RRF_K,
+                 weights: dict = None, budgets_ms: dict = None, cache=None, reranker=None):
+        self.batcher = batcher
+        self.cache = cache
+        self.reranker = reranker
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = weights or {"dense": HYBRID_DENSE_WEIGHT, "lexical": HYBRID_LEXICAL_WEIGHT}
+        self.budgets_ms = budgets_ms or {"dense": DENSE_BUDGET_MS, "lexical": LEXICAL_BUDGET_MS,
+                                         "fusion": FUSION_BUDGET_MS}
+        if reranker is not None:
+            self.budgets_ms.setdefault("rerank", reranker.budget_ms)
+
+    def find_deck(self, name: str):
+        """Resolve a deck or embeddings file name to an indexed deck (see PPTRetriever.find_deck)."""
+        return self.batcher.retriever.find_deck(name)
+
+    async def search(self, query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE, deck: str = None) -> tuple:
+        """
+        Retrieve the top_k chunks for query, from one deck if deck is given.
+
+        Returns:
+            tuple: (hits best first, timings). timings maps each stage that ran to
+                {"ms", "budget_ms"} and holds the overall total_ms; with a cache, its lookup is
+                the "cache" stage, with "hit" telling whether the search was skipped; with a
+                reranker, the "rerank" stage also counts candidates scored, cached and cut by
+                the budget.
+
+        Raises:
+            ValueError: If mode is not one of RETRIEVAL_MODES.
+            WorkerPoolFull: If the query queue or the query pool is full.
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'; expected one of {', '.join(RETRIEVAL_MODES)}.")
+        start = time.perf_counter()
+        if self.cache is not None:
+            cache_scope = {"mode": mode, "deck": deck, "top_k": top_k, "rerank": self.reranker is not None}
+            generation = await self._current_generation()
+            cached = self.cache.get(query, cache_scope, generation)
+            cache_ms = (time.perf_counter() - start) * 1000
+            if cached is not None:
+                observe_stage("retrieve_cache", cache_ms / 1000)
+                return cached, {"cache": {"ms": round(cache_ms, 2), "budget_ms": None, "hit": True},
+                                "total_ms": round(cache_ms, 2)}
+        # Hits handed to the reranker (or returned, without one)
+        n_hits = max(top_k, self.reranker.candidates) if self.reranker is not None else top_k
+        n_candidates = max(n_hits, self.candidates) if mode == "hybrid" else n_hits
+
+        stages = {}
+        if mode in ("dense", "hybrid"):
+            stages["dense"] = self._timed(self.batcher.search(query, top_k=n_candidates, deck=deck))
+        if mode in ("lexical", "hybrid"):
+            stages["lexical"] = self._timed(self.batcher.run(
+                self.batcher.retriever.lexical_search, query, n_candidates, deck))
+        results = dict(zip(stages, await asyncio.gather(*stages.values())))
+        elapsed = {stage: ms for stage, (_, ms) in results.items()}
+
+        if mode == "hybrid":
+            fusion_start = time.perf_counter()
+            hits = reciprocal_rank_fusion({stage: hits for stage, (hits, _) in results.items()},
+                                          self.weights, self.rrf_k, n_hits)
+            elapsed["fusion"] = (time.perf_counter() - fusion_start) * 1000
+        else:
+            hits = results[mode][0][:n_hits]
+        rerank_info = None
+        if self.reranker is not None:
+            hits, rerank_info = await self.batcher.run(self.reranker.rerank, query, hits, top_k)
+            elapsed["rerank"] = rerank_info["ms"]
+
+        for stage, ms in elapsed.items():
+            observe_stage(f"retrieve_{stage}", ms / 1000)
+        over = [stage for stage, ms in elapsed.items() if ms > self.budgets_ms.get(stage, float("inf"))]
+        if over:
+            logger.warning(f"Retrieval stages over budget for query '{query}': "
+                           + ", ".join(f"{stage} {elapsed[stage]:.1f}/{self.budgets_ms[stage]:g} ms" for stage in over))
+        timings = {stage: {"ms": round(ms, 2), "budget_ms": self.budgets_ms.get(stage)} for stage, ms in elapsed.items()}
+        if rerank_info is not None:
+            timings["rerank"].update({k: rerank_info[k] for k in ("candidates", "scored", "cached", "truncated")})
+        if self.cache is not None:
+            self.cache.put(query, cache_scope, hits, generation)
+            timings["cache"] = {"ms": round(cache_ms, 2), "budget_ms": None, "hit": False}
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return hits, timings
+
+    async def _current_generation(self):
+        # Pick up writes by other workers first (a file check at most every reload interval),
+        # off the event loop since a reload reads the index
+        retriever = self.batcher.retriever
+        await self.batcher.run(retriever.reload_if_changed)
+        return retriever.generation
+
+    @staticmethod
+    async def _timed(awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        return result, (time.perf_counter() - start) * 1000
@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from app.config.settings import INGESTION_DB_PATH, INGEST_WORKERS, INGEST_QUEUE_MAX, INGEST_JOB_STALE_SECONDS
+from app.services.chunker import chunk_records
+from app.services.ppt_loader import extract_slide_records, save_extraction
+from app.services.worker_pool import WorkerPoolFull
+from app.utils.logger import logger
+
+# Job lifecycle: queued -> running -> succeeded | failed. 'removed' marks a succeeded job
+# whose deck was later deleted, so uploading the same file again is not deduplicated.
+# A running job records the queue that claimed it (owner) and that queue's last heartbeat;
+# running jobs whose heartbeat goes stale were interrupted and go back to 'queued'.
+
+# Pipeline stages reported while a job runs, with the overall progress each one starts at
+STAGES = {"queued": 0.0, "extracting": 0.05, "chunking": 0.6, "indexing": 0.7, "done": 1.0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    deck TEXT NOT NULL,
+    ppt_path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    slides_done INTEGER NOT NULL DEFAULT 0,
+    slides_total INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_deck ON jobs (deck, created_at);
+"""
+
+
+class JobStore:
+    """SQLite-backed ingestion job table, so queued uploads survive a restart."""
+
+    def __init__(self, db_path: str = INGESTION_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self._lock = threading.Lock()
+
+    def _add_missing_columns(self):
+        # Databases created before jobs had owners; several workers may race to upgrade one
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if name not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):
+                        raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def create(self, deck: str, ppt_path: str, sha256: str, job_id: str = None) -> dict:
+        now = time.time()
+        job_id = job_id or self.new_id()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, deck, ppt_path, sha256, status, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?)",
+                (job_id, deck, ppt_path, sha256, now, now))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, limit: int = 50) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def find_duplicate(self, deck: str, sha256: str) -> dict:
+        """
+        Return the deck's latest job if it has the same content and is queued, running or succeeded.
+
+        Only the latest job counts: after uploading A, then B, then A again, the index serves B,
+        so the second A is not a duplicate of the first.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE deck = ? ORDER BY created_at DESC, rowid DESC LIMIT 1",
+                                     (deck,)).fetchone()
+        if row is None or row["sha256"] != sha256 or row["status"] not in ("queued", "running", "succeeded"):
+            return None
+        return self._to_dict(row)
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim_next(self, owner: str) -> dict:
+        """
+        Atomically mark the oldest queued job as running for owner and return it (None if idle).
+
+        Decks with a running job are skipped, so versions of one deck are indexed one at a time and
+        in upload order; otherwise an older version finishing last would be the one the index serves.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, updated_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = 'queued' AND deck NOT IN "
+                "(SELECT deck FROM jobs WHERE status = 'running') ORDER BY created_at LIMIT 1) RETURNING *",
+                (owner, now, now)).fetchone()
+        return self._to_dict(row)
+
+    def heartbeat(self, owner: str):
+        """Mark owner's running jobs as still being worked on."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                               (time.time(), owner))
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def requeue_stale(self, stale_seconds: float) -> int:
+        """
+        Put running jobs whose owner stopped sending heartbeats back in the queue.
+
+        Jobs that live queues (in this or another worker process) are running are left alone.
+
+        Returns:
+            int: How many jobs were requeued.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, slides_done = 0, "
+                "owner = NULL, updated_at = ? WHERE status = 'running' AND "
+                "(heartbeat_at IS NULL OR heartbeat_at < ?)", (now, now - stale_seconds))
+        return cursor.rowcount
+
+    def replaced_uploads(self, job: dict) -> list:
+        """PPT paths of the deck's earlier jobs that no queued or running job still needs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT ppt_path FROM jobs WHERE deck = ? AND created_at <= ? AND id != ? "
+                "AND ppt_path != ? AND ppt_path NOT IN "
+                "(SELECT ppt_path FROM jobs WHERE status IN ('queued', 'running'))",
+                (job["deck"], job["created_at"], job["id"], job["ppt_path"])).fetchall()
+        return [row["ppt_path"] for row in rows]
+
+    def mark_removed(self, deck: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'removed', updated_at = ? "
+                               "WHERE deck = ? AND status = 'succeeded'", (time.time(), deck))
+
+
+class IngestionQueue:
+    """
+    Runs queued ingestion jobs on a fixed number of worker threads.
+
+    pipeline(job, report) does the work; report(stage, slides_done=None, slides_total=None)
+    records progress. Whatever the pipeline returns is stored as the job result.
+    """
+
+    def __init__(self, store: JobStore, pipeline, workers: int = INGEST_WORKERS,
+                 max_queued: int = INGEST_QUEUE_MAX, stale_seconds: float = INGEST_JOB_STALE_SECONDS):
+        self.store = store
+        self.pipeline = pipeline
+        self.workers = workers
+        self.max_queued = max_queued
+        self.stale_seconds = stale_seconds
+        # Identifies the jobs this queue claims, so other worker processes can tell they are alive
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+
+    def start(self):
+        self._stopping = False
+        self._threads.append(threading.Thread(target=self._beat, name="ingest-heartbeat", daemon=True))
+        for n in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, name=f"ingest-{n}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 30):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def is_full(self) -> bool:
+        return self.store.count_queued() >= self.max_queued
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self.store.count_queued(), "max_queued": self.max_queued}
+
+    def submit(self, deck: str, ppt_path: str, sha256: str, job_id: str = None) -> tuple:
+        """
+        Queue a deck for ingestion unless the same content is already queued or indexed.
+
+        Args:
+            deck (str): Deck name.
+            ppt_path (str): The uploaded file; the job reads it later, so it must not be
+                overwritten by later uploads.
+            sha256 (str): Hex digest of the file.
+            job_id (str, optional): ID for the new job (default: a fresh one).
+
+        Returns:
+            tuple: (job dict, duplicate flag).
+
+        Raises:
+            WorkerPoolFull: If max_queued jobs are already waiting.
+        """
+        existing = self.store.find_duplicate(deck, sha256)
+        if existing:
+            return existing, True
+        if self.is_full():
+            raise WorkerPoolFull("ingestion queue")
+        job = self.store.create(deck, ppt_path, sha256, job_id=job_id)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job, False
+
+    def _beat(self):
+        """Heartbeat this queue's running jobs, and requeue jobs whose owner has gone quiet."""
+        while True:
+            self.store.heartbeat(self.owner)
+            requeued = self.store.requeue_stale(self.stale_seconds)
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted ingestion job(s).")
+                with self._wakeup:
+                    self._wakeup.notify_all()
+            with self._wakeup:
+                if not self._stopping:
+                    self._wakeup.wait(timeout=self.stale_seconds / 3)
+                if self._stopping:
+                    return
+
+    def _work(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            job = self.store.claim_next(self.owner)
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(job)
+
+    def _run(self, job: dict):
+        job_id = job["id"]
+
+        def report(stage, slides_done=None, slides_total=None):
+            fields = {"stage": stage, "progress": STAGES[stage]}
+            if slides_total:
+                fields.update(slides_done=slides_done, slides_total=slides_total)
+                if stage == "extracting":
+                    # Extraction spans the progress range up to the next stage
+                    fields["progress"] = STAGES["extracting"] + (STAGES["chunking"] - STAGES["extracting"]) * slides_done / slides_total
+            self.store.update(job_id, **fields)
+
+        start = time.perf_counter()
+        try:
+            result = self.pipeline(job, report)
+            self.store.update(job_id, status="succeeded", stage="done", progress=1.0, result=result)
+            logger.info(f"Ingestion job {job_id} ({job['deck']}) finished in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} ({job['deck']}) failed: {e}")
+            self.store.update(job_id, status="failed", error=str(getattr(e, "detail", e)))
+            return
+        finally:
+            # A later version of the deck may be waiting for this one to finish
+            with self._wakeup:
+                self._wakeup.notify()
+        self._remove_replaced_uploads(job)
+
+    def _remove_replaced_uploads(self, job: dict):
+        # Each upload has its own path (see upload_ppt); once a newer version of the deck is
+        # indexed, the files of earlier versions are no longer needed
+        for path in self.store.replaced_uploads(job):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                if not os.listdir(os.path.dirname(path)):
+                    os.rmdir(os.path.dirname(path))
+            except OSError as e:
+                logger.warning(f"Could not remove replaced upload {path}: {e}")
+
+
+def run_ppt_pipeline(retriever, job: dict, report) -> dict:
+    """Extract, chunk and index one uploaded deck, reporting progress per stage and slide."""
+    report("extracting")
+    records = extract_slide_records(job["ppt_path"], progress=lambda done, total: report("extracting", done, total))
+    if not records:
+        raise ValueError("No text could be extracted from the PPT.")
+    txt_path = save_extraction(job["ppt_path"], records)
+
+    report("chunking")
+    chunks = chunk_records(records)
+
+    report("indexing")
+    # Re-uploading a deck replaces its vectors; other decks stay in the index
+    chunk_ids = retriever.add_deck(job["deck"], [chunk.text for chunk in chunks],
+                                   slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+    return {"extracted_text_path": txt_path, "num_chunks": len(chunk_ids)}
@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+from app.config.settings import LEXICAL_INDEX_PATH, BM25_K1, BM25_B
+from app.services.chunk_store import ChunkStore
+from app.utils.file_utils import atomic_write, save_npy
+from app.utils.metrics import stage_timer
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+FORMAT_VERSION = 1
+
+_COLUMN_SUFFIXES = ("_doclen.npy", "_post_offsets.npy", "_post_rows.npy", "_post_tfs.npy", "_terms.txt")
+
+_TOKEN_RE = re.compile(r"\w+")
+# Line breaks separate slide shapes and bullets; sentence punctuation splits within them
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[\.\?!])\s+|\n+")
+
+# Words too common to help ranking; dropping them keeps posting lists short
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its of on or our "
+    "that the their this to was we were what when where which who why will with you your".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens of text, without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_sentences(text: str) -> list:
+    """Split text into cleaned sentences (one per line or sentence), dropping empty ones."""
+    sentences = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text or ""):
+        cleaned = " ".join(''.join(ch if ch.isprintable() else ' ' for ch in sentence).split())
+        if cleaned:
+            sentences.append(cleaned)
+    return sentences
+
+
+def _tokenize_docs(texts, codes: dict, terms: list, first_row: int) -> tuple:
+    """
+    Count term frequencies of each text, adding unseen terms to codes/terms in place.
+
+    Returns:
+        tuple: (term codes, rows, term frequencies) of every posting, and the token count of each text.
+    """
+    post_terms, post_rows, post_tfs, lengths = [], [], [], []
+    for row, text in enumerate(texts, start=first_row):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            code = codes.get(term)
+            if code is None:
+                code = codes[term] = len(terms)
+                terms.append(term)
+            post_terms.append(code)
+            post_rows.append(row)
+            post_tfs.append(tf)
+    return ((np.array(post_terms, dtype='int64'), np.array(post_rows, dtype='int32'),
+             np.array(post_tfs, dtype='float32')), np.array(lengths, dtype='int32'))
+
+
+def _pack_postings(terms: list, post_terms, post_rows, post_tfs) -> tuple:
+    """Group postings by term (CSR layout), dropping terms left without postings. Returns (terms, offsets, rows, tfs)."""
+    order = np.argsort(post_terms, kind='stable')
+    counts = np.bincount(post_terms, minlength=len(terms))
+    used = counts > 0
+    if not used.all():
+        terms = [term for term, keep in zip(terms, used) if keep]
+        counts = counts[used]
+    offsets = np.concatenate([np.zeros(1, dtype='int64'), np.cumsum(counts, dtype='int64')])
+    return terms, offsets, post_rows[order], post_tfs[order]
+
+
+class LexicalIndex:
+    """
+    Immutable BM25 inverted index over short documents (sentences or chunks) grouped by source.
+
+    Documents live in a ChunkStore whose decks are the sources. Postings are stored per term
+    in CSR layout, so a query reads only the posting lists of its own terms and its cost does
+    not grow with the number of sources. On disk, next to <base>.json:
+        <base>_docs*          ChunkStore with the document texts and sources
+        <base>_doclen.npy     int32 token count of each document
+        <base>_post_offsets   int64 start of each term's postings (terms + 1 entries)
+        <base>_post_rows.npy  int32 document row of each posting, ascending within a term
+        <base>_post_tfs.npy   float32 term frequency of each posting
+        <base>_terms.txt      vocabulary, one term per line, in posting order
+    """
+
+    def __init__(self, docs: ChunkStore, doc_lens, terms: list, post_offsets, post_rows, post_tfs, next_id: int = 0):
+        self.docs = docs
+        self.doc_lens = doc_lens
+        self.terms = terms
+        self.post_offsets = post_offsets
+        self.post_rows = post_rows
+        self.post_tfs = post_tfs
+        self.next_id = next_id
+        self._codes = {term: code for code, term in enumerate(terms)}
+        self.avg_doc_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+    @classmethod
+    def empty(cls):
+        return cls(ChunkStore.empty(), np.empty(0, dtype='int32'), [], np.zeros(1, dtype='int64'),
+                   np.empty(0, dtype='int32'), np.empty(0, dtype='float32'))
+
+    @classmethod
+    def build(cls, sources: dict):
+        """Index {source: [texts]} in one pass (faster than one replace_source per source)."""
+        chunks, source_of = {}, {}
+        for source, texts in sources.items():
+            for text in texts:
+                source_of[len(chunks)] = source
+                chunks[len(chunks)] = text
+        docs = ChunkStore.from_dict(chunks, source_of)
+        terms, codes = [], {}
+        postings, lengths = _tokenize_docs(chunks.values(), codes, terms, 0)
+        return cls(docs, lengths, *_pack_postings(terms, *postings), next_id=len(chunks))
+
+    @classmethod
+    def from_store(cls, store: ChunkStore):
+        """Index every chunk of a ChunkStore under its own ID, with its deck as the source."""
+        terms, codes = [], {}
+        postings, lengths = _tokenize_docs((store._text(row) for row in range(len(store))), codes, terms, 0)
+        next_id = int(store.ids[-1]) + 1 if len(store) else 0
+        return cls(store, lengths, *_pack_postings(terms, *postings), next_id=next_id)
+
+    @property
+    def sources(self) -> list:
+        return list(self.docs.deck_names)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def replace_source(self, source: str, texts: list, ids=None, slide_ranges=None):
+        """
+        Return a new index where source holds exactly texts (no texts = source removed).
+
+        Args:
+            source (str): Source name (embeddings file or deck).
+            texts (list): Document texts.
+            ids (list, optional): Document IDs, larger than every ID already indexed;
+                defaults to the index's own increasing IDs.
+            slide_ranges (list, optional): (first_slide, last_slide) per text, kept in the ChunkStore.
+        """
+        if ids is None:
+            ids = range(self.next_id, self.next_id + len(texts))
+        ids = np.asarray(ids, dtype='int64').reshape(-1)
+        keep = self.docs.deck_codes != (self.docs.deck_names.index(source) if source in self.docs.deck_names else -1)
+        docs = self.docs.replace_deck(source, ids, texts, slide_ranges)
+
+        # Renumber the postings of the documents that stay, then append the new ones
+        row_map = (np.cumsum(keep) - 1).astype('int32')
+        post_terms = np.repeat(np.arange(len(self.terms), dtype='int64'), np.diff(self.post_offsets))
+        kept = keep[self.post_rows]
+        terms, codes = list(self.terms), dict(self._codes)
+        (new_terms, new_rows, new_tfs), new_lens = _tokenize_docs(texts, codes, terms, int(keep.sum()))
+        packed = _pack_postings(terms,
+                                np.concatenate([post_terms[kept], new_terms]),
+                                np.concatenate([row_map[self.post_rows[kept]], new_rows]),
+                                np.concatenate([self.post_tfs[kept], new_tfs]))
+        next_id = max(self.next_id, int(ids.max()) + 1 if len(ids) else 0)
+        return LexicalIndex(docs, np.concatenate([self.doc_lens[keep], new_lens]), *packed, next_id=next_id)
+
+    def search(self, query: str, top_k: int = 5, source: str = None,
+               k1: float = BM25_K1, b: float = BM25_B) -> list:
+        """
+        Rank documents against query with BM25.
+
+        Args:
+            query (str): Free-text query.
+            top_k (int): Number of results.
+            source (str, optional): Only return documents of this source.
+
+        Returns:
+            list: Up to top_k {"id", "text", "source", "score"} dicts, best first.
+        """
+        codes = {self._codes[term] for term in tokenize(query) if term in self._codes}
+        if not codes:
+            return []
+        source_rows = None
+        if source is not None:
+            if source not in self.docs.deck_names:
+                return []
+            source_rows = self.docs.deck_rows(source)
+
+        n_docs = len(self.doc_lens)
+        row_parts, score_parts = [], []
+        for code in codes:
+            start, end = int(self.post_offsets[code]), int(self.post_offsets[code + 1])
+            rows, tfs = self.post_rows[start:end], self.post_tfs[start:end]
+            idf = np.log(1.0 + (n_docs - (end - start) + 0.5) / (end - start + 0.5))
+            if isinstance(source_rows, slice):
+                # Rows are ascending within a posting list, so a source's block is found by bisection
+                lo, hi = np.searchsorted(rows, [source_rows.start, source_rows.stop])
+                rows, tfs = rows[lo:hi], tfs[lo:hi]
+            elif source_rows is not None:
+                in_source = np.isin(rows, source_rows)
+                rows, tfs = rows[in_source], tfs[in_source]
+            norm = k1 * (1.0 - b + b * self.doc_lens[rows] / self.avg_doc_len)
+            row_parts.append(rows)
+            score_parts.append(idf * tfs * (k1 + 1.0) / (tfs + norm))
+
+        rows = np.concatenate(row_parts)
+        if not len(rows):
+            return []
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [{"id": int(self.docs.ids[row]), "text": self.docs._text(row),
+                 "source": self.docs.deck_names[self.docs.deck_codes[row]], "score": float(scores[i])}
+                for i, row in ((i, int(unique_rows[i])) for i in best)]
+
+    def save(self, base_path: str, save_docs: bool = True):
+        """
+        Write the documents and postings, then the header.
+
+        Pass save_docs=False when the documents are a ChunkStore saved elsewhere
+        (the retriever's chunks); load() then needs them back through docs.
+        """
+        if save_docs:
+            self.docs.save(base_path + "_docs")
+        atomic_write(base_path + "_doclen.npy", lambda tmp: save_npy(tmp, self.doc_lens))
+        atomic_write(base_path + "_post_offsets.npy", lambda tmp: save_npy(tmp, self.post_offsets))
+        atomic_write(base_path + "_post_rows.npy", lambda tmp: save_npy(tmp, self.post_rows))
+        atomic_write(base_path + "_post_tfs.npy", lambda tmp: save_npy(tmp, self.post_tfs))
+
+        def write_terms(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write("\n".join(self.terms))
+        atomic_write(base_path + "_terms.txt", write_terms)
+        header = {"format": FORMAT_VERSION, "docs": len(self.docs), "terms": len(self.terms),
+                  "postings": len(self.post_rows), "next_id": self.next_id}
+
+        def write_header(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(header, f)
+        atomic_write(base_path + ".json", write_header)
+
+    @classmethod
+    def exists(cls, base_path: str) -> bool:
+        return os.path.exists(base_path + ".json")
+
+    @classmethod
+    def load(cls, base_path: str, docs: ChunkStore = None):
+        """Memory-map a saved index (only the vocabulary is read into memory)."""
+        with open(base_path + ".json", 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if docs is None:
+            docs, _ = ChunkStore.load(base_path + "_docs")
+        with open(base_path + "_terms.txt", 'r', encoding='utf-8') as f:
+            terms = f.read().split("\n") if header["terms"] else []
+        column = lambda suffix: np.asarray(np.load(base_path + suffix, mmap_mode='r'))
+        index = cls(docs, column("_doclen.npy"), terms, column("_post_offsets.npy"),
+                    column("_post_rows.npy"), column("_post_tfs.npy"), next_id=header["next_id"])
+        if len(docs) != header["docs"] or len(index.doc_lens) != len(docs) or len(index.post_rows) != header["postings"]:
+            raise ValueError(f"Lexical index at {base_path} is incomplete.")
+        return index
+
+    @classmethod
+    def remove(cls, base_path: str):
+        ChunkStore.remove(base_path + "_docs")
+        for path in [base_path + ".json"] + [base_path + suffix for suffix in _COLUMN_SUFFIXES]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Loaded indexes by base path, with the header file identity they were loaded from
+_loaded = {}
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def _index_file_lock(base_path: str, shared: bool = False):
+    """Keep readers from loading while another process is halfway through saving."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+    with open(base_path + ".lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _header_stamp(base_path: str):
+    # Every save replaces the header file, so its inode changes even within one mtime tick
+    try:
+        stat = os.stat(base_path + ".json")
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def load_lexical_index(base_path: str = LEXICAL_INDEX_PATH) -> LexicalIndex:
+    """
+    Return the saved index at base_path (empty if there is none).
+
+    The loaded index is cached per process and only reloaded after a save, so a query
+    costs one stat() on top of the search itself.
+    """
+    stamp = _header_stamp(base_path)
+    if stamp is None:
+        return LexicalIndex.empty()
+    cached = _loaded.get(base_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with _index_file_lock(base_path, shared=True):
+        stamp = _header_stamp(base_path)
+        index = LexicalIndex.load(base_path)
+    _loaded[base_path] = (stamp, index)
+    return index
+
+
+def update_lexical_index(update, base_path: str = LEXICAL_INDEX_PATH) -> LexicalIndex:
+    """Save update(current index) as the new index at base_path, serialized with other writers."""
+    with _write_lock, _index_file_lock(base_path), stage_timer("lexical_update"):
+        current = LexicalIndex.load(base_path) if LexicalIndex.exists(base_path) else LexicalIndex.empty()
+        update(current).save(base_path)
+        # Serve the saved copy, so the heap arrays built by the update can be freed
+        index = LexicalIndex.load(base_path)
+        _loaded[base_path] = (_header_stamp(base_path), index)
+    return index
+
+
+def index_source(source: str, text: str, base_path: str = LEXICAL_INDEX_PATH) -> int:
+    """Replace the sentences indexed for source with those of text. Returns the sentence count."""
+    sentences = split_sentences(text)
+    update_lexical_index(lambda index: index.replace_source(source, sentences), base_path)
+    return len(sentences)
+
+
+def remove_source(source: str, base_path: str = LEXICAL_INDEX_PATH):
+    update_lexical_index(lambda index: index.replace_source(source, []), base_path)
@@ -1,38 +1,122 @@
 import os
+import glob
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
 from ..utils.logger import logger
-from ..config.settings import EXTRACTED_TEXT_DIR
+from ..utils.metrics import stage_timer
+from ..config.settings import EXTRACTED_TEXT_DIR, RAW_PPT_DIR, EXTRACT_WORKERS
 
 # Ensure extracted_texts folder exists
 os.makedirs(EXTRACTED_TEXT_DIR, exist_ok=True)
 
+# One piece of text from a slide.
+#   deck:  deck name (file name without extension)
+#   slide: 1-based slide number
+#   shape: shape name as shown in PowerPoint's selection pane ("notes" for speaker notes)
+#   kind:  placeholder | text_box | shape | table | notes
+#   field: title | body | table_cell | notes
+SlideRecord = namedtuple("SlideRecord", ["deck", "slide", "shape", "kind", "field", "text"])
 
-def extract_text_from_ppt(file_path: str) -> str:
+_TITLE_PLACEHOLDERS = {PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.VERTICAL_TITLE}
+
+
+def _shape_type(shape):
+    """The shape's MSO_SHAPE_TYPE, or None for shapes python-pptx does not recognize."""
+    try:
+        return shape.shape_type
+    except NotImplementedError:
+        # Raised for sp elements that are not an autoshape, text box or freeform; their text frame still reads fine
+        return None
+
+
+def _shape_kind(shape) -> str:
+    if shape.is_placeholder:
+        return "placeholder"
+    if _shape_type(shape) == MSO_SHAPE_TYPE.TEXT_BOX:
+        return "text_box"
+    return "shape"
+
+
+def _iter_shape_records(deck: str, slide_number: int, shapes):
+    for shape in shapes:
+        if _shape_type(shape) == MSO_SHAPE_TYPE.GROUP:
+            yield from _iter_shape_records(deck, slide_number, shape.shapes)
+        elif shape.has_table:
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    text = cell.text.strip()
+                    # Merged cells repeat the origin cell's text; keep only the origin
+                    if text and not cell.is_spanned:
+                        yield SlideRecord(deck, slide_number, shape.name, "table", "table_cell", text)
+        elif shape.has_text_frame:
+            text = shape.text_frame.text.strip()
+            if text:
+                is_title = shape.is_placeholder and shape.placeholder_format.type in _TITLE_PLACEHOLDERS
+                yield SlideRecord(deck, slide_number, shape.name, _shape_kind(shape),
+                                  "title" if is_title else "body", text)
+
+
+def iter_slide_records(file_path: str, deck: str = None, progress=None):
     """
-    Extract all text from a PowerPoint file.
+    Yield the text of a PowerPoint file as SlideRecords, slide by slide.
+
+    Covers titles, body text, grouped shapes, table cells and speaker notes.
 
     Args:
         file_path (str): Path to the PPTX file.
+        deck (str, optional): Deck name for the records; defaults to the file name without extension.
+        progress (callable, optional): Called as progress(slides_done, slides_total) after each slide.
 
-    Returns:
-        str: Concatenated text from all slides.
+    Yields:
+        SlideRecord: One record per non-empty text frame, table cell or notes page.
     """
-    try:
-        prs = Presentation(file_path)
-        text_runs = []
+    deck = deck or os.path.splitext(os.path.basename(file_path))[0]
+    prs = Presentation(file_path)
+    slides_total = len(prs.slides)
+
+    for slide_number, slide in enumerate(prs.slides, start=1):
+        yield from _iter_shape_records(deck, slide_number, slide.shapes)
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+            if notes:
+                yield SlideRecord(deck, slide_number, "notes", "notes", "notes", notes)
+        if progress:
+            progress(slide_number, slides_total)
+
 
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    text_runs.append(shape.text.strip())
+def extract_slide_records(file_path: str, progress=None) -> list:
+    """
+    Extract all SlideRecords from a PowerPoint file.
 
-        full_text = "\n".join(text_runs)
-        logger.info(f"Extracted text from PPT: {os.path.basename(file_path)}")
-        return full_text
+    Returns:
+        list: SlideRecords in slide order, or an empty list if the file cannot be read.
+    """
+    try:
+        with stage_timer("extract"):
+            records = list(iter_slide_records(file_path, progress=progress))
+        logger.info(f"Extracted {len(records)} text records from PPT: {os.path.basename(file_path)}")
+        return records
 
     except Exception as e:
         logger.error(f"Failed to extract text from {file_path}: {e}")
-        return ""
+        return []
+
+
+def extract_text_from_ppt(file_path: str, progress=None) -> str:
+    """
+    Extract all text from a PowerPoint file.
+
+    Args:
+        file_path (str): Path to the PPTX file.
+        progress (callable, optional): Called as progress(slides_done, slides_total) after each slide.
+
+    Returns:
+        str: Concatenated text from all slides.
+    """
+    return "\n".join(record.text for record in extract_slide_records(file_path, progress=progress))
 
 
 def save_extracted_text(file_path: str, text: str) -> str:
@@ -62,23 +146,74 @@ def save_extracted_text(file_path: str, text: str) -> str:
         return ""
 
 
-def process_ppt(file_path: str) -> str:
+def save_slide_records(file_path: str, records: list) -> str:
     """
-    Complete pipeline: extract text and save to extracted_texts.
-    Returns the path of the saved text file.
+    Save SlideRecords next to the extracted text as JSON lines (<deck>.slides.jsonl).
+
+    Returns:
+        str: Path of the saved file.
+    """
+    try:
+        filename = os.path.splitext(os.path.basename(file_path))[0] + ".slides.jsonl"
+        jsonl_path = os.path.join(EXTRACTED_TEXT_DIR, filename)
+
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+        return jsonl_path
+
+    except Exception as e:
+        logger.error(f"Failed to save slide records for {file_path}: {e}")
+        return ""
+
+
+def load_slide_records(jsonl_path: str) -> list:
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        return [SlideRecord(**json.loads(line)) for line in f if line.strip()]
+
+
+def save_extraction(file_path: str, records: list) -> str:
+    """Save records as <deck>.slides.jsonl and their flat text as <deck>.txt. Returns the text path."""
+    save_slide_records(file_path, records)
+    return save_extracted_text(file_path, "\n".join(record.text for record in records))
+
+
+def process_ppt(file_path: str, progress=None) -> str:
+    """
+    Complete pipeline: extract text and save to extracted_texts, along with the
+    per-slide records. Returns the path of the saved text file.
+    progress is passed through to extract_slide_records.
     """
-    text = extract_text_from_ppt(file_path)
-    if text:
-        return save_extracted_text(file_path, text)
+    records = extract_slide_records(file_path, progress=progress)
+    if records:
+        return save_extraction(file_path, records)
     else:
         logger.warning(f"No text extracted from {file_path}")
         return ""
 
-if __name__ == "__main__":
-    from ..config.settings import RAW_PPT_DIR
 
-    for ppt_file in os.listdir(RAW_PPT_DIR):
-        if ppt_file.endswith(".pptx"):
-            ppt_path = os.path.join(RAW_PPT_DIR, ppt_file)
-            txt_path = process_ppt(ppt_path)
-            print(f"Saved extracted text to: {txt_path}")
+def process_ppt_dir(ppt_dir: str = RAW_PPT_DIR, workers: int = EXTRACT_WORKERS) -> dict:
+    """
+    Run process_ppt over every .pptx in a directory, one deck per worker process.
+
+    Args:
+        ppt_dir (str): Directory containing the decks, directly or one directory down (the
+            upload route stores each upload in a directory of its own).
+        workers (int): Worker processes (0 = one per CPU; 1 runs in this process).
+
+    Returns:
+        dict: PPT path -> saved text path ("" where nothing was extracted).
+    """
+    ppt_paths = sorted(glob.glob(os.path.join(ppt_dir, "*.pptx")) + glob.glob(os.path.join(ppt_dir, "*", "*.pptx")))
+    workers = min(workers or os.cpu_count() or 1, len(ppt_paths))
+    if workers <= 1:
+        return {path: process_ppt(path) for path in ppt_paths}
+
+    # Parsing is pure Python and holds the GIL, so decks are spread across processes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(ppt_paths, pool.map(process_ppt, ppt_paths)))
+
+
+if __name__ == "__main__":
+    for ppt_path, txt_path in process_ppt_dir().items():
+        print(f"Saved extracted text to: {txt_path}")
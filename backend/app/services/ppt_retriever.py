@@ -1,52 +1,695 @@
 import os
+import time
 import pickle
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
 import numpy as np
 import faiss
 import re
 from sentence_transformers import SentenceTransformer
-from app.config.settings import EMBEDDINGS_DIR
+from app.config.settings import (
+    EMBEDDINGS_DIR, INDEX_TYPE, IVF_NLIST, IVF_NPROBE, HNSW_M, HNSW_EF_SEARCH, HNSW_EF_CONSTRUCTION,
+    PQ_M, PQ_NBITS, INDEX_MIN_TRAIN_SIZE, INDEX_RETRAIN_FACTOR, INDEX_MMAP, INDEX_RELOAD_INTERVAL_SECONDS,
+    INDEX_RERANK_CANDIDATES, EMBEDDING_CACHE_MAX_ENTRIES
+)
+from app.services.chunk_store import ChunkStore
+from app.services.embedding_cache import EmbeddingCache
+from app.services.lexical_index import LexicalIndex
+from app.utils.file_utils import atomic_write, save_npy
+from app.utils.logger import logger
+from app.utils.metrics import stage_timer
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process index lock, run a single worker
+    fcntl = None
+
+DEFAULT_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Deck name used for chunks indexed without one (create_index and pre-registry indexes)
+DEFAULT_DECK = '__default__'
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq', 'sq8', 'sq_fp16')
+# Index types that need k-means training before vectors can be added
+TRAINED_INDEX_TYPES = ('ivf_flat', 'ivf_pq')
+# Index types whose training (IVF centroids, SQ8 value ranges) goes stale as the corpus grows
+RETRAINED_INDEX_TYPES = TRAINED_INDEX_TYPES + ('sq8',)
+# Scalar-quantized types store L2-normalized vectors and score them by inner product
+INNER_PRODUCT_INDEX_TYPES = ('sq8', 'sq_fp16')
+# Lossy types whose candidates are re-scored exactly from the float32 source vectors
+COMPRESSED_INDEX_TYPES = ('ivf_pq', 'sq8', 'sq_fp16')
+
+# Loaded SentenceTransformer models, shared by every retriever in the process
+_models = {}
+_models_lock = threading.Lock()
+
+# Immutable view of the index and its registry; replaced as a whole on every update.
+#   index:        FAISS index keyed by chunk ID: IndexIDMap2 for flat/HNSW, a bare IVF index
+#                 for trained types (None until something is indexed)
+#   index_type:   type actually built (trained types fall back to 'flat' on small corpora)
+#   trained_size: corpus size the current centroids / SQ8 ranges were trained on (0 if untrained)
+#   chunks:       ChunkStore, {chunk_id: text} plus each chunk's deck and slide range
+#   next_id:      next unused chunk ID; IDs are never reused
+#   vectors:      float32 (N, dim) source embeddings, used to retrain or rebuild the index
+#   vector_ids:   int64 (N,) chunk ID of each row in vectors
+#   lexical:      BM25 LexicalIndex over the same chunks (its docs are the chunks store)
+IndexSnapshot = namedtuple('IndexSnapshot', ['index', 'index_type', 'trained_size', 'chunks', 'next_id',
+                                             'vectors', 'vector_ids', 'lexical'])
+
+EMPTY_SNAPSHOT = IndexSnapshot(None, None, 0, ChunkStore.empty(), 0, None, None, LexicalIndex.empty())
+
+
+@dataclass
+class IndexConfig:
+    """FAISS index settings; defaults come from app.config.settings."""
+    index_type: str = INDEX_TYPE
+    nlist: int = IVF_NLIST
+    nprobe: int = IVF_NPROBE
+    hnsw_m: int = HNSW_M
+    ef_search: int = HNSW_EF_SEARCH
+    ef_construction: int = HNSW_EF_CONSTRUCTION
+    pq_m: int = PQ_M
+    pq_nbits: int = PQ_NBITS
+    min_train_size: int = INDEX_MIN_TRAIN_SIZE
+    retrain_factor: float = INDEX_RETRAIN_FACTOR
+    mmap: bool = INDEX_MMAP
+    rerank: int = INDEX_RERANK_CANDIDATES
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Expected one of {INDEX_TYPES}.")
+
+    def target_type(self, n_vectors):
+        """Index type to build for a corpus of n_vectors (trained types need enough data)."""
+        if self.index_type in TRAINED_INDEX_TYPES and n_vectors < self.min_train_size:
+            return 'flat'
+        return self.index_type
+
+
+def get_embedding_model(model_name=DEFAULT_MODEL_NAME):
+    """Return the process-wide SentenceTransformer for model_name, loading it on first use."""
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+        return model
+
+
+def normalize(vectors):
+    """Return float32 copies of vectors scaled to unit L2 norm (zero vectors stay zero)."""
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms)
+
+
+def index_vectors(index_type, vectors):
+    """Vectors (or queries) as an index of index_type stores them: normalized for inner-product types."""
+    return normalize(vectors) if index_type in INNER_PRODUCT_INDEX_TYPES else vectors
+
+
+def exact_distances(index_type, query_vecs, vectors):
+    """
+    Squared L2 distances from each query to each vector, as the index of index_type ranks them.
+
+    Inner-product types compare normalized vectors, where the squared distance is 2 - 2 * cosine.
+
+    Returns:
+        np.ndarray: float32 (n_queries, n_vectors) distances.
+    """
+    query_vecs, vectors = index_vectors(index_type, query_vecs), index_vectors(index_type, vectors)
+    distances = ((query_vecs ** 2).sum(1)[:, None] - 2 * query_vecs @ vectors.T + (vectors ** 2).sum(1)[None, :])
+    return np.maximum(distances, 0).astype('float32')
+
+
+def build_index(config, vectors, ids):
+    """
+    Build a FAISS index keyed by chunk ID over vectors for config.
+
+    IVF types are trained on vectors with about 4*sqrt(N) centroids unless config.nlist
+    is set. sq8 / sq_fp16 store the normalized vectors with 1 / 2 bytes per dimension and
+    score them by inner product. Returns (index, index_type) where index_type is the type
+    actually built.
+    """
+    n, dim = vectors.shape
+    index_type = config.target_type(n)
+    nlist = min(config.nlist or max(1, int(4 * np.sqrt(n))), max(1, n))
+    if index_type == 'flat':
+        description = 'Flat'
+    elif index_type == 'hnsw':
+        description = f'HNSW{config.hnsw_m},Flat'
+    elif index_type == 'ivf_flat':
+        description = f'IVF{nlist},Flat'
+    elif index_type == 'sq8':
+        description = 'SQ8'
+    elif index_type == 'sq_fp16':
+        description = 'SQfp16'
+    else:
+        if dim % config.pq_m:
+            raise ValueError(f"PQ_M={config.pq_m} must divide the embedding dimension {dim}.")
+        description = f'IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}'
+
+    # IVF indexes store external IDs themselves; IndexIDMap2 around them breaks after remove_ids,
+    # since IVF does not renumber the entries it keeps the way IDMap expects
+    metric = faiss.METRIC_INNER_PRODUCT if index_type in INNER_PRODUCT_INDEX_TYPES else faiss.METRIC_L2
+    index = faiss.index_factory(dim, description if index_type in TRAINED_INDEX_TYPES else 'IDMap2,' + description,
+                                metric)
+    vectors = index_vectors(index_type, vectors)
+    if index_type == 'hnsw':
+        faiss.downcast_index(index.index).hnsw.efConstruction = config.ef_construction
+    if not index.is_trained:
+        index.train(vectors)
+    if n:
+        index.add_with_ids(vectors, ids)
+    tune_index(index, nprobe=config.nprobe, ef_search=config.ef_search)
+    return index, index_type
+
+
+def read_index(path, index_type, mmap=False):
+    """Read an index written by build_index; with mmap its data stays in the shared page cache."""
+    if not mmap:
+        return faiss.read_index(path)
+    # IVF inverted lists and flat/HNSW code arrays are mapped by different readers
+    flag = faiss.IO_FLAG_MMAP if index_type in TRAINED_INDEX_TYPES else faiss.IO_FLAG_MMAP_IFC
+    return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+
+
+def tune_index(index, nprobe=None, ef_search=None):
+    """Apply query-time knobs (IVF nprobe, HNSW efSearch) to an index built by build_index."""
+    base = faiss.downcast_index(index.index if hasattr(index, 'id_map') else index)
+    if nprobe and hasattr(base, 'nprobe'):
+        base.nprobe = nprobe
+    if ef_search and hasattr(base, 'hnsw'):
+        base.hnsw.efSearch = ef_search
+
 
 class PPTRetriever:
     def __init__(self,
-                 model_name='sentence-transformers/all-MiniLM-L6-v2',
+                 model_name=DEFAULT_MODEL_NAME,
                  index_path=None,
-                 chunk_path=None):
-        self.model = SentenceTransformer(model_name)
+                 chunk_path=None,
+                 model=None,
+                 config=None,
+                 embedding_cache=None):
+        self.model_name = model_name
+        self.model = model or get_embedding_model(model_name)
+        self.config = config or IndexConfig()
         self.index_path = index_path or os.path.join(EMBEDDINGS_DIR, 'faiss.index')
-        self.chunk_path = chunk_path or os.path.join(EMBEDDINGS_DIR, 'faiss_chunks.pkl')
-        self.index = None
-        self.chunks = []
+        # Base path of the ChunkStore columns (next to the index by default); a .pkl next to it is
+        # the pre-ChunkStore registry
+        self.chunk_path = os.path.splitext(
+            chunk_path or os.path.join(os.path.dirname(self.index_path), 'faiss_chunks'))[0]
+        self.legacy_chunk_path = self.chunk_path + '.pkl'
+        self.lexical_path = self.chunk_path + '_lexical'
+        base_path = os.path.splitext(self.index_path)[0]
+        self.vector_path = base_path + '_vectors.npy'
+        self.vector_ids_path = base_path + '_vector_ids.npy'
+        # Bumped on every commit so other worker processes know to reload
+        self.generation_path = base_path + '.generation'
+        self.lock_path = base_path + '.lock'
+        self.reload_interval = INDEX_RELOAD_INTERVAL_SECONDS
+        if embedding_cache is None and EMBEDDING_CACHE_MAX_ENTRIES > 0:
+            embedding_cache = EmbeddingCache(model_name, os.path.join(os.path.dirname(self.index_path),
+                                                                      'embedding_cache.npz'))
+        self.embedding_cache = embedding_cache
+        self._snapshot = EMPTY_SNAPSHOT
+        self._generation = 0
+        self._next_reload_check = 0.0
+        self._write_lock = threading.Lock()
         self.load_index()
 
+    @property
+    def index(self):
+        return self._snapshot.index
+
+    @property
+    def chunks(self):
+        return self._snapshot.chunks
+
+    @property
+    def generation(self):
+        """Index generation loaded in this process; bumped by every write to the index."""
+        return self._generation
+
+    def snapshot(self):
+        """Return the current IndexSnapshot; it stays valid even if a new index is swapped in."""
+        return self._snapshot
+
     def clean_text(self, text):
         text = re.sub(r'\n+', '\n', text)
         text = re.sub(r'\s+', ' ', text)
         return text.strip()
 
-    def create_index(self, text_chunks):
-        text_chunks = [self.clean_text(chunk) for chunk in text_chunks]
-        embeddings = self.model.encode(text_chunks, convert_to_numpy=True, show_progress_bar=True)
-        dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(np.array(embeddings, dtype='float32'))
-        self.chunks = text_chunks
-        self.save_index()
+    def _encode(self, texts):
+        with stage_timer("encode"):
+            embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=len(texts) > 64)
+        return np.ascontiguousarray(embeddings, dtype='float32')
 
-    def retrieve(self, query, top_k=3):
-        if self.index is None:
+    def _encode_chunks(self, texts):
+        """Encode chunk texts, reusing cached embeddings for text seen before."""
+        if self.embedding_cache is None:
+            return self._encode(texts)
+        return np.ascontiguousarray(self.embedding_cache.encode(texts, self._encode), dtype='float32')
+
+    def stats(self):
+        """Corpus size and embedding cache counters."""
+        snapshot = self._snapshot
+        return {
+            "index_type": snapshot.index_type,
+            "num_chunks": len(snapshot.chunks),
+            "num_decks": len(snapshot.chunks.deck_names),
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+        }
+
+    def close(self):
+        """Write out embedding cache entries that index commits left unsaved."""
+        if self.embedding_cache is not None:
+            self.embedding_cache.save()
+
+    def create_index(self, text_chunks, deck=DEFAULT_DECK):
+        """Replace the whole corpus with text_chunks, filed under a single deck."""
+        text_chunks, _, embeddings = self._prepare_chunks(text_chunks)
+        with self._write_lock, self._index_file_lock():
+            self._commit(self._replace_deck(EMPTY_SNAPSHOT, deck, text_chunks, embeddings=embeddings))
+
+    def add_deck(self, deck, text_chunks, slide_ranges=None, embeddings=None):
+        """
+        Index a deck's chunks, replacing any chunks previously indexed for the same deck.
+
+        Only text_chunks are encoded; other decks' vectors are left untouched.
+        slide_ranges, if given, holds a (first_slide, last_slide) pair per chunk.
+        embeddings, if given, are the chunks' vectors (as from export_deck) and nothing is encoded.
+
+        Chunks are encoded before the write locks are taken, so other decks' writes (in this or
+        another worker process) do not wait for the model.
+
+        Returns:
+            list: Chunk IDs assigned to the deck.
+        """
+        text_chunks, slide_ranges, embeddings = self._prepare_chunks(text_chunks, slide_ranges, embeddings)
+        with self._write_lock, self._index_file_lock():
+            self._sync_locked()
+            snapshot = self._replace_deck(self._snapshot, deck, text_chunks, slide_ranges, embeddings)
+            self._commit(snapshot)
+            return snapshot.chunks.deck_ids(deck)
+
+    def remove_deck(self, deck):
+        """Remove a deck's vectors from the index. Returns the number of chunks removed."""
+        with self._write_lock, self._index_file_lock():
+            self._sync_locked()
+            removed = len(self._snapshot.chunks.deck_ids(deck))
+            if removed:
+                self._commit(self._replace_deck(self._snapshot, deck, []))
+            return removed
+
+    def list_decks(self):
+        """Return {deck: chunk_count} for every indexed deck."""
+        return self._snapshot.chunks.deck_counts()
+
+    def export_deck(self, deck):
+        """
+        Return a deck's chunks as they are indexed, for moving it to another index.
+
+        Returns:
+            tuple: (texts, slide ranges, float32 vectors), in chunk order; empty if the deck is unknown.
+        """
+        snapshot = self._snapshot
+        rows = snapshot.chunks.deck_rows(deck)
+        chunk_ids = snapshot.chunks.ids[rows]
+        if not len(chunk_ids):
+            return [], [], np.zeros((0, 0), dtype='float32')
+        hits = [snapshot.chunks.lookup(int(i)) for i in chunk_ids]
+        vectors = np.asarray(snapshot.vectors[np.searchsorted(snapshot.vector_ids, chunk_ids)], dtype='float32')
+        return [hit["text"] for hit in hits], [hit["slides"] or (0, 0) for hit in hits], vectors
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """Retune IVF nprobe / HNSW efSearch for the live index and future rebuilds."""
+        if nprobe:
+            self.config.nprobe = nprobe
+        if ef_search:
+            self.config.ef_search = ef_search
+        if self._snapshot.index is not None:
+            tune_index(self._snapshot.index, nprobe=nprobe, ef_search=ef_search)
+
+    def _prepare_chunks(self, text_chunks, slide_ranges=None, embeddings=None):
+        """
+        Clean text_chunks, drop the empty ones, and encode the rest unless embeddings are given.
+
+        Returns:
+            tuple: (texts, slide ranges or None, float32 embeddings or None if no text is left).
+        """
+        cleaned = [(self.clean_text(chunk), i) for i, chunk in enumerate(text_chunks)]
+        keep = [i for text, i in cleaned if text]
+        text_chunks = [text for text, _ in cleaned if text]
+        if slide_ranges is not None:
+            slide_ranges = [tuple(slide_ranges[i]) for i in keep]
+        if not text_chunks:
+            return text_chunks, slide_ranges, None
+        if embeddings is not None:
+            embeddings = np.ascontiguousarray(np.asarray(embeddings, dtype='float32')[keep])
+        else:
+            embeddings = self._encode_chunks(text_chunks)
+        return text_chunks, slide_ranges, embeddings
+
+    def _replace_deck(self, snapshot, deck, text_chunks, slide_ranges=None, embeddings=None):
+        """
+        Return a new snapshot where deck holds exactly text_chunks (none = removed).
+
+        text_chunks, slide_ranges and embeddings come from _prepare_chunks.
+        """
+        old_ids = snapshot.chunks.deck_ids(deck)
+        if not old_ids and not text_chunks:
+            return snapshot
+
+        vectors, vector_ids = snapshot.vectors, snapshot.vector_ids
+        if old_ids:
+            keep = ~np.isin(vector_ids, np.array(old_ids, dtype='int64'))
+            vectors, vector_ids = vectors[keep], vector_ids[keep]
+        new_ids = np.arange(snapshot.next_id, snapshot.next_id + len(text_chunks), dtype='int64')
+        if text_chunks:
+            if vectors is None:
+                vectors, vector_ids = embeddings, new_ids
+            else:
+                vectors = np.concatenate([vectors, embeddings])
+                vector_ids = np.concatenate([vector_ids, new_ids])
+
+        lexical = snapshot.lexical.replace_source(deck, text_chunks, new_ids, slide_ranges)
+        chunks = lexical.docs
+        next_id = snapshot.next_id + len(text_chunks)
+
+        n = len(vector_ids)
+        if n == 0:
+            return EMPTY_SNAPSHOT._replace(next_id=next_id)
+        if self._needs_rebuild(snapshot, n, removing=bool(old_ids)):
+            index, index_type = build_index(self.config, np.ascontiguousarray(vectors), vector_ids)
+            trained_size = n if index_type in RETRAINED_INDEX_TYPES else 0
+            logger.info(f"Built {index_type} index over {n} vectors.")
+        else:
+            # Copy-on-write so readers holding the old snapshot never see a half-applied update
+            index, index_type, trained_size = self._writable_copy(snapshot.index), snapshot.index_type, snapshot.trained_size
+            if old_ids:
+                index.remove_ids(np.array(old_ids, dtype='int64'))
+            if text_chunks:
+                index.add_with_ids(index_vectors(index_type, embeddings), new_ids)
+        return IndexSnapshot(index, index_type, trained_size, chunks, next_id, vectors, vector_ids, lexical)
+
+    def _needs_rebuild(self, snapshot, n_vectors, removing=False):
+        if snapshot.index is None:
+            return True
+        target = self.config.target_type(n_vectors)
+        if target != snapshot.index_type:
+            return True
+        if target in TRAINED_INDEX_TYPES and hasattr(snapshot.index, 'id_map'):
+            # Written before IVF indexes kept their own IDs
+            return True
+        if target in RETRAINED_INDEX_TYPES and n_vectors > self.config.retrain_factor * snapshot.trained_size:
+            # Corpus outgrew the centroids (or value ranges) it was trained on
+            return True
+        # HNSW graphs do not support deletion
+        return removing and target == 'hnsw'
+
+    def _writable_copy(self, index):
+        if self.config.mmap:
+            # A mapped index is a read-only view (and so are its clones); read a private copy instead
+            copy = faiss.read_index(self.index_path)
+            tune_index(copy, nprobe=self.config.nprobe, ef_search=self.config.ef_search)
+            return copy
+        return faiss.clone_index(index)
+
+    def _commit(self, snapshot):
+        with stage_timer("index_save"):
+            self._write_snapshot(snapshot)
+        if self.embedding_cache is not None:
+            self.embedding_cache.save_if_due()
+        if snapshot.vectors is not None:
+            # Serve the source vectors from the page cache instead of the heap
+            chunks = ChunkStore.load(self.chunk_path)[0]
+            snapshot = snapshot._replace(vectors=np.load(self.vector_path, mmap_mode='r'), chunks=chunks,
+                                         lexical=LexicalIndex.load(self.lexical_path, docs=chunks))
+            if self.config.mmap:
+                index = read_index(self.index_path, snapshot.index_type, mmap=True)
+                tune_index(index, nprobe=self.config.nprobe, ef_search=self.config.ef_search)
+                snapshot = snapshot._replace(index=index)
+        generation = self._read_generation() + 1
+        atomic_write(self.generation_path, lambda tmp: self._write_generation(tmp, generation))
+        self._generation = generation
+        # Single reference assignment: readers see either the old or the new snapshot
+        self._snapshot = snapshot
+
+    @contextmanager
+    def _index_file_lock(self):
+        """Serialize writes and reloads with other worker processes using the same index files."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_generation(self):
+        try:
+            with open(self.generation_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @staticmethod
+    def _write_generation(path, generation):
+        with open(path, 'w') as f:
+            f.write(str(generation))
+
+    def _sync_locked(self):
+        # Another worker may have committed since this one last loaded; build on its version
+        if self._read_generation() != self._generation:
+            self._load_locked()
+
+    def reload_if_changed(self, force=False):
+        """
+        Reload the index if another process committed a newer generation.
+
+        Checks the generation file at most every reload_interval seconds unless force is set.
+        Returns True if a new index was loaded.
+        """
+        now = time.monotonic()
+        if not force and (self.reload_interval <= 0 or now < self._next_reload_check):
+            return False
+        self._next_reload_check = now + self.reload_interval
+        if self._read_generation() == self._generation:
+            return False
+        with self._write_lock, self._index_file_lock():
+            if self._read_generation() == self._generation:
+                return False
+            self._load_locked()
+            logger.info(f"Reloaded FAISS index generation {self._generation}.")
+            return True
+
+    def search(self, query, top_k=3, deck=None):
+        """
+        Return the top_k chunks for query as dicts with id, text, deck, slides and score.
+
+        slides is the chunk's (first_slide, last_slide) range, or None if it was indexed without one.
+        deck, if given, restricts the search to that deck's chunks.
+
+        The score is the negated squared L2 distance, so higher is better. sq8 / sq_fp16 indexes
+        measure it between normalized vectors, where it equals 2 * cosine - 2.
+        """
+        return self.search_batch([query], top_k=top_k, deck=deck)[0]
+
+    def search_batch(self, queries, top_k=3, deck=None):
+        """Search several queries with one encode call and one index.search call."""
+        if self._snapshot.index is None:
+            self.reload_if_changed()
+        if self._snapshot.index is None:
             raise ValueError("FAISS index not loaded. Please upload or process a PPT first.")
-        query_vec = self.model.encode([query], convert_to_numpy=True)
-        D, I = self.index.search(np.array(query_vec, dtype='float32'), top_k)
-        return [self.chunks[i] for i in I[0]]
+        return self.search_vectors(self.encode_queries(queries), top_k=top_k, deck=deck)
+
+    def encode_queries(self, queries):
+        """Embed queries as the float32 (n, dim) matrix search_vectors takes."""
+        return self._encode(list(queries))
+
+    def search_vectors(self, query_vecs, top_k=3, deck=None):
+        """search_batch for already-encoded queries. Returns [] per query while nothing is indexed."""
+        self.reload_if_changed()
+        snapshot = self._snapshot
+        if snapshot.index is None:
+            return [[] for _ in range(len(query_vecs))]
+        with stage_timer("index_search"):
+            if deck is not None:
+                D, I = self._search_deck(snapshot, query_vecs, top_k, deck)
+            elif snapshot.index_type in COMPRESSED_INDEX_TYPES and self.config.rerank > 0:
+                # Over-fetch from the compressed codes, then order the candidates by exact distance
+                _, candidates = snapshot.index.search(index_vectors(snapshot.index_type, query_vecs),
+                                                      max(top_k, self.config.rerank))
+                D, I = self._rerank(snapshot, query_vecs, candidates, top_k)
+            else:
+                D, I = snapshot.index.search(index_vectors(snapshot.index_type, query_vecs), top_k)
+                if snapshot.index_type in INNER_PRODUCT_INDEX_TYPES:
+                    D = 2 - 2 * D
+        # Only the hits are decoded from the chunk store
+        return [[{"id": int(i), **snapshot.chunks.lookup(int(i)), "score": -float(d)}
+                 for d, i in zip(distances, ids) if i != -1]
+                for distances, ids in zip(D, I)]
+
+    @staticmethod
+    def _rerank(snapshot, query_vecs, candidates, top_k):
+        """Exact distances for each query's candidate IDs; only their source vectors are read."""
+        D, I = [], []
+        for query, ids in zip(query_vecs, candidates):
+            ids = np.sort(ids[ids != -1])
+            # Sorted rows read the memory-mapped vectors file front to back
+            vectors = snapshot.vectors[np.searchsorted(snapshot.vector_ids, ids)]
+            distances = exact_distances(snapshot.index_type, query[None, :], vectors)[0]
+            order = np.argsort(distances, kind='stable')[:top_k]
+            D.append(distances[order])
+            I.append(ids[order])
+        return D, I
+
+    @staticmethod
+    def _search_deck(snapshot, query_vecs, top_k, deck):
+        """Exact search over one deck's source vectors; the rest of the corpus is never read."""
+        chunk_ids = snapshot.chunks.ids[snapshot.chunks.deck_rows(deck)]
+        if not len(chunk_ids):
+            return np.empty((len(query_vecs), 0), dtype='float32'), np.empty((len(query_vecs), 0), dtype='int64')
+        # vector_ids is ascending, and a deck's vectors are appended as one block
+        rows = np.searchsorted(snapshot.vector_ids, chunk_ids)
+        if rows[-1] - rows[0] + 1 == len(rows):
+            vectors = snapshot.vectors[rows[0]:rows[-1] + 1]
+        else:
+            vectors = snapshot.vectors[rows]
+        vectors = index_vectors(snapshot.index_type, np.ascontiguousarray(vectors, dtype='float32'))
+        D, I = faiss.knn(index_vectors(snapshot.index_type, query_vecs), vectors, min(top_k, len(rows)))
+        return D, chunk_ids[I]
+
+    def find_deck(self, name):
+        """
+        Return the indexed deck that name refers to, or None.
+
+        name may be the deck itself ("Chapter 1.pptx") or the embeddings file the UI lists
+        for it ("Chapter 1_embeddings.json").
+        """
+        decks = self._snapshot.chunks.deck_names
+        if name in decks:
+            return name
+        base = name[:-len('_embeddings.json')] if name.endswith('_embeddings.json') else os.path.splitext(name)[0]
+        return next((deck for deck in decks if os.path.splitext(deck)[0] == base), None)
+
+    def lexical_search(self, query, top_k=3, deck=None):
+        """
+        Return the top_k chunks for query by BM25 keyword score, as dicts shaped like search() hits.
+
+        Catches exact terms (acronyms, titles, numbers) that embeddings blur. deck, if given,
+        restricts the search to that deck's chunks.
+        """
+        self.reload_if_changed()
+        snapshot = self._snapshot
+        return [{"id": hit["id"], **snapshot.chunks.lookup(hit["id"]), "score": hit["score"]}
+                for hit in snapshot.lexical.search(query, top_k=top_k, source=deck)]
+
+    def retrieve(self, query, top_k=3):
+        return [hit["text"] for hit in self.search(query, top_k=top_k)]
 
     def save_index(self):
+        with self._write_lock, self._index_file_lock():
+            self._write_snapshot(self._snapshot)
+
+    def _write_snapshot(self, snapshot):
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
-        with open(self.chunk_path, 'wb') as f:
-            pickle.dump(self.chunks, f)
+        if snapshot.index is None:
+            for path in (self.index_path, self.vector_path, self.vector_ids_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            ChunkStore.remove(self.chunk_path)
+            LexicalIndex.remove(self.lexical_path)
+            return
+        atomic_write(self.vector_path, lambda tmp: save_npy(tmp, snapshot.vectors))
+        atomic_write(self.vector_ids_path, lambda tmp: save_npy(tmp, snapshot.vector_ids))
+        atomic_write(self.index_path, lambda tmp: faiss.write_index(snapshot.index, tmp))
+        snapshot.lexical.save(self.lexical_path, save_docs=False)
+        snapshot.chunks.save(self.chunk_path, next_id=snapshot.next_id, index_type=snapshot.index_type,
+                             trained_size=snapshot.trained_size)
 
     def load_index(self):
-        if os.path.exists(self.index_path) and os.path.exists(self.chunk_path):
-            self.index = faiss.read_index(self.index_path)
-            with open(self.chunk_path, 'rb') as f:
-                self.chunks = pickle.load(f)
+        """Load the index from disk and swap it in. Returns True if an index was found."""
+        with self._write_lock, self._index_file_lock():
+            return self._load_locked()
+
+    def _load_locked(self):
+        self._generation = self._read_generation()
+        legacy = not ChunkStore.exists(self.chunk_path)
+        if not os.path.exists(self.index_path) or (legacy and not os.path.exists(self.legacy_chunk_path)):
+            self._snapshot = EMPTY_SNAPSHOT
+            return False
+        if not legacy:
+            chunks, stored = ChunkStore.load(self.chunk_path)
+            index = read_index(self.index_path, stored.get("index_type", 'flat'), mmap=self.config.mmap)
+        else:
+            # Pickle registries from before the ChunkStore are converted once, then deleted
+            index = faiss.read_index(self.index_path)
+            with open(self.legacy_chunk_path, 'rb') as f:
+                stored = pickle.load(f)
+            if isinstance(stored, list):
+                stored = self._upgrade_legacy(index, stored)
+                index = stored["index"]
+            chunks = ChunkStore.from_dict(stored["chunks"], self._invert(stored["decks"]), stored.get("slides"))
+
+        if os.path.exists(self.vector_path) and os.path.exists(self.vector_ids_path):
+            vectors = np.load(self.vector_path, mmap_mode='r')
+            vector_ids = np.load(self.vector_ids_path)
+        else:
+            # Indexes written before vectors were persisted are flat, so they can be reconstructed
+            vectors = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+            vector_ids = faiss.vector_to_array(index.id_map).astype('int64')
+
+        lexical = self._load_lexical(chunks, save=not legacy)
+        snapshot = IndexSnapshot(index, stored.get("index_type", 'flat'), stored.get("trained_size", 0),
+                                 chunks, stored["next_id"], vectors, vector_ids, lexical)
+        rebuild = self._needs_rebuild(snapshot, len(vector_ids)) and len(vector_ids)
+        if rebuild:
+            # Configured index type changed (or the corpus outgrew its centroids) since the last write
+            index, index_type = build_index(self.config, np.ascontiguousarray(vectors), vector_ids)
+            trained_size = len(vector_ids) if index_type in RETRAINED_INDEX_TYPES else 0
+            snapshot = snapshot._replace(index=index, index_type=index_type, trained_size=trained_size)
+            logger.info(f"Rebuilt FAISS index as {index_type} over {len(vector_ids)} vectors.")
+        else:
+            tune_index(index, nprobe=self.config.nprobe, ef_search=self.config.ef_search)
+
+        if rebuild or legacy:
+            self._commit(snapshot)
+        else:
+            self._snapshot = snapshot
+        if legacy:
+            os.remove(self.legacy_chunk_path)
+            logger.info(f"Converted {self.legacy_chunk_path} to the chunk store format.")
+        return True
+
+    def _load_lexical(self, chunks, save=True):
+        try:
+            return LexicalIndex.load(self.lexical_path, docs=chunks)
+        except (FileNotFoundError, ValueError):
+            # Written before keyword search, or interrupted mid-write: index the chunks again
+            lexical = LexicalIndex.from_store(chunks)
+            if save:
+                lexical.save(self.lexical_path, save_docs=False)
+            logger.info(f"Built lexical index over {len(chunks)} chunks.")
+            return lexical
+
+    @staticmethod
+    def _invert(decks):
+        return {chunk_id: deck for deck, ids in decks.items() for chunk_id in ids}
+
+    @staticmethod
+    def _upgrade_legacy(index, chunks):
+        """Wrap a pre-registry IndexFlatL2 (positional chunk list) in an IndexIDMap2."""
+        ids = np.arange(len(chunks), dtype='int64')
+        id_index = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+        if len(chunks):
+            id_index.add_with_ids(index.reconstruct_n(0, index.ntotal), ids)
+        return {"index": id_index, "chunks": dict(zip(ids.tolist(), chunks)),
+                "decks": {DEFAULT_DECK: ids.tolist()}, "next_id": len(chunks)}
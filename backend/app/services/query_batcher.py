@@ -0,0 +1,133 @@
+import asyncio
+from app.config.settings import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS, QUERY_QUEUE_MAX
+from app.services.worker_pool import WorkerPoolFull
+from app.utils.logger import logger
+
+
+class QueryBatcher:
+    """
+    Coalesce concurrent retrieval calls into batched PPTRetriever.search_batch calls.
+
+    Queries that arrive within max_wait_ms of the first queued query (up to max_batch_size)
+    are encoded together and answered with a single index.search per deck scope; each caller
+    gets its own hits.
+    When traffic is idle (the previous batch held a single query) the wait is skipped, so a
+    lone client pays no batching latency; queries queued during a running batch still coalesce.
+
+    Batched searches, and the other query-side work callers hand to run(), execute on pool, a
+    bounded WorkerPool (the event loop's default executor without one).
+    """
+
+    def __init__(self, retriever, max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_MAX_WAIT_MS, pool=None,
+                 max_queue: int = QUERY_QUEUE_MAX):
+        self.retriever = retriever
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.pool = pool
+        self.max_queue = max_queue
+        self.batches = 0
+        self.queries = 0
+        self._queue = None
+        self._task = None
+        self._last_batch_size = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Query batcher stopped."))
+
+    async def search(self, query: str, top_k: int = 3, deck: str = None) -> list:
+        """
+        Queue a query and wait for its hits (see PPTRetriever.search; deck limits the search to one deck).
+
+        Raises:
+            WorkerPoolFull: If max_queue queries are already waiting.
+        """
+        if self._task is None:
+            raise RuntimeError("Query batcher is not running.")
+        if self._queue.qsize() >= self.max_queue:
+            raise WorkerPoolFull("query queue")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, top_k, deck, future))
+        return await future
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on the query pool and await its result.
+
+        Raises:
+            WorkerPoolFull: If the pool's workers and queue slots are all taken.
+        """
+        if self.pool is not None:
+            return await self.pool.run(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def retrieve(self, query: str, top_k: int = 3, deck: str = None) -> list:
+        return [hit["text"] for hit in await self.search(query, top_k=top_k, deck=deck)]
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        wait = self.max_wait if self._last_batch_size > 1 else 0.0
+        deadline = loop.time() + wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self._last_batch_size = len(batch)
+            scopes = {}
+            for entry in batch:
+                scopes.setdefault(entry[2], []).append(entry)
+            for deck, group in scopes.items():
+                await self._search_group(deck, group)
+            self.batches += 1
+            self.queries += len(batch)
+
+    async def _search_group(self, deck, group):
+        queries = [query for query, _, _, _ in group]
+        top_k = max(k for _, k, _, _ in group)
+        try:
+            results = await self.run(self.retriever.search_batch, queries, top_k, deck)
+        except Exception as e:
+            logger.error(f"Batched retrieval failed for {len(group)} queries: {e}")
+            for *_, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, k, _, future), hits in zip(group, results):
+            if not future.done():
+                future.set_result(hits[:k])
@@ -0,0 +1,313 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from app.config.settings import (
+    QUERY_CACHE_BACKEND, QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_MB, QUERY_CACHE_DB_PATH
+)
+from app.utils.logger import logger
+
+QUERY_CACHE_BACKENDS = ("memory", "sqlite", "none")
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer to a question."""
+    query = re.sub(r"\s+", " ", unicodedata.normalize("NFC", query)).strip().lower()
+    return query.rstrip("?!. ")
+
+
+def generation_is_older(stored: str, current: str) -> bool:
+    """
+    True if an entry stored under index generation stored can no longer be hit at current.
+
+    Generations are integers, or one per shard joined by "." (ShardedRetriever); a sharded
+    generation is older when no shard is ahead of current and at least one is behind. Anything
+    else, including the "" of index-independent entries, is never older: another worker may
+    still be serving it, so it is left to the TTL and LRU limits.
+    """
+    try:
+        old, new = [int(n) for n in stored.split(".")], [int(n) for n in current.split(".")]
+    except ValueError:
+        return False
+    return len(old) == len(new) and old != new and all(o <= n for o, n in zip(old, new))
+
+
+def _entry_size(key: str, value: str) -> int:
+    # Encoded bytes, so non-ASCII answers count against max_bytes at their real size
+    return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+
+class MemoryCacheBackend:
+    """In-process LRU store of serialized values, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, generation, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float):
+        """Return (value, expired); value is None on a miss or when the entry has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            if entry[2] <= now:
+                self._bytes -= _entry_size(key, self._entries.pop(key)[0])
+                return None, True
+            self._entries.move_to_end(key)
+            return entry[0], False
+
+    def put(self, key: str, value: str, generation: str, expires_at: float) -> int:
+        """Store value and evict least recently used entries over the limits. Returns the number evicted."""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _entry_size(key, old[0])
+            self._entries[key] = (value, generation, expires_at)
+            self._bytes += _entry_size(key, value)
+            evicted = 0
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                old_key, (old_value, _, _) = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(old_key, old_value)
+                evicted += 1
+            return evicted
+
+    def drop_generations_before(self, generation: str) -> int:
+        """Remove entries stored under index generations older than generation. Returns the number removed."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if generation_is_older(entry[1], generation)]
+            for key in stale:
+                self._bytes -= _entry_size(key, self._entries.pop(key)[0])
+            return len(stale)
+
+    def size(self) -> tuple:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def close(self):
+        pass
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+class SQLiteCacheBackend:
+    """
+    The same store in a SQLite file, so every uvicorn worker on the host shares one cache.
+
+    Recency is a last_used timestamp updated on every hit; eviction deletes the oldest rows.
+    """
+
+    def __init__(self, db_path: str, max_entries: int, max_bytes: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.create_function("generation_is_older", 2, generation_is_older, deterministic=True)
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, False
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None, True
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            return row[0], False
+
+    def put(self, key: str, value: str, generation: str, expires_at: float) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, generation, size, expires_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, value, generation, _entry_size(key, value), expires_at, time.time()))
+                evicted = self._evict_locked()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return evicted
+
+    def _evict_locked(self) -> int:
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return 0
+        evicted = 0
+        # Walk the least recently used rows until both limits hold
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count, total, evicted = count - 1, total - size, evicted + 1
+        return evicted
+
+    def drop_generations_before(self, generation: str) -> int:
+        # Only older generations: a worker that has not reloaded yet still serves its own entries
+        with self._lock:
+            return self._conn.execute("DELETE FROM entries WHERE generation_is_older(generation, ?)",
+                                      (generation,)).rowcount
+
+    def size(self) -> tuple:
+        with self._lock:
+            return tuple(self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone())
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QueryCache:
+    """
+    TTL + LRU cache of JSON-serializable results for repeated questions.
+
+    Keys are (normalized query, scope, index generation). scope holds everything else the result
+    depends on (mode, deck, top_k, ...). Results that do not depend on the index, such as a Gemini
+    answer keyed by a hash of its context, use generation "".
+
+    When a lookup arrives with a new generation, entries from older generations are dropped:
+    they could never be hit again, so they would only take space until they aged out. Entries
+    from newer generations are kept, since workers sharing a SQLite backend reload at different
+    times.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, scope, generation) -> str:
+        raw = json.dumps([normalize_query(query), scope, str(generation)], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _observe(self, generation):
+        generation = str(generation)
+        if generation == "" or generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            first = self._generation is None
+            self._generation = generation
+        dropped = self.backend.drop_generations_before(generation)
+        with self._lock:
+            self.invalidations += dropped
+        if dropped and not first:
+            logger.info(f"Query cache: dropped {dropped} entries from before index generation {generation}.")
+
+    def get(self, query: str, scope, generation=""):
+        """Return the cached value, or None on a miss."""
+        self._observe(generation)
+        value, expired = self.backend.get(self.key(query, scope, generation), time.time())
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self.expirations += expired
+            else:
+                self.hits += 1
+        return None if value is None else json.loads(value)
+
+    def put(self, query: str, scope, value, generation=""):
+        self._observe(generation)
+        evicted = self.backend.put(self.key(query, scope, generation), json.dumps(value),
+                                   str(generation), time.time() + self.ttl_seconds)
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        self.backend.clear()
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self) -> dict:
+        entries, size = self.backend.size()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": entries,
+                "max_entries": self.backend.max_entries,
+                "bytes": size,
+                "max_bytes": self.backend.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+def create_query_cache(backend: str = QUERY_CACHE_BACKEND, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                       max_mb: float = QUERY_CACHE_MAX_MB, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS,
+                       db_path: str = QUERY_CACHE_DB_PATH):
+    """
+    Build a QueryCache from settings, or return None if caching is off.
+
+    Raises:
+        ValueError: If backend is not one of QUERY_CACHE_BACKENDS.
+    """
+    if backend not in QUERY_CACHE_BACKENDS:
+        raise ValueError(f"Unknown query cache backend '{backend}'; expected one of {', '.join(QUERY_CACHE_BACKENDS)}.")
+    if backend == "none" or max_entries <= 0 or ttl_seconds <= 0:
+        return None
+    max_bytes = int(max_mb * 1024 * 1024)
+    if backend == "sqlite":
+        return QueryCache(SQLiteCacheBackend(db_path, max_entries, max_bytes), ttl_seconds)
+    return QueryCache(MemoryCacheBackend(max_entries, max_bytes), ttl_seconds)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """Return the process-wide QueryCache shared by chat retrieval and the Gemini answer path."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = create_query_cache() or False
+        return _default_cache or None
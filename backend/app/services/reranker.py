@@ -0,0 +1,135 @@
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from sentence_transformers import CrossEncoder
+from app.config.settings import (
+    RERANK_MODEL, RERANK_CANDIDATES, RERANK_BATCH_SIZE, RERANK_BUDGET_MS, RERANK_CACHE_ENTRIES
+)
+from app.services.query_cache import normalize_query
+
+# Loaded CrossEncoder models, shared by every reranker in the process
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_cross_encoder(model_name=RERANK_MODEL):
+    """Return the process-wide CrossEncoder for model_name, loading it on first use."""
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = CrossEncoder(model_name)
+            _models[model_name] = model
+        return model
+
+
+class Reranker:
+    """
+    Re-order retrieved chunks by a cross-encoder's relevance score for (question, chunk) pairs.
+
+    Pairs are scored best-retrieved first, in batches, within a per-request time budget (0 for
+    none): once the next batch is predicted to overrun it, the remaining candidates keep their
+    retrieval order behind the scored ones. Scores are cached per (normalized question, chunk ID).
+    """
+
+    def __init__(self, model=None, model_name: str = RERANK_MODEL, candidates: int = RERANK_CANDIDATES,
+                 batch_size: int = RERANK_BATCH_SIZE, budget_ms: float = RERANK_BUDGET_MS,
+                 cache_entries: int = RERANK_CACHE_ENTRIES):
+        self.model = model or get_cross_encoder(model_name)
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_entries = cache_entries
+        # (question, chunk ID, text checksum) -> score, least recently used first
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Running estimate of the model's cost per pair, used to size batches to the budget
+        self.pair_ms = None
+        self.requests = 0
+        self.scored = 0
+        self.cache_hits = 0
+        self.truncated = 0
+
+    @staticmethod
+    def _key(query: str, hit: dict) -> tuple:
+        # The checksum keeps a score from following a chunk ID to different text
+        return query, hit.get("id"), zlib.crc32(hit["text"].encode("utf-8"))
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, scores: dict):
+        if self.cache_entries <= 0:
+            return
+        with self._lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query: str, hits: list, top_k: int = 3) -> tuple:
+        """
+        Re-order the first self.candidates hits by cross-encoder score and return the top_k.
+
+        Args:
+            query (str): The user question.
+            hits (list): Retrieved chunks best first, shaped like PPTRetriever.search hits.
+            top_k (int): Number of hits to return.
+
+        Returns:
+            tuple: (hits, info). Scored hits carry "rerank_score" and come first, best first;
+                info holds "ms", "budget_ms", "candidates", "scored" (by the model), "cached"
+                and "truncated" (whether the budget left candidates unscored).
+        """
+        start = time.perf_counter()
+        question = normalize_query(query)
+        candidates = hits[:self.candidates]
+        keys = [self._key(question, hit) for hit in candidates]
+        scores = {key: score for key in keys if (score := self._cached(key)) is not None}
+        cached = len(scores)
+        # Score in retrieval order, so a budget cut drops the least promising candidates
+        pending = list(dict.fromkeys(key for key, hit in zip(keys, candidates) if key not in scores))
+        texts = {key: hit["text"] for key, hit in zip(keys, candidates)}
+        new_scores = {}
+        while pending:
+            size = self.batch_size
+            if self.budget_ms > 0:
+                remaining_ms = self.budget_ms - (time.perf_counter() - start) * 1000
+                if self.pair_ms:
+                    size = min(size, int(remaining_ms / self.pair_ms))
+                if size <= 0 or remaining_ms <= 0:
+                    break
+            batch, pending = pending[:size], pending[size:]
+            batch_start = time.perf_counter()
+            predicted = self.model.predict([(query, texts[key]) for key in batch], batch_size=len(batch),
+                                           show_progress_bar=False)
+            per_pair = (time.perf_counter() - batch_start) * 1000 / len(batch)
+            with self._lock:
+                self.pair_ms = per_pair if self.pair_ms is None else 0.8 * self.pair_ms + 0.2 * per_pair
+            new_scores.update(zip(batch, (float(score) for score in predicted)))
+        self._store(new_scores)
+        scores.update(new_scores)
+
+        scored = sorted((i for i, key in enumerate(keys) if key in scores), key=lambda i: -scores[keys[i]])
+        unscored = [i for i, key in enumerate(keys) if key not in scores]
+        ranked = [{**candidates[i], "rerank_score": scores[keys[i]]} for i in scored]
+        ranked += [candidates[i] for i in unscored] + hits[self.candidates:]
+        # Requests are re-ranked on several query pool threads at once
+        with self._lock:
+            self.requests += 1
+            self.scored += len(new_scores)
+            self.cache_hits += cached
+            self.truncated += bool(unscored)
+        info = {"ms": round((time.perf_counter() - start) * 1000, 2), "budget_ms": self.budget_ms,
+                "candidates": len(candidates), "scored": len(new_scores), "cached": cached,
+                "truncated": bool(unscored)}
+        return ranked[:top_k], info
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "scored": self.scored, "cache_hits": self.cache_hits,
+                    "truncated": self.truncated, "cache_entries": len(self._cache),
+                    "pair_ms": round(self.pair_ms, 3) if self.pair_ms else None}
@@ -0,0 +1,256 @@
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import EMBEDDINGS_DIR, INDEX_SHARDS, EMBEDDING_CACHE_MAX_ENTRIES
+from app.services.embedding_cache import EmbeddingCache
+from app.services.ppt_retriever import PPTRetriever, IndexConfig, DEFAULT_MODEL_NAME, get_embedding_model
+from app.utils.logger import logger
+
+
+def shard_for(deck: str, n_shards: int) -> int:
+    """Home shard of a deck: a stable hash, so every worker process routes a deck the same way."""
+    return zlib.crc32(deck.encode('utf-8')) % n_shards
+
+
+def merge_top_k(shard_hits, top_k: int) -> list:
+    """Merge per-shard hit lists into the overall top_k by score (higher is better)."""
+    return heapq.nlargest(top_k, (hit for hits in shard_hits for hit in hits), key=lambda hit: hit["score"])
+
+
+def create_retriever(n_shards=INDEX_SHARDS):
+    """
+    Return the process-wide retriever: a PPTRetriever, or a ShardedRetriever when n_shards > 1.
+
+    Switching to shards moves the decks of an existing single index into them (vectors are
+    copied, not re-encoded) and leaves the single index empty; switching back to one index
+    moves the shards' decks back into it the same way.
+    """
+    if n_shards <= 1:
+        retriever = PPTRetriever()
+        collapse_shards(retriever)
+        return retriever
+    retriever = ShardedRetriever(n_shards)
+    if os.path.exists(os.path.join(EMBEDDINGS_DIR, 'faiss.index')):
+        retriever.migrate(PPTRetriever(model_name=retriever.model_name, model=retriever.model,
+                                       config=retriever.config, embedding_cache=retriever.embedding_cache))
+    return retriever
+
+
+def collapse_shards(single, index_dir=None) -> int:
+    """
+    Move every deck of the shards in index_dir into the single-index PPTRetriever single,
+    emptying the shards (the reverse of ShardedRetriever.migrate).
+
+    Args:
+        single (PPTRetriever): The index the decks move into.
+        index_dir (str, optional): Directory of the shards (default: EMBEDDINGS_DIR/shards).
+
+    Returns:
+        int: How many decks were moved.
+    """
+    index_dir = index_dir or os.path.join(EMBEDDINGS_DIR, 'shards')
+    moved, shard_no = 0, 0
+    while os.path.exists(os.path.join(index_dir, f'shard{shard_no}', 'faiss.index')):
+        shard = PPTRetriever(model_name=single.model_name,
+                             index_path=os.path.join(index_dir, f'shard{shard_no}', 'faiss.index'),
+                             chunk_path=os.path.join(index_dir, f'shard{shard_no}', 'faiss_chunks'),
+                             model=single.model, config=single.config, embedding_cache=single.embedding_cache)
+        for deck in list(shard.list_decks()):
+            texts, slide_ranges, vectors = shard.export_deck(deck)
+            if texts:
+                single.add_deck(deck, texts, slide_ranges, embeddings=vectors)
+            shard.remove_deck(deck)
+            moved += 1
+        shard_no += 1
+    if moved:
+        logger.info(f"Moved {moved} decks from {shard_no} shards back into {single.index_path}.")
+    return moved
+
+
+class ShardedRetriever:
+    """
+    A PPTRetriever split into N independent shards, with the same interface.
+
+    Every deck lives in exactly one shard, picked by shard_for, so an upload or removal rewrites
+    only that shard's files. Queries are encoded once and searched on every non-empty shard in
+    parallel (FAISS releases the GIL during search), then merged with a heap-based top-k.
+    A deck-scoped query only touches the deck's shard.
+
+    Chunk IDs are made global as local_id * n_shards + shard.
+    """
+
+    def __init__(self,
+                 n_shards=INDEX_SHARDS,
+                 model_name=DEFAULT_MODEL_NAME,
+                 index_dir=None,
+                 model=None,
+                 config=None,
+                 embedding_cache=None):
+        if n_shards < 1:
+            raise ValueError(f"n_shards must be at least 1, got {n_shards}.")
+        self.n_shards = n_shards
+        self.model_name = model_name
+        self.model = model or get_embedding_model(model_name)
+        self.config = config or IndexConfig()
+        self.index_dir = index_dir or os.path.join(EMBEDDINGS_DIR, 'shards')
+        if embedding_cache is None and EMBEDDING_CACHE_MAX_ENTRIES > 0:
+            embedding_cache = EmbeddingCache(model_name, os.path.join(self.index_dir, 'embedding_cache.npz'))
+        self.embedding_cache = embedding_cache
+        self.shards = [
+            PPTRetriever(model_name=model_name,
+                         index_path=os.path.join(self.index_dir, f'shard{i}', 'faiss.index'),
+                         chunk_path=os.path.join(self.index_dir, f'shard{i}', 'faiss_chunks'),
+                         model=self.model, config=self.config, embedding_cache=embedding_cache)
+            for i in range(n_shards)
+        ]
+        self.executor = ThreadPoolExecutor(max_workers=n_shards, thread_name_prefix="shard")
+        self._rebalance()
+
+    def shard_of(self, deck):
+        return self.shards[shard_for(deck, self.n_shards)]
+
+    def _global_id(self, shard_no, local_id):
+        return int(local_id) * self.n_shards + shard_no
+
+    def _globalize(self, shard_no, hits):
+        return [{**hit, "id": self._global_id(shard_no, hit["id"])} for hit in hits]
+
+    def _fan_out(self, fn, shard_nos):
+        """Run fn(shard_no) on the given shards in parallel. Returns results in shard_nos order."""
+        shard_nos = list(shard_nos)
+        if len(shard_nos) == 1:
+            return [fn(shard_nos[0])]
+        return list(self.executor.map(fn, shard_nos))
+
+    def _move_deck(self, source, deck):
+        """Move one deck's chunks and vectors into its home shard without re-encoding them."""
+        texts, slide_ranges, vectors = source.export_deck(deck)
+        if texts:
+            self.shard_of(deck).add_deck(deck, texts, slide_ranges, embeddings=vectors)
+        source.remove_deck(deck)
+
+    def _rebalance(self):
+        """Move decks found outside their home shard (after n_shards changed) into it."""
+        for shard_no, shard in enumerate(self.shards):
+            for deck in list(shard.list_decks()):
+                if shard_for(deck, self.n_shards) != shard_no:
+                    self._move_deck(shard, deck)
+        # Shards beyond n_shards, left by a larger setting, are drained too
+        extra = self.n_shards
+        while os.path.exists(os.path.join(self.index_dir, f'shard{extra}', 'faiss.index')):
+            old = PPTRetriever(model_name=self.model_name,
+                               index_path=os.path.join(self.index_dir, f'shard{extra}', 'faiss.index'),
+                               chunk_path=os.path.join(self.index_dir, f'shard{extra}', 'faiss_chunks'),
+                               model=self.model, config=self.config, embedding_cache=self.embedding_cache)
+            decks = list(old.list_decks())
+            for deck in decks:
+                self._move_deck(old, deck)
+            if decks:
+                logger.info(f"Moved {len(decks)} decks out of retired shard {extra}.")
+            extra += 1
+
+    def migrate(self, legacy):
+        """Move every deck of a single-index PPTRetriever into the shards, emptying it."""
+        decks = list(legacy.list_decks())
+        for deck in decks:
+            self._move_deck(legacy, deck)
+        if decks:
+            logger.info(f"Migrated {len(decks)} decks from {legacy.index_path} into {self.n_shards} shards.")
+
+    @property
+    def generation(self):
+        """Shard generations joined, e.g. "3.1.4"; changes whenever any shard is written."""
+        return ".".join(str(shard.generation) for shard in self.shards)
+
+    def stats(self):
+        """Corpus size and embedding cache counters, with per-shard sizes."""
+        shard_stats = [shard.stats() for shard in self.shards]
+        return {
+            "index_type": self.config.index_type,
+            "num_chunks": sum(s["num_chunks"] for s in shard_stats),
+            "num_decks": sum(s["num_decks"] for s in shard_stats),
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+            "shards": [{"index_type": s["index_type"], "num_chunks": s["num_chunks"], "num_decks": s["num_decks"]}
+                       for s in shard_stats],
+        }
+
+    def add_deck(self, deck, text_chunks, slide_ranges=None, embeddings=None):
+        """
+        Index a deck's chunks in its home shard, replacing any chunks previously indexed for it.
+
+        Returns:
+            list: Global chunk IDs assigned to the deck.
+        """
+        shard_no = shard_for(deck, self.n_shards)
+        local_ids = self.shards[shard_no].add_deck(deck, text_chunks, slide_ranges, embeddings)
+        return [self._global_id(shard_no, i) for i in local_ids]
+
+    def remove_deck(self, deck):
+        """Remove a deck from its shard. Returns the number of chunks removed."""
+        return self.shard_of(deck).remove_deck(deck)
+
+    def list_decks(self):
+        """Return {deck: chunk_count} for every indexed deck."""
+        decks = {}
+        for shard in self.shards:
+            decks.update(shard.list_decks())
+        return decks
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        for shard in self.shards:
+            shard.set_search_params(nprobe=nprobe, ef_search=ef_search)
+
+    def reload_if_changed(self, force=False):
+        return any([shard.reload_if_changed(force) for shard in self.shards])
+
+    def find_deck(self, name):
+        """Return the indexed deck that name refers to, or None (see PPTRetriever.find_deck)."""
+        return next((deck for deck in (shard.find_deck(name) for shard in self.shards) if deck), None)
+
+    def search(self, query, top_k=3, deck=None):
+        """Return the top_k chunks for query across all shards (see PPTRetriever.search)."""
+        return self.search_batch([query], top_k=top_k, deck=deck)[0]
+
+    def search_batch(self, queries, top_k=3, deck=None):
+        """Encode queries once, search every shard in parallel and merge the per-shard top_k."""
+        for shard in self.shards:
+            shard.reload_if_changed()
+        if deck is not None:
+            shard_nos = [shard_for(deck, self.n_shards)]
+        else:
+            shard_nos = [n for n, shard in enumerate(self.shards) if shard.index is not None]
+            if not shard_nos:
+                raise ValueError("FAISS index not loaded. Please upload or process a PPT first.")
+        query_vecs = self.shards[0].encode_queries(queries)
+
+        def search_shard(shard_no):
+            return [self._globalize(shard_no, hits)
+                    for hits in self.shards[shard_no].search_vectors(query_vecs, top_k, deck)]
+        per_shard = self._fan_out(search_shard, shard_nos)
+        return [merge_top_k(hits, top_k) for hits in zip(*per_shard)]
+
+    def lexical_search(self, query, top_k=3, deck=None):
+        """
+        Return the top_k chunks for query by BM25 score across shards (see PPTRetriever.lexical_search).
+
+        Each shard scores against its own term statistics, which stay close to the corpus-wide
+        ones once shards hold more than a handful of decks.
+        """
+        if deck is not None:
+            shard_nos = [shard_for(deck, self.n_shards)]
+        else:
+            shard_nos = [n for n, shard in enumerate(self.shards) if len(shard.chunks)]
+        per_shard = self._fan_out(
+            lambda n: self._globalize(n, self.shards[n].lexical_search(query, top_k, deck)), shard_nos)
+        return merge_top_k(per_shard, top_k)
+
+    def retrieve(self, query, top_k=3):
+        return [hit["text"] for hit in self.search(query, top_k=top_k)]
+
+    def close(self):
+        self.executor.shutdown()
+        # Shards share one cache; index commits leave up to save_every new entries unsaved
+        if self.embedding_cache is not None:
+            self.embedding_cache.save()
+
@@ -1,74 +1,99 @@
 import os
 import json
-from app.config.settings import EXTRACTED_TEXT_DIR, EMBEDDINGS_DIR
+import numpy as np
+from app.config.settings import EXTRACTED_TEXT_DIR, EMBEDDINGS_DIR, LEXICAL_INDEX_PATH, EMBED_BATCH_SIZE
+from app.services.chunker import chunk_records
+from app.services.lexical_index import LexicalIndex, index_source, split_sentences, update_lexical_index
+from app.services.ppt_loader import SlideRecord, load_slide_records
+from app.services.ppt_retriever import DEFAULT_MODEL_NAME, get_embedding_model
+from app.utils.file_utils import atomic_write, save_npy
 from app.utils.logger import logger
+from app.utils.metrics import stage_timer
 
 # === Ensure embeddings folder exists ===
 os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
 
-def create_dummy_embeddings(text: str) -> dict:
+# Manifest format written by save_embeddings; files without one are the older
+# {"text", "embedding"} JSON, which load_embeddings still reads
+MANIFEST_FORMAT = 2
+VECTOR_DTYPE = "float16"
+
+
+def _vectors_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".npy"
+
+
+def chunk_text(text: str, filename_base: str) -> list:
     """
-    Example placeholder: converts text into dummy embeddings.
-    Replace this with real Gemini embeddings later.
+    Split an extracted text into retrieval chunks.
+
+    Uses the deck's <filename_base>.slides.jsonl records when extraction saved them, so chunks
+    keep their slide ranges; otherwise each line of text is a shape on an unknown slide (0).
+
+    Returns:
+        list: Chunk tuples in document order.
     """
-    # TODO: Replace this with Gemini or OpenAI embedding API call for real semantic search
-    embedding = [ord(c) for c in text[:50]]  # simple example: convert chars to numbers
-    return {"text": text, "embedding": embedding}
-
-# --- Example for real Gemini embedding integration (not yet active) ---
-# from app.config.settings import GEMINI_API_KEY, EMBEDDING_MODEL
-# import requests
-# def create_gemini_embeddings(text: str) -> dict:
-#     """
-#     Call Gemini embedding API to get real embeddings for the text.
-#     """
-#     if not GEMINI_API_KEY:
-#         raise RuntimeError("GEMINI_API_KEY not set")
-#     model = EMBEDDING_MODEL or 'models/embedding-001'  # update as needed
-#     url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:embedText"
-#     headers = {"Content-Type": "application/json"}
-#     params = {"key": GEMINI_API_KEY}
-#     data = {"text": text}
-#     resp = requests.post(url, headers=headers, params=params, json=data, timeout=10)
-#     resp.raise_for_status()
-#     result = resp.json()
-#     # Parse embedding from result as needed
-#     return {"text": text, "embedding": result.get("embedding", [])}
+    records_path = os.path.join(EXTRACTED_TEXT_DIR, f"{filename_base}.slides.jsonl")
+    if os.path.exists(records_path):
+        records = load_slide_records(records_path)
+    else:
+        records = [SlideRecord(filename_base, 0, "text", "text", "body", line)
+                   for line in text.splitlines() if line.strip()]
+    return chunk_records(records)
 
 
 def save_embeddings(filename: str, embeddings: dict) -> str:
     """
-    Save embeddings dictionary to a JSON file.
+    Save chunk embeddings as <name>.npy (float16) next to the <name>.json manifest.
+
+    The vectors are written first, so a manifest on disk always has its vectors.
 
     Args:
-        filename (str): Name of the embeddings file
-        embeddings (dict): Dictionary mapping text chunks to embeddings
+        filename (str): Name of the manifest file (<deck>_embeddings.json)
+        embeddings (dict): "chunks" (texts), "slides" ((first, last) per chunk), "embeddings"
+            ((n, dim) array) and "model" (name of the model that encoded them)
 
     Returns:
-        str: Path of saved embeddings file
+        str: Path of the saved manifest ("" on failure)
     """
     try:
         filepath = os.path.join(EMBEDDINGS_DIR, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(embeddings, f, ensure_ascii=False, indent=4)
-        logger.info(f"Saved embeddings: {filename}")
+        vectors = np.asarray(embeddings["embeddings"], dtype=VECTOR_DTYPE)
+        vectors_name = _vectors_filename(filename)
+        atomic_write(os.path.join(EMBEDDINGS_DIR, vectors_name), lambda tmp: save_npy(tmp, vectors))
+        manifest = {"format": MANIFEST_FORMAT, "model": embeddings.get("model"), "dim": int(vectors.shape[1]),
+                    "dtype": VECTOR_DTYPE, "vectors": vectors_name, "chunks": list(embeddings["chunks"]),
+                    "slides": [list(pair) for pair in embeddings.get("slides") or []]}
+
+        def write_manifest(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+
+        atomic_write(filepath, write_manifest)
+        # Imported here: the catalog reads manifests through this module
+        from app.services.embeddings_catalog import invalidate_embeddings_file
+        invalidate_embeddings_file(filename)
+        logger.info(f"Saved embeddings: {filename} ({len(vectors)} chunks)")
         return filepath
     except Exception as e:
         logger.error(f"Failed to save embeddings for {filename}: {e}")
         return ""
 
 
-def load_embeddings(filename: str) -> dict:
+def load_embeddings(filename: str, embeddings_dir: str = None) -> dict:
     """
-    Load embeddings from a JSON file.
+    Load an embeddings manifest, with its vectors memory-mapped rather than read.
 
     Args:
         filename (str): Name of embeddings file to load
+        embeddings_dir (str, optional): Directory holding it (default: EMBEDDINGS_DIR)
 
     Returns:
-        dict: Embeddings dictionary
+        dict: The manifest plus "embeddings" (read-only float16 (n, dim) memmap); older JSON
+            embeddings files are returned as stored. {} if the file is missing or unreadable.
     """
-    filepath = os.path.join(EMBEDDINGS_DIR, filename)
+    embeddings_dir = embeddings_dir or EMBEDDINGS_DIR
+    filepath = os.path.join(embeddings_dir, filename)
     if not os.path.exists(filepath):
         logger.warning(f"Embeddings file does not exist: {filename}")
         return {}
@@ -76,6 +101,8 @@ def load_embeddings(filename: str) -> dict:
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             embeddings = json.load(f)
+        if isinstance(embeddings, dict) and embeddings.get("format") == MANIFEST_FORMAT:
+            embeddings["embeddings"] = np.load(os.path.join(embeddings_dir, embeddings["vectors"]), mmap_mode="r")
         logger.info(f"Loaded embeddings: {filename}")
         return embeddings
     except Exception as e:
@@ -83,51 +110,140 @@ def load_embeddings(filename: str) -> dict:
         return {}
 
 
-def process_text_for_embeddings(text: str, filename_base: str) -> str:
+def embed_texts(texts: dict, model=None, model_name: str = DEFAULT_MODEL_NAME,
+                batch_size: int = EMBED_BATCH_SIZE) -> dict:
+    """
+    Chunk and encode several extracted texts together, and save one embeddings file per text.
+
+    All chunks go through a single encode call, so the model sees full batches even when each
+    deck is small.
+
+    Args:
+        texts (dict): {filename_base: extracted text}
+        model: SentenceTransformer-like encoder (default: the shared model_name model)
+        model_name (str): Name recorded in the manifests
+        batch_size (int): Chunks per model forward pass
+
+    Returns:
+        dict: {filename_base: path of the saved embeddings file ("" on failure)}
+    """
+    chunked = {base: chunk_text(text, base) for base, text in texts.items()}
+    all_chunks = [chunk.text for chunks in chunked.values() for chunk in chunks]
+    if not all_chunks:
+        return {base: "" for base in texts}
+    model = model or get_embedding_model(model_name)
+    with stage_timer("encode"):
+        vectors = np.asarray(model.encode(all_chunks, batch_size=batch_size, convert_to_numpy=True,
+                                          show_progress_bar=len(all_chunks) > batch_size), dtype="float32")
+    logger.info(f"Encoded {len(all_chunks)} chunks from {len(texts)} texts")
+
+    paths, start = {}, 0
+    for base, chunks in chunked.items():
+        if not chunks:
+            paths[base] = ""
+            continue
+        filename = f"{base}_embeddings.json"
+        paths[base] = save_embeddings(filename, {
+            "chunks": [chunk.text for chunk in chunks],
+            "slides": [(chunk.slide_start, chunk.slide_end) for chunk in chunks],
+            "embeddings": vectors[start:start + len(chunks)], "model": model_name})
+        start += len(chunks)
+    return paths
+
+
+def process_text_for_embeddings(text: str, filename_base: str, model=None) -> str:
     """
     Process a single text string and save its embeddings.
 
     Args:
         text (str): The extracted text from the PPT
         filename_base (str): Base name of the PPT file (without extension)
+        model: Encoder to use instead of the shared sentence-transformers model
 
     Returns:
-        str: Path to the saved embeddings JSON file
+        str: Path to the saved embeddings manifest
     """
     try:
-        # Generate dummy embeddings (replace later with real Gemini embeddings)
-        embeddings = create_dummy_embeddings(text)
-
-        # Define output filename
-        filename = f"{filename_base}_embeddings.json"
-
-        # Save embeddings to disk
-        emb_path = save_embeddings(filename, embeddings)
+        emb_path = embed_texts({filename_base: text}, model=model)[filename_base]
         logger.info(f"Embeddings generated and saved for {filename_base}")
 
+        # Keep the lexical index used by the generator in step with the embeddings files
+        if emb_path:
+            index_source(os.path.basename(emb_path), text, LEXICAL_INDEX_PATH)
+
         return emb_path
     except Exception as e:
         logger.error(f"Error generating embeddings for {filename_base}: {e}")
         return ""
 
 
-def process_all_texts():
+def _is_current(manifest_path: str, txt_path: str) -> bool:
+    """Whether manifest_path is a MANIFEST_FORMAT manifest at least as new as the text it embeds."""
+    if not os.path.exists(manifest_path) or os.path.getmtime(manifest_path) < os.path.getmtime(txt_path):
+        return False
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("format") == MANIFEST_FORMAT
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def process_all_texts(model=None) -> dict:
     """
-    Process all .txt files in extracted_texts/ and save embeddings
+    Embed every .txt file in extracted_texts/ whose embeddings are missing, older than it or
+    in an earlier format (such as the {"text", "embedding"} placeholders).
+
+    Returns:
+        dict: {filename_base: path of the saved embeddings file}
     """
     txt_files = [f for f in os.listdir(EXTRACTED_TEXT_DIR) if f.endswith(".txt")]
     if not txt_files:
         logger.warning("No .txt files found in extracted_texts/")
-        return
+        return {}
 
-    for txt_file in txt_files:
+    texts = {}
+    for txt_file in sorted(txt_files):
         txt_path = os.path.join(EXTRACTED_TEXT_DIR, txt_file)
+        base = os.path.splitext(txt_file)[0]
+        manifest = os.path.join(EMBEDDINGS_DIR, f"{base}_embeddings.json")
+        if _is_current(manifest, txt_path):
+            continue
         with open(txt_path, "r", encoding="utf-8") as f:
-            text = f.read()
-        embeddings = create_dummy_embeddings(text)
-        save_embeddings(txt_file.replace(".txt", "_embeddings.json"), embeddings)
+            texts[base] = f.read()
+
+    paths = embed_texts(texts, model=model) if texts else {}
+    rebuild_lexical_index()
+    logger.info(f"All text files processed: {len(paths)} embeddings files written, "
+                f"{len(txt_files) - len(texts)} up to date")
+    return paths
+
 
-    logger.info("All text files processed and embeddings saved!")
+def embeddings_text(embeddings) -> str:
+    """Return the document text stored in a loaded embeddings file."""
+    if isinstance(embeddings, dict):
+        if "chunks" in embeddings:
+            return "\n".join(embeddings["chunks"])
+        return embeddings.get('text', '')
+    return str(embeddings)
+
+
+def rebuild_lexical_index(embeddings_dir: str = None, base_path: str = None) -> int:
+    """
+    Rebuild the lexical index from every *_embeddings.json file in one pass.
+
+    Args:
+        embeddings_dir (str, optional): Directory of the embeddings files (default: EMBEDDINGS_DIR)
+        base_path (str, optional): Lexical index to replace (default: LEXICAL_INDEX_PATH)
+
+    Returns:
+        int: Number of sentences indexed.
+    """
+    embeddings_dir = embeddings_dir or EMBEDDINGS_DIR
+    filenames = sorted(f for f in os.listdir(embeddings_dir) if f.endswith("_embeddings.json"))
+    sources = {fname: split_sentences(embeddings_text(load_embeddings(fname, embeddings_dir))) for fname in filenames}
+    index = update_lexical_index(lambda _: LexicalIndex.build(sources), base_path or LEXICAL_INDEX_PATH)
+    logger.info(f"Lexical index rebuilt: {len(index)} sentences from {len(filenames)} embeddings files")
+    return len(index)
 
 
 # === Run automatically if executed directly ===
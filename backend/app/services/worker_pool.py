@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import RETRY_AFTER_SECONDS
+
+
+class WorkerPoolFull(Exception):
+    """Raised when a bounded pool or queue is at capacity; routes answer 503 with Retry-After."""
+
+    def __init__(self, name: str, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__(f"{name} is busy, retry in {retry_after}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    Thread pool with a hard cap on outstanding jobs.
+
+    At most max_workers jobs run and at most max_queue wait; further submissions raise
+    WorkerPoolFull instead of queueing without bound. Threads suit this app's CPU work:
+    model.encode and FAISS release the GIL, and the index lives in this process.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = RETRY_AFTER_SECONDS):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def is_full(self) -> bool:
+        return self._pending >= self.capacity
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise WorkerPoolFull(self.name, self.retry_after)
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        self._acquire()
+        try:
+            future = self.executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        # Released when the job finishes, even if the awaiting request goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "pending": self._pending,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
@@ -1,7 +1,12 @@
 import os
 import shutil
+import hashlib
+import tempfile
+import numpy as np
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
+from app.config.settings import MAX_UPLOAD_SIZE_MB, UPLOAD_CHUNK_SIZE
 from app.utils.logger import logger
 
 
@@ -47,6 +52,88 @@ def save_uploaded_ppt(file: UploadFile, upload_dir: str) -> str:
         raise
 
 
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit.")
+        self.max_bytes = max_bytes
+
+
+async def stream_upload_to_disk(file: UploadFile, upload_dir: str,
+                                max_bytes: int = MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+                                chunk_size: int = UPLOAD_CHUNK_SIZE) -> dict:
+    """
+    Stream an uploaded file to a temp file in upload_dir, hashing and size-checking as it goes.
+
+    Only one chunk is held in memory at a time. The temp file is removed if the upload is
+    too large or fails; call commit_upload to move it into place.
+
+    Args:
+        file (UploadFile): Uploaded file object.
+        upload_dir (str): Directory for the temp file (same filesystem as the final path).
+        max_bytes (int): Size limit.
+        chunk_size (int): Bytes read and written per step.
+
+    Returns:
+        dict: temp_path, sha256 (hex) and size in bytes.
+
+    Raises:
+        UploadTooLarge: As soon as more than max_bytes have been read.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return {"temp_path": temp_path, "sha256": digest.hexdigest(), "size": size}
+
+
+def commit_upload(temp_path: str, final_path: str) -> str:
+    """Atomically move a streamed upload into place, replacing any previous file."""
+    os.replace(temp_path, final_path)
+    return final_path
+
+
+def discard_upload(temp_path: str):
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def atomic_write(path: str, write):
+    """Call write(tmp_path) next to path, then rename over it, so readers (and mmaps) never see a partial file."""
+    # A unique temp name per call, so concurrent writers of the same path never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.",
+                                    suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_npy(path: str, array):
+    # Through a file object, so np.save does not append .npy to temporary names
+    with open(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+
+
 def get_file_info(file_path: str) -> dict:
     """
     Return metadata info for a saved file.
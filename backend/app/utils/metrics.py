@@ -0,0 +1,157 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import namedtuple
+from app.config.settings import METRICS_ENABLED
+
+# Every metric name is prefixed, so the app's series are easy to find next to other exporters'
+PREFIX = "pptqa_"
+# Upper bounds in seconds, from sub-millisecond lookups to slow Gemini answers and index saves
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A value read from a component at scrape time; kind is "counter" or "gauge"
+Sample = namedtuple("Sample", "name kind help labels value")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if value == value else "NaN"
+
+
+class Histogram:
+    """Counts of observations per bucket upper bound, plus their sum (not thread-safe on its own)."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Buckets are "less than or equal", so a value on a bound belongs to that bound
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Histograms recorded by the app, rendered in the Prometheus text format.
+
+    Values the components already keep (cache hit counts, queue depths, index size) are not
+    copied here: render() takes them as Samples read from their stats() at scrape time.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        # name -> (help, {label pairs: Histogram})
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, help_text: str = "", buckets=STAGE_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, (help_text, {}))[1]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self, samples=()) -> str:
+        """
+        Render every recorded series, then samples, in the Prometheus text exposition format.
+
+        Args:
+            samples (iterable): Samples read from the components at scrape time.
+
+        Returns:
+            str: The exposition text, one line per series value.
+        """
+        lines = []
+        with self._lock:
+            for name, (help_text, series) in sorted(self._histograms.items()):
+                lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} histogram"]
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(f"{PREFIX}{name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {histogram.count}")
+        described = set()
+        for sample in samples:
+            if sample.value is None:
+                continue
+            if sample.name not in described:
+                described.add(sample.name)
+                lines += [f"# HELP {PREFIX}{sample.name} {sample.help}", f"# TYPE {PREFIX}{sample.name} {sample.kind}"]
+            labels = tuple(sorted((sample.labels or {}).items()))
+            lines.append(f"{PREFIX}{sample.name}{_format_labels(labels)} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry the app records into and GET /metrics renders
+registry = MetricsRegistry()
+
+# Stage durations (ms) of the request being handled, for its Server-Timing header
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a pipeline stage's duration, and add it to the current request's Server-Timing."""
+    registry.observe("stage_seconds", seconds, "Time spent in each pipeline stage.", stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+class stage_timer:
+    """Time the body of a with block as stage (see observe_stage), whether or not it raises."""
+
+    # A plain class rather than @contextmanager: entering and leaving costs a fraction of a generator's
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe_stage(self.stage, time.perf_counter() - self.start)
+
+
+def start_server_timing():
+    """Collect the stages timed from here on in this context. Returns the token server_timing() takes."""
+    return _request_timings.set({})
+
+
+def server_timing(token, total_ms: float) -> str:
+    """
+    Stop collecting and return the Server-Timing header value, e.g. "encode;dur=3.1, total;dur=9.8".
+
+    Stages timed on other threads (the query batcher's, say) only appear when the thread was
+    started from the request's context, as asyncio.to_thread does.
+    """
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    parts = [f"{stage};dur={ms:.1f}" for stage, ms in timings.items()]
+    return ", ".join(parts + [f"total;dur={total_ms:.1f}"])
@@ -0,0 +1,62 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+# One profile at a time: two samplers would each see the other in every stack
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _folded(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval_ms: float = 10) -> dict:
+    """
+    Sample the Python stack of every other thread in the process at a fixed interval.
+
+    The sampler only reads sys._current_frames(), so the profiled code runs unmodified; the
+    cost is one stack walk per thread per interval, taken from the sampling thread.
+
+    Args:
+        seconds (float): How long to sample for.
+        interval_ms (float): Time between samples.
+
+    Returns:
+        dict: "samples" (rounds taken), "threads" and "stacks" ({folded stack: times seen},
+            root first, frames separated by ";", the input format of flamegraph tools).
+
+    Raises:
+        ProfilerBusy: If another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running.")
+    try:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks, rounds, seen = Counter(), 0, set()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    seen.add(ident)
+                    stacks[f"{names.get(ident, ident)};{_folded(frame)}"] += 1
+            rounds += 1
+            time.sleep(interval_ms / 1000)
+        return {"samples": rounds, "threads": len(seen), "stacks": dict(stacks.most_common())}
+    finally:
+        _profile_lock.release()
+
+
+def folded_text(profile: dict) -> str:
+    """A profile as flamegraph.pl / speedscope input: one "stack count" line per stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
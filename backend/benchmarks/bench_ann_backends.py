@@ -0,0 +1,63 @@
+"""
+Recall@k vs per-query latency for each FAISS backend against the flat baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ann_backends [--vectors 20000] [--queries 200] [--k 10]
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+from app.services.ppt_retriever import IndexConfig, build_index, tune_index
+from benchmarks.common import random_vectors
+
+SWEEPS = {
+    "flat": [{}],
+    "ivf_flat": [{"nprobe": n} for n in (1, 4, 16, 64)],
+    "hnsw": [{"ef_search": ef} for ef in (16, 32, 64, 128)],
+    "ivf_pq": [{"nprobe": n} for n in (4, 16, 64)],
+}
+
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = random_vectors(args.vectors, args.dim, seed=0)
+    rng = np.random.default_rng(1)
+    # Queries land near the corpus, like a question about an indexed slide
+    queries = vectors[rng.integers(0, args.vectors, args.queries)]
+    queries = (queries + 0.2 * rng.standard_normal(queries.shape)).astype("float32")
+    ids = np.arange(args.vectors, dtype="int64")
+
+    print(f"{args.vectors} vectors x {args.dim}d, {args.queries} queries, recall@{args.k} vs flat")
+    print(f"{'backend':10} {'params':18} {'build s':>8} {'ms/query':>9} {'recall':>7}")
+    truth = None
+    for index_type, sweep in SWEEPS.items():
+        start = time.perf_counter()
+        index, _ = build_index(IndexConfig(index_type=index_type, min_train_size=0), vectors, ids)
+        build_s = time.perf_counter() - start
+        threads = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(1)  # per-query latency, as served by one request
+        for params in sweep:
+            tune_index(index, **params)
+            start = time.perf_counter()
+            found = [index.search(q[None, :], args.k)[1][0] for q in queries]
+            ms_per_query = (time.perf_counter() - start) * 1000 / len(queries)
+            if truth is None:
+                truth = found
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            print(f"{index_type:10} {label:18} {build_s:8.2f} {ms_per_query:9.3f} {recall_at_k(found, truth):7.3f}")
+        faiss.omp_set_num_threads(threads)
+
+
+if __name__ == "__main__":
+    main()
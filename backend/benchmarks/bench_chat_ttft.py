@@ -0,0 +1,176 @@
+"""
+Time to first token: the blocking chat answer vs the server-sent event stream.
+
+Serves the chat routes with uvicorn over a synthetic index, with Gemini replaced by a local mock
+that takes --prefill-ms before the first token and --token-ms per token of a --tokens-long answer
+(generateContent returns after the whole answer; streamGenerateContent sends each token as it goes).
+Measured over real HTTP per request:
+  - GET /api/chat/: retrieval only, as the endpoint works today (no generation)
+  - blocking answer: retrieval then one generateContent call (gemini_generate_answer); the first
+    token arrives with the full response
+  - GET /api/chat/stream: first byte (the retrieval event), first token event and end of stream
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_ttft [--requests 20] [--tokens 150] [--token-ms 15] [--prefill-ms 250] [--synthetic]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import uvicorn
+from fastapi import FastAPI, Query
+from app.config.settings import CONTEXT_TOP_K
+from app.routes.chat_routes import router as chat_router
+from app.services.chunker import chunk_records
+from app.services.context_builder import build_context
+from app.services.gemini_client import GeminiClient
+from app.services.generator import gemini_generate_answer
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_encoder, summarize
+
+
+def mock_gemini(args):
+    """Start a local generativelanguage stand-in. Returns the server (stop with shutdown())."""
+    words = ("the roadmap moves the launch to the third quarter after the security review " * 50).split()[:args.tokens]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(args.prefill_ms / 1000)
+            if ":streamGenerateContent" in self.path:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for word in words:
+                    chunk = {"candidates": [{"content": {"parts": [{"text": word + " "}]}}]}
+                    data = f"data: {json.dumps(chunk)}\r\n\r\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(args.token_ms / 1000)
+                self.wfile.write(b"0\r\n\r\n")
+                return
+            time.sleep(len(words) * args.token_ms / 1000)
+            data = json.dumps({"candidates": [{"content": {"parts": [{"text": " ".join(words)}]}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_app(retriever, gemini_url):
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.retriever = retriever
+        app.state.query_batcher = QueryBatcher(retriever)
+        await app.state.query_batcher.start()
+        app.state.gemini_client = GeminiClient(api_key="bench", base_url=gemini_url)
+        yield
+        await app.state.query_batcher.stop()
+        await app.state.gemini_client.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(chat_router, prefix="/api/chat")
+
+    @app.get("/blocking")
+    async def blocking(query: str = Query(...)):
+        # What a non-streaming generated answer costs: retrieval, then the whole Gemini response
+        hits, _ = await HybridRetriever(app.state.query_batcher).search(query, top_k=CONTEXT_TOP_K)
+        context = build_context(query, hits)["context"]
+        return {"answer": await gemini_generate_answer(query, context, app.state.gemini_client)}
+
+    return app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=150)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--prefill-ms", type=float, default=250)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    workdir = tempfile.mkdtemp(prefix="bench_ttft_")
+    gemini = mock_gemini(args)
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        retriever.add_deck("deck.pptx", [chunk.text for chunk in chunks],
+                           slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(build_app(retriever, f"http://127.0.0.1:{gemini.server_port}/v1"),
+                                               host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        print(f"{len(chunks)} chunks; mock Gemini: {args.prefill_ms:g} ms to first token, "
+              f"{args.tokens} tokens x {args.token_ms:g} ms; {args.requests} requests each")
+
+        base = f"http://127.0.0.1:{port}"
+        # A distinct question per request, so no answer comes from the query cache
+        questions = [f"{question} (#{n})" for n, (question, _) in enumerate(facts[:args.requests])]
+        with httpx.Client(base_url=base, timeout=60) as http:
+            retrieval_ms, blocking_ms, first_byte_ms, first_token_ms, stream_total_ms = [], [], [], [], []
+            for query in questions:
+                start = time.perf_counter()
+                http.get("/api/chat/", params={"query": query}).raise_for_status()
+                retrieval_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                http.get("/blocking", params={"query": query}).raise_for_status()
+                blocking_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                first_byte = first_token = None
+                with http.stream("GET", "/api/chat/stream", params={"query": query}) as response:
+                    for line in response.iter_lines():
+                        now = (time.perf_counter() - start) * 1000
+                        first_byte = first_byte or now
+                        if line == "event: token" and first_token is None:
+                            first_token = now
+                first_byte_ms.append(first_byte)
+                first_token_ms.append(first_token)
+                stream_total_ms.append((time.perf_counter() - start) * 1000)
+
+        print(f"GET /api/chat/ (retrieval only)  {summarize(retrieval_ms)}")
+        print(f"blocking answer, first token     {summarize(blocking_ms)}")
+        print(f"stream, first byte (retrieval)   {summarize(first_byte_ms)}")
+        print(f"stream, first token              {summarize(first_token_ms)}")
+        print(f"stream, complete answer          {summarize(stream_total_ms)}")
+        server.should_exit = True
+    finally:
+        gemini.shutdown()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Load time, heap allocated on load and top-k lookup latency: pickle registry vs memory-mapped ChunkStore.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunk_store [--sizes 10000 100000 1000000]
+"""
+import argparse
+import gc
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import tracemalloc
+from app.services.chunk_store import ChunkStore
+from benchmarks.common import synthetic_sentences, timed
+
+
+def measure_load(load, repeat=3):
+    """Return (result, best elapsed_ms, peak MB allocated by Python while loading) over repeat loads."""
+    best_ms = float("inf")
+    for _ in range(repeat):
+        # Collect first so a GC pass over the previous result is not billed to this load
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        result, ms = timed(load)
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        best_ms = min(best_ms, ms)
+    return result, best_ms, peak
+
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_chunk_store_")
+    try:
+        for n in args.sizes:
+            # 40-word chunks, ~300 bytes each, spread over decks of 200 chunks
+            texts = synthetic_sentences(n, words_per_sentence=40)
+            decks = {f"deck{d}.pptx": list(range(d * 200, min(n, (d + 1) * 200))) for d in range((n + 199) // 200)}
+            pickle_path = os.path.join(workdir, f"chunks_{n}.pkl")
+            with open(pickle_path, 'wb') as f:
+                pickle.dump({"chunks": dict(enumerate(texts)), "decks": decks, "next_id": n}, f)
+            base = os.path.join(workdir, f"chunks_{n}")
+            ChunkStore.from_dict(dict(enumerate(texts)),
+                                 {i: deck for deck, ids in decks.items() for i in ids}).save(base, next_id=n)
+            del texts
+
+            registry, pickle_ms, pickle_mb = measure_load(lambda: load_pickle(pickle_path))
+            (store, _), store_ms, store_mb = measure_load(lambda: ChunkStore.load(base))
+
+            ids = [random.randrange(n) for _ in range(args.lookups)]
+            _, pickle_lookup = timed(lambda: [registry["chunks"][i] for i in ids])
+            _, store_lookup = timed(lambda: [store.lookup(i) for i in ids])
+            print(f"{n:>9} chunks  pickle: load {pickle_ms:8.1f} ms {pickle_mb:8.1f} MB heap "
+                  f"lookup {pickle_lookup * 1000 / len(ids):6.2f} us | chunk store: load {store_ms:6.2f} ms "
+                  f"{store_mb:6.2f} MB heap lookup {store_lookup * 1000 / len(ids):6.2f} us")
+            del registry, store
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
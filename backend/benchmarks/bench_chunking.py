@@ -0,0 +1,92 @@
+"""
+Chunk count, chunking latency and retrieval quality: legacy regex/500-char split vs the slide-aware chunker.
+
+Each synthetic slide holds one "fact" sentence with a unique answer token; a query asks for that fact
+and counts as a hit when a top-k chunk contains the whole fact sentence.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking [--slides 2000] [--queries 300] [--synthetic]
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+from app.services.chunker import chunk_records, count_tokens
+from app.services.ppt_loader import SlideRecord
+from app.services.ppt_retriever import PPTRetriever
+from benchmarks.common import WORDS, load_encoder, timed
+
+
+def legacy_chunk_text(text):
+    # The splitter upload_ppt used before the chunker module
+    chunks = [chunk.strip() for chunk in re.split(r'\n\n+', text) if chunk.strip()]
+    if not chunks or len(chunks) < 2:
+        chunks = [text[i:i+500] for i in range(0, len(text), 500)]
+    return chunks
+
+
+def synthetic_records(slides, seed=0):
+    """Slides with a title, filler bullets, one fact sentence and notes. Returns (records, facts)."""
+    rng = random.Random(seed)
+    sentence = lambda n: " ".join(rng.choice(WORDS) for _ in range(n)) + "."
+    records, facts = [], []
+    codeword = lambda: "".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+    for slide in range(1, slides + 1):
+        team, system = codeword(), codeword()
+        fact = f"The {team} team will migrate {system} to region{slide % 7} next quarter."
+        facts.append((f"when will {team} migrate {system}", fact))
+        body = [sentence(rng.randint(6, 14)) for _ in range(rng.randint(2, 6))]
+        body.insert(rng.randint(0, len(body)), fact)
+        records.append(SlideRecord("deck", slide, "Title 1", "placeholder", "title", sentence(4)))
+        records.append(SlideRecord("deck", slide, "Content 2", "placeholder", "body", "\n".join(body)))
+        records.append(SlideRecord("deck", slide, "notes", "notes", "notes", sentence(rng.randint(10, 30))))
+    return records, facts
+
+
+def evaluate(name, encoder, chunks, facts, top_k):
+    workdir = tempfile.mkdtemp(prefix="bench_chunking_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"),
+                                 chunk_path=os.path.join(workdir, "faiss_chunks.pkl"),
+                                 model=encoder)
+        retriever.add_deck("deck", chunks)
+        results = retriever.search_batch([query for query, _ in facts], top_k=top_k)
+        hits = sum(any(fact in hit["text"] for hit in hits) for (_, fact), hits in zip(facts, results))
+        return hits / len(facts)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    facts = random.Random(1).sample(facts, min(args.queries, len(facts)))
+    text = "\n".join(record.text for record in records)
+    encoder = load_encoder(args.synthetic)
+    print(f"{args.slides} slides, {len(records)} records, {count_tokens(text)} tokens; "
+          f"{len(facts)} queries, hit@{args.top_k}")
+
+    legacy, legacy_ms = timed(legacy_chunk_text, text)
+    chunks, chunk_ms = timed(chunk_records, records)
+    for name, texts, ms in (("legacy", legacy, legacy_ms), ("slide-aware", [c.text for c in chunks], chunk_ms)):
+        mean_tokens = sum(count_tokens(t) for t in texts) / len(texts)
+        recall = evaluate(name, encoder, texts, facts, args.top_k)
+        print(f"{name:12} chunks={len(texts):6d}  mean tokens={mean_tokens:6.1f}  chunking={ms:8.1f} ms  "
+              f"hit@{args.top_k}={recall:.3f}")
+
+    # Linear time: 10x the slides should take ~10x as long
+    big, _ = synthetic_records(args.slides * 10, seed=2)
+    _, big_ms = timed(chunk_records, big)
+    print(f"slide-aware over {args.slides * 10} slides: {big_ms:8.1f} ms ({big_ms / chunk_ms:.1f}x for 10x input)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Prompt tokens per chat request, and how often the answer makes it into the prompt, with and without the context builder.
+
+The synthetic deck is indexed twice, as "deck.pptx" and a revised "deck-v2.pptx", so retrieval
+returns near-duplicate chunks the way it does for re-uploaded decks. For each question:
+  - top-3 joined: the three best chunks joined as they are (the chat stream's context so far)
+  - top-k joined: the best --top-k chunks joined as they are
+  - built: the same --top-k chunks through build_context (deduplicated, packed to --budget, cited)
+Tokens are counted with the chunker's estimate; "answer in prompt" is the fraction of questions
+whose fact sentence is in the prompt.
+
+Usage (from backend/):
+    python -m benchmarks.bench_context_builder [--slides 2000] [--queries 300] [--top-k 8] [--budget 600] [--synthetic]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+from app.config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_TOP_K
+from app.services.chunker import chunk_records, count_tokens
+from app.services.context_builder import build_context, naive_context
+from app.services.ppt_retriever import PPTRetriever
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_encoder, summarize, timed
+
+
+def token_summary(counts: list) -> str:
+    counts = sorted(counts)
+    p95 = counts[min(len(counts) - 1, int(len(counts) * 0.95))]
+    return f"mean={statistics.mean(counts):7.1f}  p50={statistics.median(counts):5.0f}  p95={p95:5d}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=CONTEXT_TOP_K)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--threshold", type=float, default=CONTEXT_DEDUP_THRESHOLD)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    workdir = tempfile.mkdtemp(prefix="bench_context_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        for deck in ("deck.pptx", "deck-v2.pptx"):
+            retriever.add_deck(deck, [chunk.text for chunk in chunks],
+                               slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        facts = facts[:args.queries]
+        results = retriever.search_batch([query for query, _ in facts], top_k=args.top_k)
+        print(f"{len(chunks)} chunks x 2 decks, {len(facts)} questions, top-k={args.top_k}, "
+              f"budget={args.budget} tokens, dedup threshold={args.threshold}")
+
+        variants = {"top-3 joined": [], f"top-{args.top_k} joined": [], "built": []}
+        found = {name: 0 for name in variants}
+        build_ms, duplicates = [], 0
+        for (query, fact), hits in zip(facts, results):
+            built, ms = timed(build_context, query, hits, args.budget, args.threshold)
+            build_ms.append(ms)
+            duplicates += built["duplicates"]
+            prompts = {"top-3 joined": f"{query}\nContext: {naive_context(hits[:3])}",
+                       f"top-{args.top_k} joined": f"{query}\nContext: {naive_context(hits)}",
+                       "built": built["prompt"]}
+            for name, prompt in prompts.items():
+                variants[name].append(count_tokens(prompt))
+                found[name] += fact in prompt
+
+        for name, tokens in variants.items():
+            print(f"{name:16} tokens/request {token_summary(tokens)}  answer in prompt={found[name] / len(facts):.3f}")
+        print(f"build_context    {summarize(build_ms)}  "
+              f"duplicates dropped/request={duplicates / len(facts):.2f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
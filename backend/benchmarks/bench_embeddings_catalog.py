@@ -0,0 +1,99 @@
+"""
+Per-query cost and freshness of generator search: file scan vs lexical index vs the embeddings catalog.
+
+Writes N synthetic *_embeddings.json files (bench_lexical_search's corpus) and times, per query:
+  - file scan: list, load, clean and difflib-scan every file (what search_all_embeddings did first)
+  - index only: the saved BM25 index as the generator searched it before the catalog; a file
+    rewritten outside vector_store stays stale
+  - catalog: EmbeddingsCatalog.index() then the same search (one stat() of the directory when
+    nothing changed), across all decks and scoped to one deck
+Then --rewrites decks are rewritten on disk, one at a time, each with a new fact; "fresh" is the
+fraction of questions about the new fact answered with it right after the rewrite.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embeddings_catalog [--decks 1000] [--slides 20] [--queries 200] [--rewrites 20]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+from app.services.embeddings_catalog import EmbeddingsCatalog
+from app.services.lexical_index import load_lexical_index
+from benchmarks.bench_lexical_search import legacy_search_all, write_corpus
+from benchmarks.common import summarize, timed
+
+
+def top_hit(index, query, source=None):
+    hits = index.search(query, top_k=1, source=source)
+    return (hits[0]["text"], hits[0]["source"]) if hits else ("", None)
+
+
+def run(search, facts):
+    samples, hits = [], 0
+    for query, fact, fname in facts:
+        (snippet, source), ms = timed(search, query, fname)
+        samples.append(ms)
+        hits += snippet == fact and source == fname
+    return samples, hits / len(facts)
+
+
+def rewrite(embeddings_dir, fname, fact):
+    """Replace a deck's file the way save_embeddings does (write a temp file, rename it into place)."""
+    path = os.path.join(embeddings_dir, fname)
+    with open(path, "r", encoding="utf-8") as f:
+        text = json.load(f)["text"]
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"text": f"{text}\n{fact}", "embedding": []}, f, ensure_ascii=False, indent=4)
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=1000)
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--legacy-queries", type=int, default=3, help="the file scan takes seconds per query")
+    parser.add_argument("--rewrites", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_catalog_")
+    try:
+        facts = write_corpus(workdir, args.decks, args.slides)
+        sample = random.Random(1).sample(facts, args.queries)
+        base = os.path.join(workdir, "lexical")
+        catalog = EmbeddingsCatalog(workdir, base)
+        index, build_ms = timed(catalog.index)
+        print(f"{args.decks} decks, {len(index)} sentences: first lookup (builds the index) {build_ms / 1000:.1f} s")
+
+        variants = {
+            "file scan": (lambda q, f: legacy_search_all(q, workdir), sample[:args.legacy_queries]),
+            "index only": (lambda q, f: top_hit(load_lexical_index(base), q), sample),
+            "catalog": (lambda q, f: top_hit(catalog.index(), q), sample),
+            "catalog, scoped": (lambda q, f: top_hit(catalog.index(f), q, f), sample),
+        }
+        for name, (search, queries) in variants.items():
+            samples, hit_rate = run(search, queries)
+            print(f"{name:16} {summarize(samples)}  hit@1={hit_rate:.2f}  ({len(queries)} queries)")
+
+        rng = random.Random(2)
+        stale_fresh, catalog_fresh, refresh_ms = 0, 0, []
+        for n in range(args.rewrites):
+            fname = f"deck{rng.randrange(args.decks)}_embeddings.json"
+            fact = f"The rewrite{n} team will migrate ledger{n} to region99 tomorrow."
+            rewrite(workdir, fname, fact)
+            query = f"when will the rewrite{n} team migrate ledger{n}"
+            stale_fresh += top_hit(load_lexical_index(base), query) == (fact, fname)
+            hit, ms = timed(lambda: top_hit(catalog.index(), query))
+            refresh_ms.append(ms)
+            catalog_fresh += hit == (fact, fname)
+        print(f"after a rewrite: index only fresh={stale_fresh / args.rewrites:.2f}; "
+              f"catalog fresh={catalog_fresh / args.rewrites:.2f}, query {summarize(refresh_ms)}")
+        print(f"catalog stats: {catalog.stats()}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Embeddings files on disk: size, write time and load time of the old JSON files vs the .npy manifest.
+
+For --decks synthetic decks of --slides slides each:
+  - dummy JSON: what process_all_texts wrote before, {"text", "embedding"} with the character
+    codes of the first 50 characters, through json.dump(indent=4)
+  - vectors as JSON: the deck's real chunk vectors in that same pretty-printed JSON (what storing
+    them without changing the format would cost)
+  - npy + manifest: vector_store.save_embeddings (float16 .npy next to a compact chunk manifest),
+    loaded by vector_store.load_embeddings (memory-mapped); "load + read" also touches every vector
+Encoding is timed deck by deck (one encode call per file, as before) and through embed_texts
+(one call for every pending deck).
+
+Usage (from backend/):
+    python -m benchmarks.bench_embeddings_store [--decks 50] [--slides 30] [--synthetic]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from app.services import vector_store
+from app.services.chunker import chunk_records
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_encoder, summarize, timed
+
+
+def dir_size(path: str, suffixes: tuple) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path) if f.endswith(suffixes))
+
+
+def write_json(path: str, data: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def load_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=50)
+    parser.add_argument("--slides", type=int, default=30)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    encoder = load_encoder(args.synthetic)
+    decks = {}
+    for n in range(args.decks):
+        records, _ = synthetic_records(args.slides, seed=n)
+        decks[f"deck{n:04d}"] = (records, "\n".join(record.text for record in records))
+    workdir = tempfile.mkdtemp(prefix="bench_embeddings_")
+    dirs = {name: os.path.join(workdir, name) for name in ("texts", "dummy", "json", "npy")}
+    for path in dirs.values():
+        os.makedirs(path)
+    vector_store.EXTRACTED_TEXT_DIR = dirs["texts"]
+    vector_store.EMBEDDINGS_DIR = dirs["npy"]
+    try:
+        # One encode call per deck, as process_all_texts made; kept for the JSON variant
+        per_file_ms, chunks, vectors = 0.0, {}, {}
+        for base, (records, _) in decks.items():
+            chunks[base] = [chunk.text for chunk in chunk_records(records)]
+            vectors[base], ms = timed(encoder.encode, chunks[base], convert_to_numpy=True)
+            per_file_ms += ms
+        chunk_count = sum(len(v) for v in vectors.values())
+        print(f"{args.decks} decks x {args.slides} slides, {chunk_count} chunks, "
+              f"dim={next(iter(vectors.values())).shape[1]}")
+
+        write_ms = {"dummy": [], "json": [], "npy": []}
+        for base, (_, text) in decks.items():
+            filename = f"{base}_embeddings.json"
+            _, ms = timed(write_json, os.path.join(dirs["dummy"], filename),
+                          {"text": text, "embedding": [ord(c) for c in text[:50]]})
+            write_ms["dummy"].append(ms)
+            _, ms = timed(write_json, os.path.join(dirs["json"], filename),
+                          {"chunks": chunks[base], "embeddings": vectors[base].tolist()})
+            write_ms["json"].append(ms)
+            _, ms = timed(vector_store.save_embeddings, filename,
+                          {"chunks": chunks[base], "slides": [], "embeddings": vectors[base], "model": "bench"})
+            write_ms["npy"].append(ms)
+        all_chunks = [text for texts in chunks.values() for text in texts]
+        _, one_call_ms = timed(encoder.encode, all_chunks, convert_to_numpy=True)
+        # Chunks, encodes and saves every deck, as process_all_texts now does for pending texts
+        _, batched_ms = timed(vector_store.embed_texts, {base: text for base, (_, text) in decks.items()},
+                              model=encoder, model_name="bench")
+        print(f"encode, one call per deck        {per_file_ms:9.1f} ms")
+        print(f"encode, one call for all decks   {one_call_ms:9.1f} ms")
+        print(f"embed_texts, one call (+ saves)  {batched_ms:9.1f} ms")
+
+        filenames = [f"{base}_embeddings.json" for base in decks]
+        sizes = {"dummy": dir_size(dirs["dummy"], (".json",)), "json": dir_size(dirs["json"], (".json",)),
+                 "npy": dir_size(dirs["npy"], (".json", ".npy"))}
+        load_ms = {"dummy": [], "json": [], "npy": [], "npy_read": []}
+        for filename in filenames:
+            for name in ("dummy", "json"):
+                _, ms = timed(load_json, os.path.join(dirs[name], filename))
+                load_ms[name].append(ms)
+            _, ms = timed(vector_store.load_embeddings, filename)
+            load_ms["npy"].append(ms)
+            _, ms = timed(lambda: np.asarray(vector_store.load_embeddings(filename)["embeddings"], dtype="float32"))
+            load_ms["npy_read"].append(ms)
+
+        labels = {"dummy": "dummy JSON", "json": "vectors as JSON", "npy": "npy + manifest"}
+        for name, label in labels.items():
+            print(f"{label:16} size={sizes[name] / 1024:9.1f} KiB  write {summarize(write_ms[name])}")
+        for name, label in {**labels, "npy_read": "npy load + read"}.items():
+            print(f"{label:16} load {summarize(load_ms[name])}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
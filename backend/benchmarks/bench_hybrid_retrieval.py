@@ -0,0 +1,86 @@
+"""
+Hit rate and latency of chat retrieval in dense, lexical and hybrid (RRF) mode.
+
+Uses the synthetic slides of bench_chunking: each slide holds one fact naming a made-up team and
+system. "question" queries paraphrase the fact; "exact-term" queries are just the system's name,
+the kind of identifier embeddings blur. A query is a hit when a top-k chunk contains its fact.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hybrid_retrieval [--slides 5000] [--queries 300] [--synthetic]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+from app.config.settings import QUERY_QUEUE_MAX
+from app.services.chunker import chunk_records
+from app.services.hybrid_retriever import HybridRetriever, RETRIEVAL_MODES
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.worker_pool import WorkerPool
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_encoder, summarize
+
+
+async def evaluate(hybrid, queries, mode, top_k):
+    hits, totals, stages = 0, [], {}
+    for query, fact in queries:
+        results, timings = await hybrid.search(query, top_k=top_k, mode=mode)
+        hits += any(fact in hit["text"] for hit in results)
+        totals.append(timings.pop("total_ms"))
+        for stage, timing in timings.items():
+            stages.setdefault(stage, []).append(timing["ms"])
+    return hits / len(queries), totals, stages
+
+
+async def main_async(args, retriever, query_sets):
+    pool = WorkerPool("query", 4, QUERY_QUEUE_MAX)
+    batcher = QueryBatcher(retriever, pool=pool)
+    await batcher.start()
+    hybrid = HybridRetriever(batcher, candidates=args.candidates)
+    try:
+        for name, queries in query_sets.items():
+            print(f"\n{name} queries ({len(queries)}), hit@{args.top_k}")
+            for mode in RETRIEVAL_MODES:
+                hit_rate, totals, stages = await evaluate(hybrid, queries, mode, args.top_k)
+                per_stage = "  ".join(f"{stage}={statistics.mean(ms):.2f}" for stage, ms in stages.items())
+                print(f"  {mode:8} hit={hit_rate:.3f}  {summarize(totals)}  stage means (ms): {per_stage}")
+    finally:
+        await batcher.stop()
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    sample = random.Random(1).sample(facts, min(args.queries, len(facts)))
+    query_sets = {
+        "question": [(question, fact) for question, fact in sample],
+        # "The {team} team will migrate {system} ..." -> "{system}"
+        "exact-term": [(fact.split()[5], fact) for _, fact in sample],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="bench_hybrid_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        retriever.add_deck("deck", [chunk.text for chunk in chunks],
+                           slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        print(f"{args.slides} slides, {len(chunks)} chunks, {args.candidates} candidates per side for hybrid")
+        asyncio.run(main_async(args, retriever, query_sets))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Query latency and hit rate: the per-query difflib scan generator.py used vs the BM25 lexical index.
+
+Writes N synthetic *_embeddings.json files, each holding one deck's text with a unique "fact"
+sentence per slide. A query asks for one fact and counts as a hit when the top snippet is that fact.
+
+Usage (from backend/):
+    python -m benchmarks.bench_lexical_search [--decks 1000] [--slides 20] [--queries 200] [--legacy-queries 5]
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+from app.services.lexical_index import LexicalIndex, split_sentences, load_lexical_index, update_lexical_index
+from benchmarks.common import WORDS, summarize, timed
+
+
+def _clean_text(text):
+    cleaned = ''.join(ch if ch.isprintable() else ' ' for ch in text)
+    return re.sub(r"\s+", ' ', cleaned).strip()
+
+
+def _find_best_sentence(query, text, max_len=300):
+    # generator._find_best_sentence before the lexical index (minus its last-resort fallbacks)
+    sentences = re.split(r'(?<=[\.\?!])\s+', text)
+    qlow = query.lower()
+    for s in sentences:
+        if qlow in s.lower():
+            return s.strip()[:max_len]
+    best, best_score = "", 0.0
+    for s in sentences:
+        score = difflib.SequenceMatcher(None, qlow, s.lower()).ratio()
+        if score > best_score:
+            best_score, best = score, s.strip()
+    return best[:max_len] if best_score > 0.3 else ""
+
+
+def legacy_search_all(query, embeddings_dir):
+    """generator.search_all_embeddings before the lexical index: list, load, clean and scan every file."""
+    best_score, best_snippet, best_file = 0.0, "", None
+    for fname in os.listdir(embeddings_dir):
+        if not fname.endswith('_embeddings.json'):
+            continue
+        with open(os.path.join(embeddings_dir, fname), 'r', encoding='utf-8') as f:
+            cleaned = _clean_text(json.load(f).get('text', ''))
+        snippet = _find_best_sentence(query, cleaned)
+        score = difflib.SequenceMatcher(None, query.lower(), snippet.lower()).ratio() if snippet else 0.0
+        if score > best_score:
+            best_score, best_snippet, best_file = score, snippet, fname
+    return best_snippet, best_file
+
+
+def write_corpus(embeddings_dir, decks, slides, seed=0):
+    """Write decks embeddings files. Returns [(query, fact sentence, file name)] for every slide."""
+    rng = random.Random(seed)
+    sentence = lambda n: " ".join(rng.choice(WORDS) for _ in range(n)) + "."
+    codeword = lambda: "".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+    facts = []
+    for d in range(decks):
+        fname = f"deck{d}_embeddings.json"
+        lines = []
+        for slide in range(slides):
+            team, system = codeword(), codeword()
+            fact = f"The {team} team will migrate {system} to region{slide % 7} next quarter."
+            facts.append((f"when will the {team} team migrate {system}", fact, fname))
+            lines += [sentence(4)] + [sentence(rng.randint(6, 14)) for _ in range(4)] + [fact]
+        with open(os.path.join(embeddings_dir, fname), 'w', encoding='utf-8') as f:
+            json.dump({"text": "\n".join(lines), "embedding": []}, f, ensure_ascii=False, indent=4)
+    return facts
+
+
+def run(search, facts):
+    samples, hits = [], 0
+    for query, fact, fname in facts:
+        (snippet, source), ms = timed(search, query)
+        samples.append(ms)
+        hits += snippet == fact and source == fname
+    return samples, hits / len(facts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=1000)
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--legacy-queries", type=int, default=5, help="the difflib scan takes seconds per query")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_lexical_")
+    try:
+        facts = write_corpus(workdir, args.decks, args.slides)
+        sample = random.Random(1).sample(facts, args.queries)
+        base = os.path.join(workdir, "lexical")
+
+        def build():
+            sources = {}
+            for fname in sorted(f for f in os.listdir(workdir) if f.endswith("_embeddings.json")):
+                with open(os.path.join(workdir, fname), 'r', encoding='utf-8') as f:
+                    sources[fname] = split_sentences(json.load(f).get('text', ''))
+            return update_lexical_index(lambda _: LexicalIndex.build(sources), base)
+        index, build_ms = timed(build)
+        _, load_ms = timed(LexicalIndex.load, base)
+        size_mb = sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir)
+                      if f.startswith("lexical")) / 2 ** 20
+        print(f"{args.decks} decks, {len(index)} sentences, {len(index.terms)} terms: "
+              f"build {build_ms / 1000:.1f} s, {size_mb:.1f} MB on disk, load {load_ms:.1f} ms")
+
+        # One extra deck, as an upload would add it
+        extra = split_sentences("Quarterly roadmap review.\nThe zulu team will migrate kafka next year.")
+        _, update_ms = timed(update_lexical_index, lambda ix: ix.replace_source("upload_embeddings.json", extra), base)
+        print(f"incremental update for one uploaded deck: {update_ms:.1f} ms")
+
+        def bm25(query):
+            hits = load_lexical_index(base).search(query, top_k=1)
+            return (hits[0]["text"], hits[0]["source"]) if hits else ("", None)
+
+        samples, hit_rate = run(bm25, sample)
+        print(f"bm25 index   {summarize(samples)}  hit@1={hit_rate:.2f}  ({len(sample)} queries)")
+        samples, hit_rate = run(lambda q: legacy_search_all(q, workdir), sample[:args.legacy_queries])
+        print(f"difflib scan {summarize(samples)}  hit@1={hit_rate:.2f}  ({args.legacy_queries} queries)")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
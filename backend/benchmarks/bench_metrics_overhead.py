@@ -0,0 +1,110 @@
+"""
+Cost of the instrumentation: stage timers, /metrics rendering and the sampling profiler.
+
+  - stage_timer: ns per timed block, recording on vs off (METRICS_ENABLED) vs no timer at all
+  - search: PPTRetriever.search over a synthetic index (encode and index_search are timed
+    stages) with recording on and off, then while the sampling profiler runs at 10 ms and 1 ms
+  - render: GET /metrics text for the stages recorded here plus --series extra labelled series
+The per-stage latencies the histograms recorded during the recorded runs are printed last, with
+quantiles as bucket upper bounds.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics_overhead [--slides 2000] [--queries 500] [--series 200] [--synthetic]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from app.services.chunker import chunk_records
+from app.services.ppt_retriever import PPTRetriever
+from app.utils.metrics import MetricsRegistry, registry, stage_timer
+from app.utils.profiler import sample_stacks
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import histogram_quantile, load_encoder, recorded_histogram, summarize, timed
+
+
+def ns_per_block(n: int, timer: bool) -> float:
+    start = time.perf_counter_ns()
+    if timer:
+        for _ in range(n):
+            with stage_timer("bench"):
+                pass
+    else:
+        for _ in range(n):
+            pass
+    return (time.perf_counter_ns() - start) / n
+
+
+def run_searches(retriever, queries) -> list:
+    return [timed(retriever.search, query, 5)[1] for query in queries]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    n = 200_000
+    bare = ns_per_block(n, timer=False)
+    on = ns_per_block(n, timer=True)
+    registry.enabled = False
+    off = ns_per_block(n, timer=True)
+    registry.enabled = True
+    print(f"stage_timer: {on - bare:.0f} ns/block recording, {off - bare:.0f} ns/block with metrics off")
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    workdir = tempfile.mkdtemp(prefix="bench_metrics_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        retriever.add_deck("deck.pptx", [chunk.text for chunk in chunks],
+                           slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        queries = [query for query, _ in facts[:args.queries]]
+        run_searches(retriever, queries[:20])
+        print(f"{len(chunks)} chunks, {len(queries)} searches each")
+
+        registry.enabled = False
+        print(f"search, metrics off      {summarize(run_searches(retriever, queries))}")
+        registry.enabled = True
+        registry.clear()
+        print(f"search, metrics on       {summarize(run_searches(retriever, queries))}")
+        stages = {stage: recorded_histogram(registry, "stage_seconds", stage=stage) for stage in ("encode", "index_search")}
+
+        for interval_ms in (10, 1):
+            done = threading.Event()
+            profile = {}
+
+            def profiler():
+                while not done.is_set():
+                    profile.update(sample_stacks(0.5, interval_ms))
+
+            thread = threading.Thread(target=profiler)
+            thread.start()
+            samples = run_searches(retriever, queries)
+            done.set()
+            thread.join()
+            print(f"search, profiler {interval_ms:2d} ms  {summarize(samples)}")
+
+        extra = MetricsRegistry(enabled=True)
+        for i in range(args.series):
+            extra.observe("stage_seconds", 0.01, "Time spent in each pipeline stage.", stage=f"stage{i}")
+        text, ms = timed(registry.render)
+        extra_text, extra_ms = timed(extra.render)
+        print(f"render: {ms:.2f} ms for {len(text.splitlines())} lines; "
+              f"{extra_ms:.2f} ms for {args.series} more series ({len(extra_text) / 1024:.0f} KiB)")
+
+        for stage, histogram in stages.items():
+            print(f"histogram {stage:13} count={histogram.count}  mean={histogram.sum / histogram.count * 1000:.3f} ms  "
+                  f"p50<={histogram_quantile(histogram, 0.5) * 1000:g} ms  "
+                  f"p99<={histogram_quantile(histogram, 0.99) * 1000:g} ms")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Per-worker memory and cold start for N processes serving one index, heap-loaded vs memory-mapped.
+
+Each worker process stands in for a uvicorn worker: it opens the shared index with PPTRetriever,
+answers a first query, then waits while the parent reads its /proc/<pid>/smaps_rollup. Pss
+splits shared pages between the processes mapping them, so its total is the real footprint.
+
+Usage (from backend/):
+    python -m benchmarks.bench_multiworker_memory [--workers 4] [--vectors 200000] [--index-type flat]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import RandomEncoder
+
+FIELDS = ("Rss", "Pss", "Anonymous")
+
+
+def paths(workdir):
+    return {"index_path": os.path.join(workdir, "faiss.index"), "chunk_path": os.path.join(workdir, "faiss_chunks")}
+
+
+def rss_mb(status_field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(status_field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def smaps_rollup(pid):
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in FIELDS:
+                usage[name] = int(value.split()[0]) / 1024
+    return usage
+
+
+def worker(args):
+    start = time.perf_counter()
+    from app.services.ppt_retriever import PPTRetriever, IndexConfig
+    from benchmarks.common import SyntheticEncoder
+    imported = time.perf_counter()
+    anon_before = rss_mb("RssAnon")
+    config = IndexConfig(index_type=args.index_type, mmap=args.mmap)
+    retriever = PPTRetriever(model=SyntheticEncoder(), config=config, **paths(args.dir))
+    retriever.search("revenue growth forecast", top_k=3)
+    ready = time.perf_counter()
+    print(json.dumps({"import_s": imported - start, "load_s": ready - imported,
+                      "index_anon_mb": rss_mb("RssAnon") - anon_before}), flush=True)
+    sys.stdin.read()  # hold the mappings until the parent has measured
+
+
+def build(workdir, args):
+    from app.services.ppt_retriever import PPTRetriever, IndexConfig
+    retriever = PPTRetriever(model=RandomEncoder(), config=IndexConfig(index_type=args.index_type), **paths(workdir))
+    per_deck = 10_000
+    for start in range(0, args.vectors, per_deck):
+        count = min(per_deck, args.vectors - start)
+        retriever.add_deck(f"deck{start // per_deck}.pptx", [f"chunk {start + i}" for i in range(count)])
+    return os.path.getsize(paths(workdir)["index_path"]) / 2 ** 20
+
+
+def read_report(proc):
+    # settings.py prints its paths on import; the report is the JSON line after them
+    for line in proc.stdout:
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"Worker {proc.pid} exited without reporting")
+
+
+def run(workdir, args, mmap):
+    command = [sys.executable, "-m", "benchmarks.bench_multiworker_memory", "--worker", "--dir", workdir,
+               "--index-type", args.index_type] + (["--mmap"] if mmap else [])
+    start = time.perf_counter()
+    procs = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True) for _ in range(args.workers)]
+    reports = [read_report(p) for p in procs]
+    all_ready = time.perf_counter() - start
+    usage = [smaps_rollup(p.pid) for p in procs]
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+
+    label = "mmap" if mmap else "heap"
+    for n, (report, mem) in enumerate(zip(reports, usage)):
+        print(f"{label} worker {n}: Rss {mem['Rss']:7.1f} MB  Pss {mem['Pss']:7.1f} MB  "
+              f"Anonymous {mem['Anonymous']:7.1f} MB  index heap +{report['index_anon_mb']:6.1f} MB  "
+              f"cold start {report['import_s'] + report['load_s']:5.2f} s (index load {report['load_s']:5.2f} s)")
+    print(f"{label} total: Pss {sum(m['Pss'] for m in usage):8.1f} MB, all {args.workers} workers ready in {all_ready:5.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mmap", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # Random vectors are not worth caching, and workers should not each load a cache file
+    os.environ["EMBEDDING_CACHE_MAX_ENTRIES"] = "0"
+    if args.worker:
+        return worker(args)
+
+    workdir = tempfile.mkdtemp(prefix="bench_multiworker_")
+    try:
+        size_mb = build(workdir, args)
+        print(f"{args.vectors} vectors, {args.index_type} index file {size_mb:.1f} MB, {args.workers} workers")
+        for mmap in (False, True):
+            run(workdir, args, mmap)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
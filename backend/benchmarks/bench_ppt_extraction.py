@@ -0,0 +1,48 @@
+"""
+Extraction throughput over a directory of synthetic decks: one process vs a process pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ppt_extraction [--decks 16] [--slides 40] [--workers 0]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from unittest import mock
+from app.services import ppt_loader
+from benchmarks.common import write_synthetic_deck, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=16)
+    parser.add_argument("--slides", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=0, help="pool size (0 = one per CPU)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_extract_")
+    ppt_dir = os.path.join(workdir, "raw_ppt")
+    out_dir = os.path.join(workdir, "extracted_texts")
+    os.makedirs(ppt_dir)
+    os.makedirs(out_dir)
+    try:
+        for n in range(args.decks):
+            write_synthetic_deck(os.path.join(ppt_dir, f"deck{n:03d}.pptx"), args.slides, seed=n)
+        total_slides = args.decks * args.slides
+        workers = args.workers or os.cpu_count()
+        print(f"{args.decks} decks x {args.slides} slides, pool of {workers}")
+
+        # Keep benchmark output out of data/extracted_texts (forked workers inherit the patch)
+        with mock.patch.object(ppt_loader, "EXTRACTED_TEXT_DIR", out_dir):
+            records, ms = timed(lambda: sum(len(ppt_loader.extract_slide_records(os.path.join(ppt_dir, name)))
+                                            for name in sorted(os.listdir(ppt_dir))))
+            print(f"{'records':10} {ms / 1000:7.2f} s  {total_slides / ms * 1000:8.1f} slides/s  ({records} records)")
+            for label, n in (("serial", 1), ("pool", workers)):
+                _, ms = timed(ppt_loader.process_ppt_dir, ppt_dir, n)
+                print(f"{label:10} {ms / 1000:7.2f} s  {total_slides / ms * 1000:8.1f} slides/s")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
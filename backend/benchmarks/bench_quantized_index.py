@@ -0,0 +1,83 @@
+"""
+Index memory, query throughput and recall@k for compressed vector storage vs the flat float32 index.
+
+Indexes --vectors normalized 384-d vectors (MiniLM embeddings are unit length) as flat, sq_fp16,
+sq8 and ivf_pq, each searched through PPTRetriever with the exact re-rank off and with
+--rerank candidates re-scored from the float32 vectors file. Recall@k is measured against exact
+search; index memory is the serialized FAISS index (the float32 vectors stay on disk, mapped).
+
+Usage (from backend/):
+    python -m benchmarks.bench_quantized_index [--vectors 100000] [--queries 300] [--k 10] [--rerank 50]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import numpy as np
+import faiss
+from app.services.chunk_store import ChunkStore
+from app.services.lexical_index import LexicalIndex
+from app.services.ppt_retriever import (
+    PPTRetriever, IndexConfig, IndexSnapshot, build_index, normalize, RETRAINED_INDEX_TYPES
+)
+from benchmarks.common import RandomEncoder, random_vectors, timed
+
+INDEX_TYPES = ("flat", "sq_fp16", "sq8", "ivf_pq")
+
+
+def build(workdir, index_type, vectors, chunks, lexical):
+    n = len(vectors)
+    ids = np.arange(n, dtype='int64')
+    config = IndexConfig(index_type=index_type, min_train_size=0)
+    retriever = PPTRetriever(model=RandomEncoder(), config=config, index_path=os.path.join(workdir, "faiss.index"))
+    (index, built_type), build_ms = timed(build_index, config, vectors, ids)
+    retriever._commit(IndexSnapshot(index, built_type, n if built_type in RETRAINED_INDEX_TYPES else 0, chunks, n,
+                                    vectors, ids, lexical))
+    return retriever, build_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=50)
+    args = parser.parse_args()
+
+    vectors = normalize(random_vectors(args.vectors, seed=0))
+    rng = np.random.default_rng(1)
+    # Queries land near the corpus, like a question about an indexed slide
+    queries = vectors[rng.integers(0, args.vectors, args.queries)]
+    queries = normalize(queries + 0.05 * rng.standard_normal(queries.shape).astype("float32"))
+    truth = faiss.knn(queries, vectors, args.k)[1]
+    chunks = ChunkStore.from_dict({i: f"chunk {i}" for i in range(args.vectors)},
+                                  {i: "deck.pptx" for i in range(args.vectors)})
+    lexical = LexicalIndex.from_store(chunks)
+
+    threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(1)  # per-query throughput, as served by one request
+    print(f"{args.vectors} vectors x {vectors.shape[1]}d, {args.queries} queries, recall@{args.k} vs exact search")
+    print(f"{'index':8} {'rerank':>6} {'build s':>8} {'index MB':>9} {'B/vector':>9} {'ms/query':>9} {'QPS':>7} {'recall':>7}")
+    workdir = tempfile.mkdtemp(prefix="bench_quantized_")
+    try:
+        for index_type in INDEX_TYPES:
+            retriever, build_ms = build(os.path.join(workdir, index_type), index_type, vectors, chunks, lexical)
+            index_bytes = len(faiss.serialize_index(retriever.index))
+            for rerank in ((0,) if index_type == "flat" else (0, args.rerank)):
+                retriever.config.rerank = rerank
+                found, ms = [], 0.0
+                for query in queries:
+                    hits, elapsed = timed(retriever.search_vectors, query[None, :], args.k)
+                    found.append([hit["id"] for hit in hits[0]])
+                    ms += elapsed
+                recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth.tolist())])
+                ms_per_query = ms / len(queries)
+                print(f"{index_type:8} {rerank:6d} {build_ms / 1000:8.2f} {index_bytes / 2 ** 20:9.1f} "
+                      f"{index_bytes / args.vectors:9.0f} {ms_per_query:9.3f} {1000 / ms_per_query:7.0f} {recall:7.3f}")
+    finally:
+        faiss.omp_set_num_threads(threads)
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
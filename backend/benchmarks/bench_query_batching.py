@@ -0,0 +1,67 @@
+"""
+Chat retrieval throughput at 1/8/64 concurrent clients: one search per request vs QueryBatcher.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_batching [--chunks 5000] [--requests 256] [--synthetic]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from app.config.settings import QUERY_QUEUE_MAX
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.worker_pool import WorkerPool
+from benchmarks.common import load_encoder, synthetic_sentences
+
+
+async def run_clients(n_clients, queries, search):
+    per_client = len(queries) // n_clients
+
+    async def client(offset):
+        for query in queries[offset:offset + per_client]:
+            await search(query)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c * per_client) for c in range(n_clients)))
+    return n_clients * per_client / (time.perf_counter() - start)
+
+
+async def main_async(args, retriever, queries):
+    pool = WorkerPool("query", 4, QUERY_QUEUE_MAX)
+
+    async def unbatched(query):
+        return await pool.run(retriever.search, query, 3)
+
+    batcher = QueryBatcher(retriever, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms, pool=pool)
+    await batcher.start()
+    print(f"{'clients':>7} {'unbatched qps':>14} {'batched qps':>12} {'avg batch':>10}")
+    for n_clients in (1, 8, 64):
+        before = await run_clients(n_clients, queries, unbatched)
+        batcher.batches = batcher.queries = 0
+        after = await run_clients(n_clients, queries, lambda q: batcher.search(q, 3))
+        print(f"{n_clients:7d} {before:14.1f} {after:12.1f} {batcher.stats()['avg_batch_size']:10.1f}")
+    await batcher.stop()
+    pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_batching_")
+    retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+    retriever.add_deck("bench.pptx", synthetic_sentences(args.chunks))
+    queries = synthetic_sentences(args.requests, words_per_sentence=6, seed=1)
+    print(f"corpus={args.chunks} chunks, {args.requests} requests per run, synthetic={args.synthetic}")
+    asyncio.run(main_async(args, retriever, queries))
+
+
+if __name__ == "__main__":
+    main()
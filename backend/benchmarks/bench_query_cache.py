@@ -0,0 +1,85 @@
+"""
+Chat retrieval latency and cache hit rate for a workload of repeated questions, with and without the query cache.
+
+Questions are drawn from --distinct synthetic questions with Zipf-like popularity (a few questions
+asked again and again), searched in hybrid mode through the QueryBatcher like the chat route does.
+Halfway through, one deck is uploaded, which moves the index to a new generation and empties the cache.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_cache [--slides 5000] [--requests 2000] [--distinct 200] [--backend memory]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+from app.config.settings import QUERY_QUEUE_MAX
+from app.services.chunker import chunk_records
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.worker_pool import WorkerPool
+from app.services.query_cache import create_query_cache
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_encoder, summarize
+
+
+async def replay(retriever, workload, cache):
+    pool = WorkerPool("query", 4, QUERY_QUEUE_MAX)
+    batcher = QueryBatcher(retriever, pool=pool)
+    await batcher.start()
+    hybrid = HybridRetriever(batcher, cache=cache)
+    samples = []
+    try:
+        for n, query in enumerate(workload):
+            if n == len(workload) // 2:
+                await pool.run(retriever.add_deck, "upload.pptx", ["Quarterly roadmap review for the new deck."])
+            start = time.perf_counter()
+            await hybrid.search(query, top_k=3, mode="hybrid")
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await batcher.stop()
+        pool.shutdown()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--backend", default="memory", choices=("memory", "sqlite"))
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    questions = [question for question, _ in random.Random(1).sample(facts, min(args.distinct, len(facts)))]
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(questions))]
+    workload = random.Random(2).choices(questions, weights, k=args.requests)
+
+    workdir = tempfile.mkdtemp(prefix="bench_query_cache_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        retriever.add_deck("deck", [chunk.text for chunk in chunks],
+                           slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        print(f"{len(chunks)} chunks, {args.requests} requests over {len(questions)} distinct questions "
+              f"(zipf s={args.zipf}), one upload halfway through")
+
+        samples = asyncio.run(replay(retriever, workload, None))
+        print(f"no cache        {summarize(samples)}")
+        cache = create_query_cache(args.backend, db_path=os.path.join(workdir, "query_cache.sqlite3"))
+        samples = asyncio.run(replay(retriever, workload, cache))
+        stats = cache.stats()
+        print(f"{args.backend:6} cache    {summarize(samples)}  hit rate={stats['hit_rate']:.3f}  "
+              f"entries={stats['entries']}  {stats['bytes'] / 1024:.0f} KB  invalidated={stats['invalidations']}")
+        cache.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
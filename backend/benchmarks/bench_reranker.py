@@ -0,0 +1,79 @@
+"""
+Answer quality vs latency of dense retrieval with and without the cross-encoder re-rank stage.
+
+Indexes synthetic slides (one fact sentence per slide) and asks each fact's question. For each
+configuration, reports hit@1 / hit@3 (the fact is in the top 1 / 3 chunks) and per-request latency
+of retrieval plus re-ranking: first with a cold score cache, then the same questions again (warm).
+Budgets are in ms per request; 0 scores every candidate.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reranker [--slides 2000] [--queries 200] [--synthetic] [--pair-ms 3]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from app.services.chunker import chunk_records
+from app.services.ppt_retriever import PPTRetriever
+from app.services.reranker import Reranker
+from benchmarks.bench_chunking import synthetic_records
+from benchmarks.common import load_cross_encoder, load_encoder, summarize, timed
+
+# (candidates, budget ms); None is plain dense retrieval
+CONFIGS = [None, (10, 0), (20, 0), (50, 0), (50, 150), (50, 50)]
+
+
+def run(retriever, reranker, facts, n_candidates):
+    def answer(query):
+        hits = retriever.search(query, top_k=n_candidates)
+        return reranker.rerank(query, hits, top_k=3)[0] if reranker else hits[:3]
+
+    top1 = top3 = 0
+    samples = []
+    for query, fact in facts:
+        hits, ms = timed(answer, query)
+        samples.append(ms)
+        top1 += bool(hits) and fact in hits[0]["text"]
+        top3 += any(fact in hit["text"] for hit in hits)
+    return top1 / len(facts), top3 / len(facts), samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pair-ms", type=float, default=3.0, help="cost per pair of the --synthetic cross-encoder")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use a hashing encoder and a word-overlap cross-encoder instead of MiniLM models")
+    args = parser.parse_args()
+
+    records, facts = synthetic_records(args.slides)
+    chunks = chunk_records(records)
+    facts = facts[:args.queries]
+    workdir = tempfile.mkdtemp(prefix="bench_reranker_")
+    try:
+        retriever = PPTRetriever(index_path=os.path.join(workdir, "faiss.index"), model=load_encoder(args.synthetic))
+        retriever.add_deck("deck.pptx", [chunk.text for chunk in chunks],
+                           slide_ranges=[(chunk.slide_start, chunk.slide_end) for chunk in chunks])
+        model = load_cross_encoder(args.synthetic, pair_ms=args.pair_ms)
+        print(f"{len(chunks)} chunks, {len(facts)} questions")
+        print(f"{'rerank':20} {'hit@1':>6} {'hit@3':>6}  latency")
+        for config in CONFIGS:
+            if config is None:
+                hit1, hit3, samples = run(retriever, None, facts, 3)
+                print(f"{'off':20} {hit1:6.3f} {hit3:6.3f}  {summarize(samples)}")
+                continue
+            candidates, budget_ms = config
+            reranker = Reranker(model=model, candidates=candidates, budget_ms=budget_ms)
+            label = f"{candidates} cand, {budget_ms:g} ms"
+            hit1, hit3, samples = run(retriever, reranker, facts, candidates)
+            print(f"{label:20} {hit1:6.3f} {hit3:6.3f}  {summarize(samples)}  "
+                  f"truncated={reranker.truncated / len(facts):.2f}")
+            _, _, samples = run(retriever, reranker, facts, candidates)
+            print(f"{'  (warm cache)':20} {'':6} {'':6}  {summarize(samples)}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
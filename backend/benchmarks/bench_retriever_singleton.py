@@ -0,0 +1,42 @@
+"""
+Per-query latency: a PPTRetriever built per request (old routes) vs one shared retriever.
+
+Usage (from backend/):
+    python -m benchmarks.bench_retriever_singleton [--chunks 2000] [--queries 20] [--synthetic]
+"""
+import argparse
+import os
+import tempfile
+from app.services.ppt_retriever import PPTRetriever, DEFAULT_MODEL_NAME
+from benchmarks.common import load_encoder, synthetic_sentences, timed, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--synthetic", action="store_true", help="use a hashing encoder instead of MiniLM")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_singleton_")
+    paths = dict(index_path=os.path.join(workdir, "faiss.index"),
+                 chunk_path=os.path.join(workdir, "faiss_chunks.pkl"))
+    PPTRetriever(model=load_encoder(args.synthetic), **paths).create_index(synthetic_sentences(args.chunks))
+    queries = synthetic_sentences(args.queries, words_per_sentence=6, seed=1)
+
+    def per_request(query):
+        # What chat() used to do: load the model weights and re-read the index on every call
+        return PPTRetriever(model_name=DEFAULT_MODEL_NAME, model=load_encoder(args.synthetic), **paths).retrieve(query)
+
+    before = [timed(per_request, q)[1] for q in queries]
+
+    shared = PPTRetriever(model=load_encoder(args.synthetic), **paths)
+    after = [timed(shared.retrieve, q)[1] for q in queries]
+
+    print(f"corpus={args.chunks} chunks, {args.queries} queries, synthetic={args.synthetic}")
+    print(f"per-request retriever: {summarize(before)}")
+    print(f"shared retriever:      {summarize(after)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Query latency scoped to one deck vs across the whole corpus, for dense and lexical search.
+
+Builds one index over --decks decks of --chunks-per-deck random vectors (with synthetic chunk text
+for BM25), then times PPTRetriever.search / lexical_search globally and with deck=<one deck>.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scoped_search [--decks 1000] [--chunks-per-deck 200] [--index-type flat]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import numpy as np
+from app.services.chunk_store import ChunkStore
+from app.services.lexical_index import LexicalIndex
+from app.services.ppt_retriever import PPTRetriever, IndexConfig, IndexSnapshot, build_index, TRAINED_INDEX_TYPES
+from benchmarks.common import RandomEncoder, random_vectors, synthetic_sentences, summarize, timed
+
+
+def build(workdir, args):
+    """Write the corpus through one commit (adding 1000 decks one by one rewrites the files 1000 times)."""
+    n = args.decks * args.chunks_per_deck
+    config = IndexConfig(index_type=args.index_type)
+    retriever = PPTRetriever(model=RandomEncoder(), config=config, index_path=os.path.join(workdir, "faiss.index"))
+    vectors, ids = random_vectors(n), np.arange(n, dtype='int64')
+    chunks = ChunkStore.from_dict(dict(enumerate(synthetic_sentences(n, words_per_sentence=30))),
+                                  {i: f"deck{i // args.chunks_per_deck}.pptx" for i in range(n)})
+    index, index_type = build_index(config, vectors, ids)
+    retriever._commit(IndexSnapshot(index, index_type, n if index_type in TRAINED_INDEX_TYPES else 0, chunks, n,
+                                    vectors, ids, LexicalIndex.from_store(chunks)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=1000)
+    parser.add_argument("--chunks-per-deck", type=int, default=200)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_scoped_")
+    try:
+        _, build_ms = timed(build, workdir, args)
+        retriever = PPTRetriever(model=RandomEncoder(), config=IndexConfig(index_type=args.index_type),
+                                 index_path=os.path.join(workdir, "faiss.index"))
+        print(f"{args.decks} decks x {args.chunks_per_deck} chunks = {len(retriever.chunks)} chunks "
+              f"({retriever.snapshot().index_type}), built in {build_ms / 1000:.1f} s")
+
+        rng = random.Random(0)
+        decks = [f"deck{rng.randrange(args.decks)}.pptx" for _ in range(args.queries)]
+        queries = synthetic_sentences(args.queries, words_per_sentence=4, seed=1)
+        for name, search in (("dense", retriever.search), ("lexical", retriever.lexical_search)):
+            global_ms = [timed(search, query, 3)[1] for query in queries]
+            scoped_ms = [timed(search, query, 3, deck)[1] for query, deck in zip(queries, decks)]
+            print(f"{name:7} global  {summarize(global_ms)}")
+            print(f"{name:7} scoped  {summarize(scoped_ms)}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Query latency, throughput and single-deck write time with the index split into 1/2/4/8 shards.
+
+Builds the same corpus of --decks decks of --chunks-per-deck random vectors for each shard count,
+routing every deck to its home shard, then times ShardedRetriever.search (one query fanned out over
+the shards), search_batch (--batch queries at once) and add_deck for one re-uploaded deck.
+FAISS's own OpenMP threads are pinned to --omp-threads so the speedup measured is the shard fan-out;
+it can only show on a machine with several cores.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sharded_search [--decks 1000] [--chunks-per-deck 200] [--shards 1,2,4,8]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import faiss
+import numpy as np
+from app.services.chunk_store import ChunkStore
+from app.services.lexical_index import LexicalIndex
+from app.services.ppt_retriever import IndexConfig, IndexSnapshot, build_index, TRAINED_INDEX_TYPES
+from app.services.sharded_retriever import ShardedRetriever, shard_for
+from benchmarks.common import RandomEncoder, random_vectors, summarize, timed
+
+
+def build(workdir, n_shards, vectors, args):
+    """Commit each shard's decks in one write (adding decks one by one rewrites the files per deck)."""
+    config = IndexConfig(index_type=args.index_type)
+    retriever = ShardedRetriever(n_shards, index_dir=workdir, model=RandomEncoder(), config=config)
+    decks = [f"deck{d}.pptx" for d in range(args.decks)]
+    for shard_no, shard in enumerate(retriever.shards):
+        rows = np.concatenate([np.arange(d * args.chunks_per_deck, (d + 1) * args.chunks_per_deck)
+                               for d, deck in enumerate(decks) if shard_for(deck, n_shards) == shard_no])
+        n = len(rows)
+        ids = np.arange(n, dtype='int64')
+        chunks = ChunkStore.from_dict({i: f"chunk {row}" for i, row in enumerate(rows)},
+                                      {i: decks[row // args.chunks_per_deck] for i, row in enumerate(rows)})
+        index, index_type = build_index(config, vectors[rows], ids)
+        shard._commit(IndexSnapshot(index, index_type, n if index_type in TRAINED_INDEX_TYPES else 0, chunks, n,
+                                    vectors[rows], ids, LexicalIndex.from_store(chunks)))
+    return retriever
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=1000)
+    parser.add_argument("--chunks-per-deck", type=int, default=200)
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--omp-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.omp_threads)
+    n = args.decks * args.chunks_per_deck
+    vectors = random_vectors(n)
+    queries = [f"query {i}" for i in range(args.queries)]
+    print(f"{args.decks} decks x {args.chunks_per_deck} chunks = {n} chunks ({args.index_type}), "
+          f"{os.cpu_count()} CPUs, FAISS OpenMP threads={args.omp_threads}")
+
+    for n_shards in (int(s) for s in args.shards.split(",")):
+        workdir = tempfile.mkdtemp(prefix="bench_sharded_")
+        try:
+            retriever, build_ms = timed(build, workdir, n_shards, vectors, args)
+            single_ms = [timed(retriever.search, query, 3)[1] for query in queries]
+            batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+            batch_ms = [timed(retriever.search_batch, batch, 3)[1] for batch in batches]
+            qps = len(queries) / (sum(batch_ms) / 1000)
+            _, write_ms = timed(retriever.add_deck, "deck0.pptx", [f"updated chunk {i}" for i in range(20)])
+            print(f"{n_shards} shard(s): build {build_ms / 1000:.1f} s | search {summarize(single_ms)} | "
+                  f"batch of {args.batch}: {qps:.0f} QPS | one-deck write {write_ms:.0f} ms")
+            retriever.close()
+        finally:
+            shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
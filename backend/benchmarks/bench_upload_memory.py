@@ -0,0 +1,81 @@
+"""
+Peak RSS while saving N concurrent uploads: buffered `await file.read()` vs stream_upload_to_disk.
+
+Each mode runs in a fresh subprocess so ru_maxrss is not shared between them. Uploads are
+UploadFile objects over an on-disk file, as Starlette hands them to the route.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_memory [--uploads 20] [--size-mb 100]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from fastapi import UploadFile
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def buffered(file, dest_dir, n):
+    # What upload_ppt used to do
+    contents = await file.read()
+    with open(os.path.join(dest_dir, f"deck{n}.pptx"), "wb") as f:
+        f.write(contents)
+
+
+async def streaming(file, dest_dir, n):
+    from app.utils.file_utils import stream_upload_to_disk, commit_upload
+    upload = await stream_upload_to_disk(file, dest_dir, max_bytes=2 ** 40)
+    commit_upload(upload["temp_path"], os.path.join(dest_dir, f"deck{n}.pptx"))
+
+
+async def run_child(mode, source, uploads, dest_dir):
+    save = buffered if mode == "buffered" else streaming
+    files = [UploadFile(file=open(source, "rb"), filename=f"deck{n}.pptx") for n in range(uploads)]
+    await asyncio.gather(*(save(f, dest_dir, n) for n, f in enumerate(files)))
+
+
+def child(args):
+    import app.utils.file_utils  # noqa: F401  (import cost counted in the baseline)
+    baseline = rss_mb()
+    dest_dir = tempfile.mkdtemp(prefix=f"bench_upload_{args.mode}_")
+    start = time.perf_counter()
+    asyncio.run(run_child(args.mode, args.source, args.uploads, dest_dir))
+    elapsed = time.perf_counter() - start
+    for name in os.listdir(dest_dir):
+        os.remove(os.path.join(dest_dir, name))
+    os.rmdir(dest_dir)
+    print(f"{args.mode:10} peak RSS {rss_mb():8.1f} MB (+{rss_mb() - baseline:7.1f} MB over baseline)  {elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--mode", choices=["buffered", "streaming"])
+    parser.add_argument("--source")
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+
+    fd, source = tempfile.mkstemp(suffix=".pptx")
+    with os.fdopen(fd, "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+    print(f"{args.uploads} concurrent uploads of {args.size_mb} MB")
+    try:
+        for mode in ("buffered", "streaming"):
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_upload_memory", "--mode", mode,
+                            "--source", source, "--uploads", str(args.uploads)], check=True)
+    finally:
+        os.remove(source)
+
+
+if __name__ == "__main__":
+    main()
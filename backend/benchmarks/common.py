@@ -0,0 +1,139 @@
+"""Shared helpers for the benchmark scripts (run from backend/ as `python -m benchmarks.<name>`)."""
+import random
+import re
+import statistics
+import time
+import zlib
+import numpy as np
+
+WORDS = ("revenue growth market customer product launch quarter budget forecast risk team hiring "
+         "strategy roadmap pricing churn retention platform cloud security compliance partner "
+         "sales margin cost training onboarding design research survey feedback milestone").split()
+
+
+class SyntheticEncoder:
+    """Hashing bag-of-words encoder with the SentenceTransformer.encode signature (384-d like MiniLM)."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(token.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class RandomEncoder:
+    """Returns clustered random vectors, so building a large test index skips real encoding."""
+
+    def __init__(self):
+        self.offset = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        vectors = random_vectors(len(texts), seed=self.offset)
+        self.offset += len(texts)
+        return vectors
+
+
+def load_encoder(synthetic: bool, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    """Return the real SentenceTransformer, or a SyntheticEncoder when weights are unavailable."""
+    if synthetic:
+        return SyntheticEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class SyntheticCrossEncoder:
+    """
+    CrossEncoder.predict stand-in: scores a pair by the share of question words found in the chunk,
+    taking pair_ms per pair like a small cross-encoder on one CPU core.
+    """
+
+    def __init__(self, pair_ms: float = 3.0):
+        self.pair_ms = pair_ms
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False, **kwargs):
+        time.sleep(self.pair_ms * len(pairs) / 1000)
+        scores = []
+        for query, text in pairs:
+            words = set(re.findall(r"\w+", query.lower()))
+            scores.append(len(words & set(re.findall(r"\w+", text.lower()))) / max(1, len(words)))
+        return np.array(scores, dtype="float32")
+
+
+def load_cross_encoder(synthetic: bool, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", pair_ms: float = 3.0):
+    """Return the real CrossEncoder, or a SyntheticCrossEncoder when weights are unavailable."""
+    if synthetic:
+        return SyntheticCrossEncoder(pair_ms)
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
+
+
+def synthetic_sentences(n: int, words_per_sentence: int = 12, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_sentence)) + f" item{i}."
+            for i in range(n)]
+
+
+def write_synthetic_deck(path: str, slides: int = 20, seed: int = 0):
+    """Save a .pptx whose slides each have a title, bullets, a grouped pair of text boxes, a table and notes."""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    rng = random.Random(seed)
+    sentence = lambda n=10: " ".join(rng.choice(WORDS) for _ in range(n)) + "."
+    prs = Presentation()
+    for _ in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = sentence(4)
+        slide.placeholders[1].text_frame.text = "\n".join(sentence() for _ in range(4))
+        group = slide.shapes.add_group_shape()
+        for n in range(2):
+            group.shapes.add_textbox(Inches(1 + 3 * n), Inches(5), Inches(2), Inches(1)).text_frame.text = sentence(6)
+        table = slide.shapes.add_table(3, 3, Inches(1), Inches(6), Inches(6), Inches(1)).table
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = rng.choice(WORDS)
+        slide.notes_slide.notes_text_frame.text = sentence(20)
+    prs.save(path)
+
+
+def random_vectors(n: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 100), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype("float32")
+    return vectors.astype("float32")
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (result, elapsed_ms)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def recorded_histogram(registry, name: str, **labels):
+    """The Histogram a MetricsRegistry recorded for name and labels, or None."""
+    with registry._lock:
+        return registry._histograms.get(name, ("", {}))[1].get(tuple(sorted(labels.items())))
+
+
+def histogram_quantile(histogram, q: float) -> float:
+    """Upper bound of the bucket holding the q-quantile (inf if it is past the last bound)."""
+    rank, seen = q * histogram.count, 0
+    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        seen += count
+        if seen >= rank and seen:
+            return bound
+    return float("inf")
+
+
+def summarize(samples_ms: list) -> str:
+    samples = sorted(samples_ms)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean={statistics.mean(samples):8.2f} ms  p50={statistics.median(samples):8.2f} ms  p95={p95:8.2f} ms"
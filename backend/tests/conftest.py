@@ -0,0 +1,104 @@
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+
+
+class FakeEncoder:
+    """Deterministic bag-of-words stand-in for SentenceTransformer (no model download needed)."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.calls = 0
+        self.encoded = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        self.calls += 1
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(token.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+@pytest.fixture
+def fake_encoder():
+    return FakeEncoder()
+
+
+class MockGemini(BaseHTTPRequestHandler):
+    """Stands in for generativelanguage.googleapis.com: models answer on (stream)generateContent, not generateText."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, words):
+        """Send each word as one SSE chunk of a chunked response, like streamGenerateContent?alt=sse."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for n, word in enumerate(words):
+            text = word if n == 0 else " " + word
+            event = f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})}\r\n\r\n"
+            data = event.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.server.state["delay"])
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        state = self.server.state
+        state["connections"].add(self.client_address)
+        state["calls"].append(("GET", self.path, self.headers.get("x-goog-api-key")))
+        self._send(200, {"models": [{"name": "models/gemini-test"}]})
+
+    def do_POST(self):
+        state = self.server.state
+        state["connections"].add(self.client_address)
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["contents"][0]["parts"][0]["text"]
+        state["calls"].append(("POST", self.path, prompt))
+        if state["fail"] > 0:
+            state["fail"] -= 1
+            return self._send(503, {"error": "overloaded"}, {"Retry-After": "0"})
+        if "missing" in self.path or ":generateText" in self.path:
+            return self._send(404, {"error": {"code": 404}})
+        if ":streamGenerateContent" in self.path:
+            return self._stream(f"echo: {prompt}".split(" "))
+        with state["lock"]:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(state["delay"])
+        with state["lock"]:
+            state["in_flight"] -= 1
+        self._send(200, {"candidates": [{"content": {"parts": [{"text": f"echo: {prompt}"}]}}]})
+
+
+@pytest.fixture
+def gemini_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockGemini)
+    server.state = {"calls": [], "connections": set(), "fail": 0, "delay": 0.0,
+                    "lock": threading.Lock(), "in_flight": 0, "max_in_flight": 0}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
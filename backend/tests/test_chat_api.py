@@ -1,7 +1,7 @@
 import sys
 import os
+import json
 from fastapi.testclient import TestClient
-from unittest.mock import patch
 
 # Add backend/app to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -20,24 +20,101 @@ def test_root_endpoint():
     assert response.json() == {"message": "RAG PPT Chatbot API is running"}
 
 # -------------------------------
-# Test /chat endpoint with mock
+# Test /api/chat/ with an injected retriever
 # -------------------------------
-@patch("app.routes.chat_routes.generate_answer")  # Mock the service function
-def test_chat_endpoint_mock(mock_generate):
-    # Define mock return value
-    mock_generate.return_value = "This is a mocked summary of Chapter 1."
-
-    response = client.get(
-        "/chat/",
-        params={
-            "query": "Summarize Chapter 1",
-            "embeddings_file": "dummy.json"  # file does not need to exist
-        }
-    )
+class StubBatcher:
+    async def search(self, query, top_k=3, deck=None):
+        return [{"id": 0, "text": "first chunk", "score": -0.1}, {"id": 1, "text": "second chunk", "score": -0.2}]
+
+
+def test_chat_uses_shared_retriever():
+    from app.routes.dependencies import get_query_batcher
+
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    try:
+        response = client.get("/api/chat/", params={"query": "What is on slide 1?", "mode": "dense"})
+    finally:
+        app.dependency_overrides.clear()
 
     assert response.status_code == 200
+    assert response.json()["answer"] == "first chunk\n---\nsecond chunk"
+    assert set(response.json()["timings"]) == {"dense", "total_ms"}
+
+
+def test_chat_rejects_unknown_mode():
+    from app.routes.dependencies import get_query_batcher
+
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    try:
+        response = client.get("/api/chat/", params={"query": "hello", "mode": "fuzzy"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 400
+
+
+def test_chat_stream_without_gemini_key_matches_chat_answer():
+    from app.routes.dependencies import get_query_batcher, get_gemini
+    from app.services.gemini_client import GeminiClient
+
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    app.dependency_overrides[get_gemini] = lambda: GeminiClient(api_key="")
+    try:
+        params = {"query": "Summarize Chapter 1", "embeddings_file": "ALL", "mode": "dense"}
+        answer = client.get("/api/chat/", params=params).json()
+        streamed = client.get("/api/chat/stream", params=params)
+    finally:
+        app.dependency_overrides.clear()
+
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+              for block in streamed.text.strip().split("\n\n")]
+    assert [name for name, _ in events] == ["retrieval", "token", "done"]
+    assert answer["query"] == "Summarize Chapter 1" and answer["deck"] is None
+    assert events[-1][1]["answer"] == answer["answer"] == "first chunk\n---\nsecond chunk"
+
+
+def test_chat_stream_sends_retrieval_then_tokens(gemini_server):
+    from app.routes.dependencies import get_query_batcher, get_gemini
+    from app.services.gemini_client import GeminiClient
+
+    gemini = GeminiClient(api_key="test-key", base_url=f"http://127.0.0.1:{gemini_server.server_port}/v1")
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    app.dependency_overrides[get_gemini] = lambda: gemini
+    try:
+        response = client.get("/api/chat/stream", params={"query": "What is on slide 1?", "mode": "dense"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+              for block in response.text.strip().split("\n\n")]
+    names = [name for name, _ in events]
+    assert names[0] == "retrieval" and names[-1] == "done" and set(names[1:-1]) == {"token"}
+    assert [hit["text"] for hit in events[0][1]["hits"]] == ["first chunk", "second chunk"]
+    answer = "".join(data["text"] for name, data in events if name == "token")
+    assert answer == events[-1][1]["answer"] and answer.startswith("echo: What is on slide 1?")
+    assert len(names) > 3 and 0 < events[-1][1]["ttft_ms"] <= events[-1][1]["total_ms"]
+    # The prompt carries the retrieved chunks as numbered, cited excerpts
+    assert events[0][1]["context"]["citations"][0]["n"] == 1
+    assert "[1] unknown deck\nfirst chunk\n\n[2] unknown deck\nsecond chunk" in gemini_server.state["calls"][-1][2]
+
+
+def test_chat_stream_reports_gemini_failure_as_error_event(gemini_server):
+    from app.routes.dependencies import get_query_batcher, get_gemini
+    from app.services.gemini_client import GeminiClient
+
+    gemini = GeminiClient(api_key="test-key", base_url=f"http://127.0.0.1:{gemini_server.server_port}/v1",
+                          max_retries=0)
+    gemini_server.state["fail"] = 1
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    app.dependency_overrides[get_gemini] = lambda: gemini
+    try:
+        response = client.get("/api/chat/stream", params={"query": "Which slide failed?", "mode": "dense"})
+    finally:
+        app.dependency_overrides.clear()
 
-    data = response.json()
-    assert "query" in data
-    assert "answer" in data
-    assert data["answer"] == "This is a mocked summary of Chapter 1."
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+              for block in response.text.strip().split("\n\n")]
+    assert [name for name, _ in events] == ["retrieval", "error"]
+    assert "503" in events[-1][1]["detail"]
@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pytest
+from app.services.chunk_store import ChunkStore
+
+
+def test_replace_deck_and_lookup():
+    store = ChunkStore.empty().replace_deck("a.pptx", [0, 1], ["alpha", "beta"], [(1, 1), (2, 3)])
+    store = store.replace_deck("b.pptx", [2], ["gamma – ünïcode"])
+
+    assert dict(store) == {0: "alpha", 1: "beta", 2: "gamma – ünïcode"}
+    assert store.lookup(1) == {"text": "beta", "deck": "a.pptx", "slides": (2, 3)}
+    assert store.lookup(2)["slides"] is None
+    assert store.lookup(7) is None and 7 not in store
+    assert store.deck_counts() == {"a.pptx": 2, "b.pptx": 1}
+
+    # Re-uploading a deck drops its old rows and name, keeping the other deck intact
+    store = store.replace_deck("a.pptx", [3], ["alpha v2"])
+    assert dict(store) == {2: "gamma – ünïcode", 3: "alpha v2"}
+    assert store.deck_names == ["b.pptx", "a.pptx"] and store.deck_ids("a.pptx") == [3]
+
+    with pytest.raises(ValueError):
+        store.replace_deck("c.pptx", [1], ["reused id"])
+
+
+def test_save_and_load_are_memory_mapped(tmp_path):
+    base = os.path.join(tmp_path, "chunks")
+    store = ChunkStore.empty().replace_deck("a.pptx", [5, 6], ["first chunk", "second chunk"], [(1, 2), (3, 3)])
+    store.save(base, next_id=7)
+
+    loaded, header = ChunkStore.load(base)
+
+    assert header["next_id"] == 7 and header["decks"] == ["a.pptx"]
+    assert isinstance(loaded.blob.base, np.memmap) and isinstance(loaded.ids.base, np.memmap)
+    assert loaded[6] == "second chunk" and loaded.lookup(5)["slides"] == (1, 2)
+    assert not os.path.exists(base + ".json.tmp")
+
+
+def test_empty_store_round_trip(tmp_path):
+    base = os.path.join(tmp_path, "chunks")
+    ChunkStore.empty().save(base)
+
+    loaded, _ = ChunkStore.load(base)
+    assert len(loaded) == 0 and loaded.deck_counts() == {}
+
+    ChunkStore.remove(base)
+    assert not ChunkStore.exists(base) and os.listdir(tmp_path) == []
+
+
+def test_from_dict_matches_pickle_registry():
+    store = ChunkStore.from_dict({4: "four", 1: "one"}, {1: "x.pptx", 4: "y.pptx"}, {4: (2, 2)})
+
+    assert list(store) == [1, 4]
+    assert store.lookup(4) == {"text": "four", "deck": "y.pptx", "slides": (2, 2)}
@@ -0,0 +1,58 @@
+from app.services.chunker import chunk_records, count_tokens
+from app.services.ppt_loader import SlideRecord
+
+
+def record(slide, text, field="body", deck="deck"):
+    return SlideRecord(deck, slide, "Shape", "placeholder", field, text)
+
+
+def words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_small_slides_are_packed_together():
+    records = [record(1, "Agenda", "title"), record(1, "Goals for the quarter"),
+               record(2, "Pricing", "title"), record(3, "Questions?", "notes")]
+
+    chunks = chunk_records(records, target_tokens=50, overlap_tokens=5)
+
+    assert len(chunks) == 1
+    assert chunks[0].text == "Agenda\nGoals for the quarter\nPricing\nQuestions?"
+    assert (chunks[0].deck, chunks[0].slide_start, chunks[0].slide_end) == ("deck", 1, 3)
+    assert chunks[0].tokens == count_tokens(chunks[0].text)
+
+
+def test_new_chunk_starts_at_slide_boundary():
+    records = [record(1, words("a", 30)), record(2, words("b", 30)), record(3, words("c", 30))]
+
+    chunks = chunk_records(records, target_tokens=70, overlap_tokens=10)
+
+    # Slides are never cut when they fit, and no overlap is added across a slide boundary
+    assert [(c.slide_start, c.slide_end) for c in chunks] == [(1, 2), (3, 3)]
+    assert chunks[1].text == words("c", 30)
+
+
+def test_long_shape_is_split_with_overlap():
+    chunks = chunk_records([record(1, words("w", 100))], target_tokens=40, overlap_tokens=10)
+
+    assert all(c.tokens <= 40 for c in chunks)
+    assert chunks[0].text.split()[-10:] == chunks[1].text.split()[:10]
+    # Every word is covered, in order
+    covered = chunks[0].text.split() + [w for c in chunks[1:] for w in c.text.split()[10:]]
+    assert covered == words("w", 100).split()
+    assert {(c.slide_start, c.slide_end) for c in chunks} == {(1, 1)}
+
+
+def test_long_slide_is_split_between_shapes():
+    records = [record(1, words("a", 25)), record(1, words("b", 25)), record(1, words("c", 25))]
+
+    chunks = chunk_records(records, target_tokens=60, overlap_tokens=5)
+
+    assert [c.text.split("\n")[-1].split()[0] for c in chunks] == ["b0", "c0"]
+    assert chunks[1].text.startswith("b20 b21 b22 b23 b24\nc0")
+
+
+def test_decks_never_share_a_chunk():
+    chunks = chunk_records([record(1, "alpha", deck="one"), record(1, "beta", deck="two")])
+
+    assert [(c.deck, c.text) for c in chunks] == [("one", "alpha"), ("two", "beta")]
@@ -0,0 +1,32 @@
+from app.services.context_builder import build_context, minhash, similarity
+
+
+def hit(n, text, deck="Roadmap.pptx", slides=None):
+    return {"id": n, "text": text, "deck": deck, "slides": slides or (n, n)}
+
+
+LAUNCH = "The launch moves to the third quarter after the security review signs off on the new design."
+
+
+def test_near_duplicates_are_dropped_and_excerpts_follow_slide_order():
+    hits = [hit(5, LAUNCH), hit(2, "Budget grows by ten percent to fund the second data centre."),
+            hit(7, LAUNCH.replace("new design", "new design again")), hit(1, "Agenda and team introductions.")]
+    built = build_context("When is the launch?", hits, token_budget=1000, dedup_threshold=0.7)
+
+    assert built["duplicates"] == 1 and built["over_budget"] == 0
+    assert [c["id"] for c in built["citations"]] == [1, 2, 5]
+    assert built["context"].startswith("[1] Roadmap.pptx, slide 1\nAgenda")
+    assert built["prompt"].startswith("When is the launch?\n")
+    assert similarity(minhash(LAUNCH), minhash(LAUNCH)) == 1.0
+
+
+def test_budget_keeps_the_best_ranked_hits():
+    hits = [hit(n, f"Fact number {n} " + "detail " * 40) for n in range(1, 6)]
+    built = build_context("facts?", hits, token_budget=120, dedup_threshold=1.1)
+
+    assert [c["id"] for c in built["citations"]] == [1, 2]
+    assert built["over_budget"] == 3 and built["duplicates"] == 0
+    assert built["tokens_after"] < built["tokens_before"]
+    # Lexical index hits name their embeddings file instead of a deck and have no slide numbers
+    lexical = build_context("q", [{"text": "A sentence.", "source": "deck_embeddings.json", "score": 1.0}])
+    assert lexical["context"] == "[1] deck_embeddings.json\nA sentence."
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache
+from app.services.ppt_retriever import PPTRetriever
+
+
+def test_cache_hits_skip_encoding(tmp_path, fake_encoder):
+    cache = EmbeddingCache("fake", os.path.join(tmp_path, "cache.npz"))
+
+    first = cache.encode(["slide one", "slide two"], fake_encoder.encode)
+    second = cache.encode(["slide  one\n", "slide three"], fake_encoder.encode)
+
+    assert fake_encoder.encoded == 3  # whitespace-only edit of "slide one" is a hit
+    assert np.allclose(first[0], second[0])
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_cache_is_persisted_and_bounded(tmp_path, fake_encoder):
+    path = os.path.join(tmp_path, "cache.npz")
+    cache = EmbeddingCache("fake", path, max_entries=2)
+    cache.encode(["a", "b", "c"], fake_encoder.encode)
+    cache.save()
+
+    reloaded = EmbeddingCache("fake", path, max_entries=2)
+    reloaded.encode(["b", "c"], fake_encoder.encode)
+
+    assert cache.stats()["evictions"] == 1
+    assert reloaded.stats()["hits"] == 2 and reloaded.stats()["misses"] == 0
+
+
+def test_cache_is_keyed_by_model(tmp_path, fake_encoder):
+    path = os.path.join(tmp_path, "cache.npz")
+    EmbeddingCache("model-a", path).encode(["same text"], fake_encoder.encode)
+
+    assert EmbeddingCache("model-b", path).key("same text") != EmbeddingCache("model-a", path).key("same text")
+
+
+def test_reupload_of_edited_deck_only_encodes_new_slides(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    retriever.add_deck("a.pptx", ["intro slide", "pricing slide", "roadmap slide"])
+    encoded_before = fake_encoder.encoded
+
+    retriever.add_deck("a.pptx", ["intro slide", "pricing slide", "new hiring slide"])
+
+    assert fake_encoder.encoded - encoded_before == 1
+    assert retriever.stats()["embedding_cache"]["hits"] == 2
+
+
+def test_cache_is_saved_only_when_due_or_on_close(tmp_path, fake_encoder):
+    cache = EmbeddingCache("fake", os.path.join(tmp_path, "cache.npz"), save_every=3)
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder,
+                             embedding_cache=cache)
+
+    retriever.add_deck("a.pptx", ["intro slide", "pricing slide"])
+    assert not os.path.exists(cache.path) and cache.stats()["unsaved"] == 2
+
+    retriever.add_deck("b.pptx", ["hiring slide"])
+    assert os.path.exists(cache.path) and cache.stats()["unsaved"] == 0
+
+    retriever.add_deck("c.pptx", ["roadmap slide"])
+    retriever.close()
+    assert EmbeddingCache("fake", cache.path).stats()["entries"] == 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
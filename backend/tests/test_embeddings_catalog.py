@@ -0,0 +1,83 @@
+import json
+import os
+from app.services.embeddings_catalog import EmbeddingsCatalog
+
+
+def _write(path, text, mtime_offset=0):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"text": text}, f)
+    if mtime_offset:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+def test_catalog_reindexes_only_changed_files(tmp_path):
+    _write(tmp_path / "a_embeddings.json", "The launch moves to March.")
+    _write(tmp_path / "b_embeddings.json", "Hiring is paused.")
+    catalog = EmbeddingsCatalog(str(tmp_path), str(tmp_path / "lexical"))
+
+    index = catalog.index()
+    assert sorted(index.sources) == ["a_embeddings.json", "b_embeddings.json"]
+    assert catalog.index().search("launch")[0]["text"] == "The launch moves to March."
+    assert catalog.stats()["hits"] == 1
+
+    # Rewritten through a rename, as save_embeddings does: the directory changes, so the next query rescans
+    _write(tmp_path / "new.tmp", "The launch moves to June.", mtime_offset=10**9)
+    os.replace(tmp_path / "new.tmp", tmp_path / "a_embeddings.json")
+    refreshes = catalog.refreshes
+    assert catalog.index().search("launch")[0]["text"] == "The launch moves to June."
+    assert catalog.refreshes == refreshes + 1
+
+    os.remove(tmp_path / "b_embeddings.json")
+    assert catalog.index().sources == ["a_embeddings.json"]
+    assert "b_embeddings.json" not in catalog
+    stats = catalog.stats()
+    assert (stats["files"], stats["sentences"], stats["removals"]) == (1, 1, 1)
+
+    # Another process's catalog trusts files indexed after they were written
+    os.utime(tmp_path / "a_embeddings.json", ns=(0, 0))
+    fresh = EmbeddingsCatalog(str(tmp_path), str(tmp_path / "lexical"))
+    fresh.index()
+    assert fresh.refreshes == 0 and "a_embeddings.json" in fresh
+
+
+def test_scoped_lookup_and_invalidate_catch_in_place_edits(tmp_path):
+    path = tmp_path / "a_embeddings.json"
+    _write(path, "Budget is flat.")
+    catalog = EmbeddingsCatalog(str(tmp_path), str(tmp_path / "lexical"))
+    catalog.index()
+    catalog.index()
+
+    # Written in place: the directory does not change, so only a query scoped to the file notices
+    _write(path, "Budget grows ten percent.", mtime_offset=10**9)
+    assert catalog.index().search("budget")[0]["text"] == "Budget is flat."
+    assert catalog.index("a_embeddings.json").search("budget")[0]["text"] == "Budget grows ten percent."
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"text": "Budget is cut."}, f)
+    os.utime(path, ns=(0, 0))
+    catalog.invalidate()
+    assert catalog.index().search("budget")[0]["text"] == "Budget is cut."
+
+
+def test_save_embeddings_invalidates_the_shared_catalog(tmp_path, monkeypatch):
+    import numpy as np
+    from app.services import embeddings_catalog, vector_store
+
+    monkeypatch.setattr(vector_store, "EMBEDDINGS_DIR", str(tmp_path))
+    monkeypatch.setattr(vector_store, "LEXICAL_INDEX_PATH", str(tmp_path / "lexical"))
+    monkeypatch.setattr(embeddings_catalog, "_default_catalog", None)
+    catalog = embeddings_catalog.get_embeddings_catalog()
+
+    def save(text):
+        vector_store.save_embeddings("a_embeddings.json", {"chunks": [text], "embeddings": np.ones((1, 4)),
+                                                            "model": "fake"})
+        os.utime(tmp_path / "a_embeddings.json", ns=(0, 0))
+        os.utime(tmp_path, ns=(0, 0))
+
+    save("Budget is flat.")
+    assert catalog.index().search("budget")[0]["text"] == "Budget is flat."
+
+    # Same size, same mtime, same directory stamp: only the save's invalidation reveals the rewrite
+    save("Budget is cut!!")
+    assert catalog.index().search("budget")[0]["text"] == "Budget is cut!!"
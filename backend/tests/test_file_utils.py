@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.file_utils import atomic_write, stream_upload_to_disk, commit_upload, UploadTooLarge
+
+
+def make_upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="deck.pptx")
+
+
+def test_stream_upload_hashes_and_commits(tmp_path):
+    data = os.urandom(300_000)
+
+    upload = asyncio.run(stream_upload_to_disk(make_upload(data), str(tmp_path), chunk_size=64 * 1024))
+    final_path = commit_upload(upload["temp_path"], os.path.join(tmp_path, "deck.pptx"))
+
+    assert upload["sha256"] == hashlib.sha256(data).hexdigest() and upload["size"] == len(data)
+    with open(final_path, "rb") as f:
+        assert f.read() == data
+    assert os.listdir(tmp_path) == ["deck.pptx"]
+
+
+def test_stream_upload_rejects_oversize_and_cleans_up(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(stream_upload_to_disk(make_upload(b"x" * 5000), str(tmp_path), max_bytes=4096, chunk_size=1024))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_oversize_upload_is_rejected_before_reading():
+    response = TestClient(app).post("/api/upload/upload/ppt", content=b"",
+                                    headers={"Content-Length": str(10 ** 12), "Content-Type": "multipart/form-data"})
+
+    assert response.status_code == 413
+
+
+def test_atomic_write_uses_unique_temp_files_and_cleans_up(tmp_path):
+    path = os.path.join(tmp_path, "data.bin")
+    temp_paths = []
+
+    def write(tmp):
+        temp_paths.append(tmp)
+        with open(tmp, "wb") as f:
+            f.write(b"new")
+
+    atomic_write(path, write)
+    atomic_write(path, write)
+    with pytest.raises(OSError):
+        atomic_write(path, lambda tmp: (write(tmp), os.open(os.path.join(tmp_path, "missing", "x"), os.O_RDONLY)))
+
+    assert len(set(temp_paths)) == 3 and os.path.dirname(temp_paths[0]) == str(tmp_path)
+    assert os.listdir(tmp_path) == ["data.bin"]
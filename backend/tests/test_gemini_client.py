@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import aclosing
+import pytest
+from app.services import generator
+from app.services.gemini_client import GeminiClient, GeminiError
+
+
+def make_client(server, **kwargs):
+    return GeminiClient(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}/v1",
+                        backoff=0.01, **kwargs)
+
+
+def test_endpoint_is_discovered_once_and_connections_are_reused(gemini_server):
+    async def run():
+        client = make_client(gemini_server)
+        try:
+            answers = [await client.generate("gemini-test", f"q{n}") for n in range(3)]
+            models = await client.list_models()
+            return answers, models, client.endpoints
+        finally:
+            await client.close()
+
+    answers, models, endpoints = asyncio.run(run())
+    assert answers == ["echo: q0", "echo: q1", "echo: q2"]
+    assert models["models"][0]["name"] == "models/gemini-test"
+    assert endpoints == {"models/gemini-test": "generateContent"}
+    calls = gemini_server.state["calls"]
+    # One POST per answer, the API key sent as a header, and one kept-alive connection
+    assert [path for method, path, _ in calls if method == "POST"] == ["/v1/models/gemini-test:generateContent"] * 3
+    assert calls[-1] == ("GET", "/v1/models", "test-key")
+    assert len(gemini_server.state["connections"]) == 1
+
+
+def test_retries_then_gives_up(gemini_server):
+    gemini_server.state["fail"] = 2
+
+    async def run(max_retries):
+        client = make_client(gemini_server, max_retries=max_retries)
+        try:
+            return await client.generate("gemini-test", "hello"), client.retries
+        finally:
+            await client.close()
+
+    assert asyncio.run(run(2)) == ("echo: hello", 2)
+    gemini_server.state["fail"] = 5
+    with pytest.raises(GeminiError) as error:
+        asyncio.run(run(1))
+    assert error.value.status_code == 503
+
+
+def test_unknown_model_is_a_404_after_trying_every_endpoint(gemini_server, monkeypatch):
+    async def run():
+        client = make_client(gemini_server)
+        try:
+            return await generator.gemini_generate_answer("hi", client=client)
+        finally:
+            await client.close()
+
+    monkeypatch.setattr(generator, "CHAT_MODEL", "models/missing")
+    answer = asyncio.run(run())
+    assert answer.startswith("[Gemini API error: 404 Not Found")
+    assert [path for _, path, _ in gemini_server.state["calls"]] == \
+        ["/v1/models/missing:generateContent", "/v1/models/missing:generateText"]
+
+
+def test_concurrency_is_limited(gemini_server):
+    gemini_server.state["delay"] = 0.05
+
+    async def run():
+        client = make_client(gemini_server, max_concurrency=2)
+        try:
+            return await asyncio.gather(*(client.generate("gemini-test", f"q{n}") for n in range(6)))
+        finally:
+            await client.close()
+
+    assert len(asyncio.run(run())) == 6
+    assert gemini_server.state["max_in_flight"] == 2
+
+
+def test_stream_generate_yields_pieces_and_falls_back_without_streaming(gemini_server):
+    async def run(model):
+        client = make_client(gemini_server)
+        try:
+            return [piece async for piece in client.stream_generate(model, "hello there")]
+        finally:
+            await client.close()
+
+    assert asyncio.run(run("gemini-test")) == ["echo:", " hello", " there"]
+    assert gemini_server.state["calls"][-1][1] == "/v1/models/gemini-test:streamGenerateContent?alt=sse"
+    # A model that only answers on generateText would 404 on the stream; the mock 404s on both
+    with pytest.raises(GeminiError) as error:
+        asyncio.run(run("missing"))
+    assert error.value.status_code == 404
+
+
+def test_abandoned_answer_stream_releases_its_concurrency_slot(gemini_server, monkeypatch):
+    monkeypatch.setattr(generator, "get_query_cache", lambda: None)
+    gemini_server.state["delay"] = 0.05
+
+    async def run():
+        client = make_client(gemini_server, max_concurrency=1)
+        try:
+            stream = generator.stream_gemini_answer("hello there", client=client)
+            # The consumer (a disconnected SSE client) goes away after the first piece
+            async with aclosing(stream):
+                first = await stream.__anext__()
+            released = not client._semaphore.locked()
+            return first, released, await asyncio.wait_for(client.generate("gemini-test", "next"), 5)
+        finally:
+            await client.close()
+
+    first, released, answer = asyncio.run(run())
+    assert first == "echo:" and released and answer == "echo: next"
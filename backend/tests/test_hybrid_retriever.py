@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+import pytest
+from app.services.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.worker_pool import WorkerPool, WorkerPoolFull
+
+
+def hit(chunk_id, text):
+    return {"id": chunk_id, "text": text, "deck": "a.pptx", "slides": None, "score": 0.0}
+
+
+def test_rrf_rewards_agreement_and_dedupes():
+    dense = [hit(1, "Alpha"), hit(2, "Beta"), hit(3, "Gamma")]
+    lexical = [hit(3, "Gamma"), hit(9, "alpha "), hit(4, "Delta")]
+
+    fused = reciprocal_rank_fusion({"dense": dense, "lexical": lexical}, k=60, top_k=10)
+
+    # Gamma (ranks 3 and 1) edges out Alpha (rank 1, plus the same text under ID 9 at rank 2)
+    assert [h["text"] for h in fused] == ["Alpha", "Gamma", "Beta", "Delta"]
+    assert fused[0]["ranks"] == {"dense": 1, "lexical": 2} and fused[1]["ranks"] == {"dense": 3, "lexical": 1}
+    assert fused[0]["score"] == 1 / 61 + 1 / 62
+
+    weighted = reciprocal_rank_fusion({"dense": dense, "lexical": lexical}, {"dense": 0.1}, k=60, top_k=1)
+    assert weighted[0]["text"] == "Gamma"
+
+
+def test_hybrid_finds_exact_terms_dense_search_misses(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    filler = [f"quarterly revenue review and planning notes part {n}" for n in range(30)]
+    retriever.add_deck("a.pptx", filler + ["Compliance owner for SOC2 is the security team"],
+                       slide_ranges=[(n + 1, n + 1) for n in range(31)])
+
+    async def run(mode):
+        batcher = QueryBatcher(retriever, max_wait_ms=1)
+        await batcher.start()
+        try:
+            return await HybridRetriever(batcher, candidates=5).search("SOC2 revenue review", top_k=5, mode=mode)
+        finally:
+            await batcher.stop()
+
+    dense_hits, _ = asyncio.run(run("dense"))
+    lexical_hits, _ = asyncio.run(run("lexical"))
+    hybrid_hits, timings = asyncio.run(run("hybrid"))
+
+    assert not any("SOC2" in h["text"] for h in dense_hits)
+    assert lexical_hits[0]["slides"] == (31, 31)
+    soc2 = [h for h in hybrid_hits if "SOC2" in h["text"]]
+    assert len(hybrid_hits) == 5 and soc2[0]["ranks"] == {"lexical": 1}
+    assert set(timings) == {"dense", "lexical", "fusion", "total_ms"}
+    assert timings["dense"]["budget_ms"] > 0 and timings["total_ms"] >= timings["fusion"]["ms"]
+
+
+def test_lexical_index_follows_deck_updates_and_reloads(tmp_path, fake_encoder):
+    index_path = os.path.join(tmp_path, "faiss.index")
+    retriever = PPTRetriever(index_path=index_path, model=fake_encoder)
+    retriever.add_deck("a.pptx", ["kickoff agenda", "OKR review for Q3"])
+    retriever.add_deck("b.pptx", ["Q3 hiring plan"])
+    retriever.add_deck("a.pptx", ["kickoff agenda v2"])
+
+    assert [h["deck"] for h in retriever.lexical_search("Q3")] == ["b.pptx"]
+
+    # A second worker loads the saved postings against the same chunk store
+    other = PPTRetriever(index_path=index_path, model=fake_encoder)
+    assert [h["text"] for h in other.lexical_search("kickoff")] == ["kickoff agenda v2"]
+    assert isinstance(other.snapshot().lexical.post_rows.base, type(other.snapshot().chunks.ids.base))
+
+
+def test_lexical_search_is_refused_when_the_query_pool_is_full(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    retriever.add_deck("a.pptx", ["budget forecast"])
+    pool = WorkerPool("query", 1, 0)
+    release = threading.Event()
+
+    async def run():
+        batcher = QueryBatcher(retriever, max_wait_ms=1, pool=pool)
+        await batcher.start()
+        busy = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(WorkerPoolFull):
+                await HybridRetriever(batcher).search("budget", mode="lexical")
+        finally:
+            release.set()
+            await busy
+            await batcher.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert pool.stats()["rejected"] == 1
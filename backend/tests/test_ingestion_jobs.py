@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routes.dependencies import get_ingest_pool, get_ingestion_queue
+from app.services.ingestion_jobs import JobStore, IngestionQueue
+from app.services.worker_pool import WorkerPool
+
+
+def wait_for(store, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_queue_runs_pipeline_and_records_progress(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+
+    def pipeline(job, report):
+        report("extracting")
+        for slide in range(1, 4):
+            report("extracting", slide, 3)
+        report("indexing")
+        return {"num_chunks": 3}
+
+    queue = IngestionQueue(store, pipeline, workers=1)
+    queue.start()
+    try:
+        job, duplicate = queue.submit("deck.pptx", "/tmp/deck.pptx", "abc")
+        done = wait_for(store, job["id"])
+    finally:
+        queue.stop()
+
+    assert not duplicate
+    assert done["status"] == "succeeded" and done["stage"] == "done" and done["progress"] == 1.0
+    assert done["slides_done"] == done["slides_total"] == 3
+    assert done["result"] == {"num_chunks": 3}
+
+
+def test_failed_job_keeps_error(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+
+    def pipeline(job, report):
+        raise ValueError("corrupt deck")
+
+    queue = IngestionQueue(store, pipeline, workers=1)
+    queue.start()
+    try:
+        job, _ = queue.submit("deck.pptx", "/tmp/deck.pptx", "abc")
+        done = wait_for(store, job["id"])
+    finally:
+        queue.stop()
+
+    assert done["status"] == "failed" and done["error"] == "corrupt deck"
+
+
+def test_duplicates_are_deduplicated_until_deck_is_removed(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    queue = IngestionQueue(store, lambda job, report: None, workers=0)
+
+    first, _ = queue.submit("deck.pptx", "/tmp/deck.pptx", "abc")
+    again, duplicate = queue.submit("deck.pptx", "/tmp/deck.pptx", "abc")
+    other, other_duplicate = queue.submit("deck.pptx", "/tmp/deck.pptx", "def")
+    assert duplicate and again["id"] == first["id"]
+    assert not other_duplicate
+
+    store.update(first["id"], status="succeeded")
+    store.update(other["id"], status="succeeded")
+    store.mark_removed("deck.pptx")
+    assert queue.submit("deck.pptx", "/tmp/deck.pptx", "abc")[1] is False
+
+
+def test_only_the_latest_job_of_a_deck_is_a_duplicate(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    queue = IngestionQueue(store, lambda job, report: None, workers=0)
+
+    a, _ = queue.submit("deck.pptx", "/tmp/a/deck.pptx", "aaa")
+    store.update(a["id"], status="succeeded")
+    b, _ = queue.submit("deck.pptx", "/tmp/b/deck.pptx", "bbb")
+    store.update(b["id"], status="succeeded")
+
+    # The index now serves B, so uploading A again must re-index it
+    again, duplicate = queue.submit("deck.pptx", "/tmp/c/deck.pptx", "aaa")
+    assert not duplicate and again["id"] != a["id"]
+    assert queue.submit("deck.pptx", "/tmp/d/deck.pptx", "aaa")[0]["id"] == again["id"]
+
+
+def test_running_jobs_resume_after_restart(tmp_path):
+    db_path = os.path.join(tmp_path, "jobs.sqlite3")
+    store = JobStore(db_path)
+    job = store.create("deck.pptx", "/tmp/deck.pptx", "abc")
+    assert store.claim_next("dead-worker")["id"] == job["id"]
+    store.close()  # process dies mid-job
+
+    restarted = JobStore(db_path)
+    queue = IngestionQueue(restarted, lambda job, report: {"ok": True}, workers=1, stale_seconds=0.2)
+    queue.start()
+    try:
+        assert wait_for(restarted, job["id"])["status"] == "succeeded"
+    finally:
+        queue.stop()
+
+
+def test_jobs_of_a_live_sibling_worker_are_not_requeued(tmp_path):
+    db_path = os.path.join(tmp_path, "jobs.sqlite3")
+    release = threading.Event()
+    runs = []
+
+    def pipeline(job, report):
+        runs.append(job["id"])
+        release.wait(5)
+
+    busy = IngestionQueue(JobStore(db_path), pipeline, workers=1, stale_seconds=0.3)
+    busy.start()
+    job, _ = busy.submit("deck.pptx", "/tmp/deck.pptx", "abc")
+    while not runs:
+        time.sleep(0.01)
+    # A second worker process starting (or restarting) while the first is mid-job
+    sibling = IngestionQueue(JobStore(db_path), pipeline, workers=1, stale_seconds=0.3)
+    sibling.start()
+    try:
+        time.sleep(1.0)
+        assert busy.store.get(job["id"])["status"] == "running"
+        assert busy.store.get(job["id"])["owner"] == busy.owner
+        release.set()
+        assert wait_for(busy.store, job["id"])["status"] == "succeeded"
+    finally:
+        release.set()
+        busy.stop()
+        sibling.stop()
+    assert runs == [job["id"]]
+
+
+def test_versions_of_one_deck_are_indexed_one_at_a_time_in_order(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    lock = threading.Lock()
+    running, order, overlapping = set(), [], []
+
+    def pipeline(job, report):
+        with lock:
+            if job["deck"] in running:
+                overlapping.append(job["sha256"])
+            running.add(job["deck"])
+            order.append(job["sha256"])
+        time.sleep(0.2)
+        with lock:
+            running.discard(job["deck"])
+
+    queue = IngestionQueue(store, pipeline, workers=2, max_queued=10)
+    v1, _ = queue.submit("deck.pptx", "/tmp/v1/deck.pptx", "v1")
+    v2, _ = queue.submit("deck.pptx", "/tmp/v2/deck.pptx", "v2")
+    other, _ = queue.submit("other.pptx", "/tmp/other.pptx", "o1")
+    queue.start()
+    try:
+        jobs = [wait_for(store, job["id"]) for job in (v1, v2, other)]
+    finally:
+        queue.stop()
+
+    assert all(job["status"] == "succeeded" for job in jobs)
+    # While v1 runs, the second worker skips v2 and takes the other deck
+    assert order == ["v1", "o1", "v2"] and overlapping == []
+
+
+def test_upload_returns_job_id_and_status_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.routes.upload_routes.RAW_PPT_DIR", str(tmp_path))
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    queue = IngestionQueue(store, lambda job, report: None, workers=0)
+    pool = WorkerPool("ingest", 1, 1)
+    app.dependency_overrides[get_ingestion_queue] = lambda: queue
+    app.dependency_overrides[get_ingest_pool] = lambda: pool
+    try:
+        client = TestClient(app)
+        upload = client.post("/api/upload/upload/ppt", files={"file": ("deck.pptx", b"pptx bytes", "application/octet-stream")})
+        repeat = client.post("/api/upload/upload/ppt", files={"file": ("deck.pptx", b"pptx bytes", "application/octet-stream")})
+        newer = client.post("/api/upload/upload/ppt", files={"file": ("deck.pptx", b"new bytes", "application/octet-stream")})
+        status = client.get(f"/api/upload/upload/jobs/{upload.json()['job_id']}")
+    finally:
+        app.dependency_overrides.clear()
+        pool.shutdown()
+
+    assert upload.status_code == 202 and upload.json()["status"] == "queued"
+    assert repeat.json()["duplicate"] and repeat.json()["job_id"] == upload.json()["job_id"]
+    assert status.json()["deck"] == "deck.pptx" and status.json()["stage"] == "queued"
+    # Each upload has its own file, so the still-queued first job keeps its bytes
+    assert status.json()["ppt_path"] == os.path.join(tmp_path, upload.json()["job_id"], "deck.pptx")
+    assert newer.json()["ppt_path"] != status.json()["ppt_path"]
+    with open(status.json()["ppt_path"], "rb") as f:
+        assert f.read() == b"pptx bytes"
+    with open(newer.json()["ppt_path"], "rb") as f:
+        assert f.read() == b"new bytes"
+
+
+def test_replaced_uploads_are_removed_once_a_newer_version_is_indexed(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    paths = []
+    for n in range(2):
+        path = os.path.join(tmp_path, f"job{n}", "deck.pptx")
+        os.makedirs(os.path.dirname(path))
+        open(path, "wb").close()
+        paths.append(path)
+    old = store.create("deck.pptx", paths[0], "aaa")
+    store.update(old["id"], status="succeeded")
+    queue = IngestionQueue(store, lambda job, report: None, workers=1)
+    queue.start()
+    try:
+        new, _ = queue.submit("deck.pptx", paths[1], "bbb")
+        wait_for(store, new["id"])
+    finally:
+        queue.stop()
+
+    assert not os.path.exists(os.path.dirname(paths[0]))
+    assert os.path.exists(paths[1])
+
+
+def test_run_ppt_pipeline_indexes_slide_chunks(tmp_path, monkeypatch, fake_encoder):
+    from pptx import Presentation
+    from app.services import ppt_loader
+    from app.services.ingestion_jobs import run_ppt_pipeline
+    from app.services.ppt_retriever import PPTRetriever
+
+    path = str(tmp_path / "plan.pptx")
+    prs = Presentation()
+    for title, body in (("Roadmap", "Ship the mobile app"), ("Budget", "Hire two engineers")):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = title
+        slide.placeholders[1].text_frame.text = body
+    prs.save(path)
+    monkeypatch.setattr(ppt_loader, "EXTRACTED_TEXT_DIR", str(tmp_path))
+    retriever = PPTRetriever(index_path=str(tmp_path / "faiss.index"), chunk_path=str(tmp_path / "faiss_chunks.pkl"),
+                             model=fake_encoder)
+    stages = []
+
+    result = run_ppt_pipeline(retriever, {"deck": "plan.pptx", "ppt_path": path}, lambda stage, *_: stages.append(stage))
+
+    assert result["num_chunks"] == 1 and os.path.exists(result["extracted_text_path"])
+    assert stages[0] == "extracting" and stages[-2:] == ["chunking", "indexing"]
+    hit = retriever.search("mobile app roadmap", top_k=1)[0]
+    assert (hit["deck"], hit["slides"]) == ("plan.pptx", (1, 2))
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+from app.services import generator
+from app.services.chunk_store import ChunkStore
+from app.services.lexical_index import (
+    LexicalIndex, split_sentences, tokenize, index_source, remove_source, load_lexical_index
+)
+
+
+def test_tokenize_and_split_sentences():
+    assert tokenize("What is the Q3 revenue?") == ["q3", "revenue"]
+    assert split_sentences("Title\nFirst point. Second point?\n\n\x0bThird") == \
+        ["Title", "First point.", "Second point?", "Third"]
+
+
+def test_bm25_ranks_rare_terms_and_filters_by_source():
+    index = LexicalIndex.build({
+        "a.json": ["Revenue grew in the third quarter.", "Hiring plan for the sales team."],
+        "b.json": ["Revenue forecast and churn risk.", "Churn fell after the pricing change."],
+    })
+
+    hits = index.search("churn pricing", top_k=3)
+    assert [hit["text"] for hit in hits][:2] == ["Churn fell after the pricing change.", "Revenue forecast and churn risk."]
+    assert hits[0]["source"] == "b.json" and hits[0]["score"] > hits[1]["score"] > 0
+
+    assert [hit["source"] for hit in index.search("revenue", source="a.json")] == ["a.json"]
+    assert index.search("revenue", source="missing.json") == []
+    assert index.search("the of and") == [] and index.search("unknownword") == []
+
+
+def test_replace_source_matches_a_fresh_build():
+    index = LexicalIndex.build({"a.json": ["alpha beta", "beta gamma"], "b.json": ["gamma delta"]})
+    index = index.replace_source("a.json", ["epsilon beta"])
+    fresh = LexicalIndex.build({"b.json": ["gamma delta"], "a.json": ["epsilon beta"]})
+
+    # Terms only a.json used are gone, and scores do not depend on the order sources were added
+    assert "alpha" not in index.terms and len(index) == 2
+    for query in ("beta", "gamma", "epsilon delta"):
+        assert [(h["text"], round(h["score"], 6)) for h in index.search(query)] == \
+            [(h["text"], round(h["score"], 6)) for h in fresh.search(query)]
+    assert index.replace_source("a.json", []).sources == ["b.json"]
+
+
+def test_saved_index_is_memory_mapped_and_reloaded_after_updates(tmp_path):
+    base = os.path.join(tmp_path, "lexical")
+    assert len(load_lexical_index(base)) == 0
+
+    index_source("deck1_embeddings.json", "Roadmap review.\nLaunch date moved to May.", base)
+    first = load_lexical_index(base)
+    assert isinstance(first.post_rows.base, np.memmap)
+    assert load_lexical_index(base) is first
+
+    index_source("deck2_embeddings.json", "Launch checklist for the platform team.", base)
+    second = load_lexical_index(base)
+    assert second is not first
+    assert {hit["source"] for hit in second.search("launch")} == {"deck1_embeddings.json", "deck2_embeddings.json"}
+
+    remove_source("deck1_embeddings.json", base)
+    assert load_lexical_index(base).sources == ["deck2_embeddings.json"]
+
+
+def test_generator_answers_from_the_lexical_index(monkeypatch):
+    index = LexicalIndex.build({"deck_embeddings.json": ["Agenda.", "The SLA target is 99.9% uptime."]})
+    monkeypatch.setattr(generator, "_lexical_index", lambda embeddings_file=None: index)
+
+    answer, source = generator.search_all_embeddings("What is the SLA target?")
+    assert source == "deck_embeddings.json"
+    assert answer == "Found relevant info (from deck_embeddings.json): The SLA target is 99.9% uptime."
+    assert generator.simple_rag("uptime", "deck_embeddings.json") == "Found relevant info: The SLA target is 99.9% uptime."
+    assert generator.search_all_embeddings("nothing matches") == ("No relevant info found across embeddings.", None)
+
+
+def test_source_filter_with_interleaved_rows():
+    # Pre-ChunkStore registries can interleave decks; the filter falls back to a row mask
+    store = ChunkStore.from_dict({0: "launch plan", 1: "launch budget", 2: "launch date"},
+                                 {0: "a.pptx", 1: "b.pptx", 2: "a.pptx"})
+    index = LexicalIndex.from_store(store)
+
+    assert sorted(hit["id"] for hit in index.search("launch", source="a.pptx")) == [0, 2]
+    assert [hit["id"] for hit in index.search("launch budget", source="b.pptx")] == [1]
@@ -0,0 +1,89 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from app import main
+from app.main import app
+from app.routes.dependencies import get_query_batcher
+from app.utils.metrics import MetricsRegistry, Sample, registry
+from app.utils.profiler import ProfilerBusy, folded_text, sample_stacks
+
+
+class StubBatcher:
+    async def search(self, query, top_k=3, deck=None):
+        return [{"id": 0, "text": "first chunk", "score": -0.1}]
+
+
+def test_registry_renders_prometheus_text():
+    metrics = MetricsRegistry(enabled=True)
+    for seconds in (0.125, 0.25, 2.0):
+        metrics.observe("stage_seconds", seconds, "Time per stage.", buckets=(0.25, 1.0), stage="encode")
+    text = metrics.render([Sample("queue_depth", "gauge", "Queued jobs.", {"pool": 'a "b"'}, 3),
+                           Sample("skipped", "gauge", "No value yet.", None, None)])
+
+    assert text.splitlines() == [
+        "# HELP pptqa_stage_seconds Time per stage.",
+        "# TYPE pptqa_stage_seconds histogram",
+        'pptqa_stage_seconds_bucket{stage="encode",le="0.25"} 2',
+        'pptqa_stage_seconds_bucket{stage="encode",le="1.0"} 2',
+        'pptqa_stage_seconds_bucket{stage="encode",le="+Inf"} 3',
+        'pptqa_stage_seconds_sum{stage="encode"} 2.375',
+        'pptqa_stage_seconds_count{stage="encode"} 3',
+        "# HELP pptqa_queue_depth Queued jobs.",
+        "# TYPE pptqa_queue_depth gauge",
+        'pptqa_queue_depth{pool="a \\"b\\""} 3.0',
+    ]
+    assert MetricsRegistry(enabled=False).render() == "\n"
+
+
+def test_chat_request_reports_stages_in_server_timing_and_metrics(monkeypatch):
+    monkeypatch.setattr(main, "SERVER_TIMING", True)
+    registry.clear()
+    app.dependency_overrides[get_query_batcher] = lambda: StubBatcher()
+    try:
+        client = TestClient(app)
+        response = client.get("/api/chat/", params={"query": "What is on slide 1?", "mode": "dense"})
+        metrics = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["retrieve_dense", "total"]
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'pptqa_stage_seconds_count{stage="retrieve_dense"} 1' in metrics.text
+    assert ('pptqa_http_request_seconds_count{method="GET",route="/api/chat/",status="200"} 1'
+            in metrics.text)
+
+
+def test_profiler_samples_other_threads_and_is_opt_in():
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_loop, name="busy")
+    worker.start()
+    try:
+        profile = sample_stacks(0.2, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile["samples"] > 5
+    assert any(stack.startswith("busy;") and "busy_loop" in stack for stack in profile["stacks"])
+    assert folded_text(profile).endswith("\n")
+    assert TestClient(app).get("/metrics/profile", params={"seconds": 0.1}).status_code == 404
+
+
+def test_profiler_refuses_concurrent_profiles():
+    first = threading.Thread(target=sample_stacks, args=(0.3,))
+    first.start()
+    time.sleep(0.05)
+    try:
+        sample_stacks(0.01)
+        raised = False
+    except ProfilerBusy:
+        raised = True
+    first.join()
+    assert raised
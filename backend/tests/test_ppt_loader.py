@@ -24,3 +24,90 @@ def test_process_ppt_creates_text_file():
 
     # Check the filename is in EXTRACTED_TEXT_DIR
     assert txt_path.startswith(EXTRACTED_TEXT_DIR), "Text file not in correct directory"
+
+
+def _write_deck(path):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "Quarterly review"
+    slide.placeholders[1].text_frame.text = "Revenue grew 12%"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(1), Inches(5), Inches(2), Inches(1)).text_frame.text = "Grouped caption"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(6), Inches(4), Inches(1)).table
+    table.cell(0, 0).text, table.cell(0, 1).text = "Region", "Sales"
+    table.cell(1, 0).text, table.cell(1, 1).text = "EMEA", "4.2M"
+    slide.notes_slide.notes_text_frame.text = "Mention the EMEA launch"
+    prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = "Next steps"
+    prs.save(path)
+
+
+def test_iter_slide_records_covers_groups_tables_and_notes(tmp_path):
+    from app.services.ppt_loader import iter_slide_records
+
+    path = str(tmp_path / "review.pptx")
+    _write_deck(path)
+    progress = []
+
+    records = list(iter_slide_records(path, progress=lambda done, total: progress.append((done, total))))
+
+    assert {r.deck for r in records} == {"review"}
+    assert [(r.slide, r.field, r.text) for r in records] == [
+        (1, "title", "Quarterly review"),
+        (1, "body", "Revenue grew 12%"),
+        (1, "body", "Grouped caption"),
+        (1, "table_cell", "Region"),
+        (1, "table_cell", "Sales"),
+        (1, "table_cell", "EMEA"),
+        (1, "table_cell", "4.2M"),
+        (1, "notes", "Mention the EMEA launch"),
+        (2, "title", "Next steps"),
+    ]
+    assert records[2].kind == "text_box" and records[3].kind == "table"
+    assert progress == [(1, 2), (2, 2)]
+
+
+def test_unrecognized_shapes_are_read_as_plain_text_frames(tmp_path):
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.util import Inches
+    from app.services.ppt_loader import iter_slide_records
+
+    path = str(tmp_path / "odd.pptx")
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(1), Inches(1), Inches(3), Inches(1))
+    shape.text_frame.text = "Callout without geometry"
+    # An sp with no preset or custom geometry: python-pptx raises NotImplementedError for its shape_type
+    geometry = shape._element.spPr.prstGeom
+    geometry.getparent().remove(geometry)
+    slide.shapes.add_textbox(Inches(1), Inches(3), Inches(3), Inches(1)).text_frame.text = "Regular caption"
+    prs.save(path)
+
+    records = list(iter_slide_records(path))
+
+    assert [(r.kind, r.field, r.text) for r in records] == [
+        ("shape", "body", "Callout without geometry"),
+        ("text_box", "body", "Regular caption"),
+    ]
+
+
+def test_process_ppt_dir_extracts_every_deck_in_parallel(tmp_path, monkeypatch):
+    from app.services import ppt_loader
+
+    ppt_dir, out_dir = tmp_path / "raw", tmp_path / "out"
+    ppt_dir.mkdir()
+    out_dir.mkdir()
+    for name in ("a", "b", "c"):
+        _write_deck(str(ppt_dir / f"{name}.pptx"))
+    monkeypatch.setattr(ppt_loader, "EXTRACTED_TEXT_DIR", str(out_dir))
+
+    results = ppt_loader.process_ppt_dir(str(ppt_dir), workers=2)
+
+    assert sorted(os.path.basename(p) for p in results) == ["a.pptx", "b.pptx", "c.pptx"]
+    for txt_path in results.values():
+        assert txt_path.startswith(str(out_dir))
+        records = ppt_loader.load_slide_records(txt_path[:-len(".txt")] + ".slides.jsonl")
+        assert len(records) == 9 and records[-1].slide == 2
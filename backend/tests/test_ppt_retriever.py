@@ -0,0 +1,265 @@
+import os
+import pickle
+import threading
+import faiss
+import numpy as np
+from app.services.ppt_retriever import PPTRetriever, IndexConfig, DEFAULT_DECK
+
+
+def make_retriever(tmp_path, encoder):
+    return PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                        chunk_path=os.path.join(tmp_path, "faiss_chunks.pkl"),
+                        model=encoder)
+
+
+def test_create_index_and_retrieve(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.create_index(["Revenue grew in 2023", "The team hired engineers", "Office moved to Berlin"])
+
+    assert retriever.retrieve("office in Berlin", top_k=1) == ["Office moved to Berlin"]
+
+
+def test_index_is_reloaded_from_disk(tmp_path, fake_encoder):
+    make_retriever(tmp_path, fake_encoder).add_deck("a.pptx", ["alpha slide", "beta slide"])
+
+    reloaded = make_retriever(tmp_path, fake_encoder)
+    assert sorted(reloaded.chunks.values()) == ["alpha slide", "beta slide"]
+    assert reloaded.list_decks() == {"a.pptx": 2}
+    assert reloaded.index.ntotal == 2
+
+
+def test_slide_ranges_are_returned_and_persisted(tmp_path, fake_encoder):
+    make_retriever(tmp_path, fake_encoder).add_deck("a.pptx", ["intro agenda", "", "pricing tiers"],
+                                                    slide_ranges=[(1, 2), (3, 3), (3, 5)])
+
+    hits = make_retriever(tmp_path, fake_encoder).search("pricing tiers", top_k=2)
+    assert [(hit["text"], hit["slides"]) for hit in hits] == [("pricing tiers", (3, 5)), ("intro agenda", (1, 2))]
+
+
+def test_snapshot_survives_index_swap(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.create_index(["old deck content"])
+    before = retriever.snapshot()
+
+    retriever.create_index(["new deck content", "more new content"])
+
+    # An in-flight query holding the old snapshot still sees a consistent index/chunks pair
+    assert before.index.ntotal == len(before.chunks) == 1
+    assert retriever.snapshot().index.ntotal == 2
+
+
+def test_add_deck_only_encodes_that_deck(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.add_deck("a.pptx", ["apples and pears", "citrus fruit"])
+    encoded_before = fake_encoder.encoded
+
+    retriever.add_deck("b.pptx", ["rockets and satellites"])
+
+    assert fake_encoder.encoded - encoded_before == 1
+    assert retriever.list_decks() == {"a.pptx": 2, "b.pptx": 1}
+    hit = retriever.search("satellites", top_k=1)[0]
+    assert hit["deck"] == "b.pptx" and hit["text"] == "rockets and satellites"
+
+
+def test_reupload_replaces_deck_and_keeps_others(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    first_ids = retriever.add_deck("a.pptx", ["old apples"])
+    retriever.add_deck("b.pptx", ["rockets"])
+
+    new_ids = retriever.add_deck("a.pptx", ["fresh apples", "green apples"])
+
+    assert set(new_ids).isdisjoint(first_ids)
+    assert retriever.index.ntotal == 3
+    assert "old apples" not in retriever.chunks.values()
+    assert retriever.search("rockets", top_k=1)[0]["deck"] == "b.pptx"
+
+
+def test_deck_scoped_search(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.add_deck("Chapter 1.pptx", ["budget forecast", "hiring plan"])
+    retriever.add_deck("Chapter 2.pptx", ["budget review", "launch date"])
+    retriever.add_deck("Chapter 1.pptx", ["budget forecast v2", "office move"])
+
+    hits = retriever.search("budget", top_k=5, deck="Chapter 1.pptx")
+    assert {h["deck"] for h in hits} == {"Chapter 1.pptx"} and len(hits) == 2
+    assert hits[0]["text"] == "budget forecast v2"
+    # Same scores as the global index, which sees the other deck's chunk too
+    global_hits = {h["id"]: h["score"] for h in retriever.search("budget", top_k=4)}
+    assert all(abs(global_hits[h["id"]] - h["score"]) < 1e-5 for h in hits)
+    assert retriever.search("budget", deck="missing.pptx") == []
+    assert [h["deck"] for h in retriever.lexical_search("budget", deck="Chapter 2.pptx")] == ["Chapter 2.pptx"]
+
+    assert retriever.find_deck("Chapter 2_embeddings.json") == "Chapter 2.pptx"
+    assert retriever.find_deck("Chapter 1.pptx") == "Chapter 1.pptx"
+    assert retriever.find_deck("Chapter 3_embeddings.json") is None
+
+
+def test_remove_deck(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.add_deck("a.pptx", ["apples"])
+    retriever.add_deck("b.pptx", ["rockets", "moons"])
+
+    assert retriever.remove_deck("b.pptx") == 2
+    assert retriever.remove_deck("missing.pptx") == 0
+    assert retriever.list_decks() == {"a.pptx": 1}
+    assert [hit["text"] for hit in retriever.search("rockets", top_k=5)] == ["apples"]
+
+
+def test_decks_are_encoded_outside_the_write_lock(tmp_path, fake_encoder):
+    retriever = make_retriever(tmp_path, fake_encoder)
+    retriever.add_deck("a.pptx", ["apples"])
+    blocked = []
+    encode = fake_encoder.encode
+
+    def encode_while_removing(texts, **kwargs):
+        # Another deck's write goes through while this deck is still being encoded
+        writer = threading.Thread(target=retriever.remove_deck, args=("a.pptx",))
+        writer.start()
+        writer.join(timeout=2)
+        blocked.append(writer.is_alive())
+        return encode(texts, **kwargs)
+
+    fake_encoder.encode = encode_while_removing
+    retriever.add_deck("b.pptx", ["rockets"])
+
+    assert blocked == [False]
+    assert retriever.list_decks() == {"b.pptx": 1}
+
+
+def test_legacy_index_is_upgraded(tmp_path, fake_encoder):
+    chunks = ["legacy one", "legacy two"]
+    index = faiss.IndexFlatL2(fake_encoder.dim)
+    index.add(np.asarray(fake_encoder.encode(chunks), dtype="float32"))
+    faiss.write_index(index, os.path.join(tmp_path, "faiss.index"))
+    with open(os.path.join(tmp_path, "faiss_chunks.pkl"), "wb") as f:
+        pickle.dump(chunks, f)
+
+    retriever = make_retriever(tmp_path, fake_encoder)
+
+    assert retriever.list_decks() == {DEFAULT_DECK: 2}
+    assert retriever.retrieve("legacy two", top_k=1) == ["legacy two"]
+
+
+def test_pickle_registry_is_converted_to_chunk_store(tmp_path, fake_encoder):
+    chunks = {3: "deck one intro", 4: "deck one pricing", 7: "deck two summary"}
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(fake_encoder.dim))
+    index.add_with_ids(np.asarray(fake_encoder.encode(list(chunks.values())), dtype="float32"),
+                       np.array(list(chunks), dtype="int64"))
+    faiss.write_index(index, os.path.join(tmp_path, "faiss.index"))
+    with open(os.path.join(tmp_path, "faiss_chunks.pkl"), "wb") as f:
+        pickle.dump({"chunks": chunks, "decks": {"one.pptx": [3, 4], "two.pptx": [7]}, "slides": {7: (5, 6)},
+                     "next_id": 8, "index_type": "flat", "trained_size": 0}, f)
+
+    retriever = make_retriever(tmp_path, fake_encoder)
+
+    assert not os.path.exists(os.path.join(tmp_path, "faiss_chunks.pkl"))
+    assert os.path.exists(os.path.join(tmp_path, "faiss_chunks.json"))
+    assert retriever.list_decks() == {"one.pptx": 2, "two.pptx": 1}
+    hit = make_retriever(tmp_path, fake_encoder).search("deck two summary", top_k=1)[0]
+    assert (hit["id"], hit["deck"], hit["slides"]) == (7, "two.pptx", (5, 6))
+    assert retriever.add_deck("three.pptx", ["new deck"]) == [8]
+
+
+def make_indexed_retriever(tmp_path, encoder, config, n_decks=5, per_deck=12):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                             chunk_path=os.path.join(tmp_path, "faiss_chunks.pkl"),
+                             model=encoder, config=config)
+    for d in range(n_decks):
+        retriever.add_deck(f"deck{d}.pptx", [f"deck{d} topic{c} slide text {d * per_deck + c}" for c in range(per_deck)])
+    return retriever
+
+
+def test_ivf_falls_back_to_flat_then_trains(tmp_path, fake_encoder):
+    config = IndexConfig(index_type="ivf_flat", nlist=4, nprobe=4, min_train_size=39, retrain_factor=2.0)
+    retriever = make_indexed_retriever(tmp_path, fake_encoder, config, n_decks=3)
+    assert retriever.snapshot().index_type == "flat"  # 36 vectors, below min_train_size
+
+    retriever.add_deck("deck3.pptx", ["deck3 topic0 extra slide", "deck3 topic1 extra slide", "deck3 topic2 more"])
+    snapshot = retriever.snapshot()
+    assert snapshot.index_type == "ivf_flat" and snapshot.trained_size == 39
+
+    for d in range(4, 8):
+        retriever.add_deck(f"deck{d}.pptx", [f"deck{d} topic{c} slide" for c in range(12)])
+    # Grew past retrain_factor * trained_size, so centroids were retrained on the larger corpus
+    assert retriever.snapshot().trained_size > 39
+    assert retriever.search("deck6 topic3 slide", top_k=1)[0]["deck"] == "deck6.pptx"
+
+
+def test_hnsw_supports_deck_removal(tmp_path, fake_encoder):
+    retriever = make_indexed_retriever(tmp_path, fake_encoder, IndexConfig(index_type="hnsw", hnsw_m=8))
+    assert retriever.snapshot().index_type == "hnsw"
+
+    retriever.remove_deck("deck2.pptx")
+
+    assert retriever.index.ntotal == 48
+    assert all(hit["deck"] != "deck2.pptx" for hit in retriever.search("deck2 topic1", top_k=10))
+
+
+def test_ivf_pq_and_search_params(tmp_path, fake_encoder):
+    config = IndexConfig(index_type="ivf_pq", nlist=2, pq_m=8, pq_nbits=4, min_train_size=16)
+    retriever = make_indexed_retriever(tmp_path, fake_encoder, config)
+    assert retriever.snapshot().index_type == "ivf_pq"
+
+    retriever.set_search_params(nprobe=2)
+
+    assert faiss.extract_index_ivf(retriever.index).nprobe == 2
+    assert len(retriever.search("deck1 topic4", top_k=5)) == 5
+
+
+def test_scalar_quantized_indexes_rerank_to_exact_scores(tmp_path, fake_encoder):
+    flat = make_indexed_retriever(tmp_path / "flat", fake_encoder, IndexConfig(index_type="flat"))
+    expected = [(hit["id"], round(hit["score"], 4)) for hit in flat.search("deck3 topic7 slide", top_k=5)]
+    for index_type, code_size in (("sq8", 64), ("sq_fp16", 128)):
+        config = IndexConfig(index_type=index_type, rerank=20)
+        retriever = make_indexed_retriever(tmp_path / index_type, fake_encoder, config)
+        assert retriever.snapshot().index_type == index_type
+        assert faiss.downcast_index(retriever.index.index).code_size == code_size
+
+        # Candidates from the codes are re-scored from the float32 vectors, matching the flat index
+        hits = retriever.search("deck3 topic7 slide", top_k=5)
+        assert [(hit["id"], round(hit["score"], 4)) for hit in hits] == expected
+        retriever.config.rerank = 0
+        assert retriever.search("deck3 topic7 slide", top_k=1)[0]["id"] == expected[0][0]
+
+
+def test_changing_index_type_rebuilds_on_load(tmp_path, fake_encoder):
+    make_indexed_retriever(tmp_path, fake_encoder, IndexConfig(index_type="flat"))
+
+    reloaded = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                            chunk_path=os.path.join(tmp_path, "faiss_chunks.pkl"),
+                            model=fake_encoder, config=IndexConfig(index_type="hnsw", hnsw_m=8))
+
+    assert reloaded.snapshot().index_type == "hnsw"
+    assert reloaded.index.ntotal == 60
+
+
+def test_mmap_index_supports_updates(tmp_path, fake_encoder):
+    for index_type in ("flat", "hnsw", "ivf_flat", "sq8"):
+        path = tmp_path / index_type
+        config = IndexConfig(index_type=index_type, nlist=4, min_train_size=10, mmap=True)
+        retriever = make_indexed_retriever(path, fake_encoder, config, n_decks=3)
+        retriever.remove_deck("deck1.pptx")
+        retriever.add_deck("deck0.pptx", ["deck0 replaced slide"])
+
+        reloaded = PPTRetriever(index_path=os.path.join(path, "faiss.index"),
+                                chunk_path=os.path.join(path, "faiss_chunks"), model=fake_encoder, config=config)
+        assert reloaded.list_decks() == {"deck0.pptx": 1, "deck2.pptx": 12}
+        assert reloaded.retrieve("deck0 replaced slide", top_k=1) == ["deck0 replaced slide"]
+
+
+def test_workers_sharing_an_index_see_each_others_writes(tmp_path, fake_encoder):
+    worker_a, worker_b = make_retriever(tmp_path, fake_encoder), make_retriever(tmp_path, fake_encoder)
+    worker_b.reload_interval = 0  # only reload when forced
+
+    worker_a.add_deck("a.pptx", ["alpha launch plan"])
+    assert worker_b.list_decks() == {}
+    assert worker_b.reload_if_changed(force=True)
+    assert worker_b.retrieve("alpha launch plan", top_k=1) == ["alpha launch plan"]
+    assert not worker_b.reload_if_changed(force=True)
+
+    # Writes start from the latest generation, so B does not drop A's new deck
+    worker_a.add_deck("c.pptx", ["gamma budget"])
+    worker_b.add_deck("b.pptx", ["beta hiring"])
+    assert worker_b.list_decks() == {"a.pptx": 1, "b.pptx": 1, "c.pptx": 1}
+    assert worker_a.reload_if_changed(force=True)
+    assert sorted(worker_a.chunks.values()) == ["alpha launch plan", "beta hiring", "gamma budget"]
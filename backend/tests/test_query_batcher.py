@@ -0,0 +1,64 @@
+import asyncio
+import os
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+
+
+def test_concurrent_queries_share_one_batch(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                             chunk_path=os.path.join(tmp_path, "faiss_chunks"), model=fake_encoder)
+    retriever.add_deck("a.pptx", ["apples and pears", "rockets and moons", "budget forecast"])
+
+    async def run():
+        batcher = QueryBatcher(retriever, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(batcher.retrieve("rockets", top_k=1),
+                                           batcher.retrieve("apples", top_k=2),
+                                           batcher.retrieve("budget", top_k=1))
+        finally:
+            await batcher.stop()
+        return results, batcher.stats()
+
+    calls_before = fake_encoder.calls
+    results, stats = asyncio.run(run())
+
+    assert results[0] == ["rockets and moons"]
+    assert results[1][0] == "apples and pears" and len(results[1]) == 2
+    assert results[2] == ["budget forecast"]
+    assert stats["batches"] == 1 and fake_encoder.calls - calls_before == 1
+
+
+def test_batches_are_split_by_deck_scope(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                             chunk_path=os.path.join(tmp_path, "faiss_chunks"), model=fake_encoder)
+    retriever.add_deck("a.pptx", ["rockets and moons"])
+    retriever.add_deck("b.pptx", ["rockets and stars"])
+
+    async def run():
+        batcher = QueryBatcher(retriever, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(batcher.retrieve("rockets", top_k=2),
+                                        batcher.retrieve("rockets", top_k=2, deck="a.pptx"),
+                                        batcher.retrieve("rockets", top_k=2, deck="b.pptx"))
+        finally:
+            await batcher.stop()
+
+    everywhere, only_a, only_b = asyncio.run(run())
+    assert len(everywhere) == 2 and only_a == ["rockets and moons"] and only_b == ["rockets and stars"]
+
+
+def test_errors_reach_every_caller(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"),
+                             chunk_path=os.path.join(tmp_path, "faiss_chunks"), model=fake_encoder)
+
+    async def run():
+        batcher = QueryBatcher(retriever, max_wait_ms=1)
+        await batcher.start()
+        try:
+            return await asyncio.gather(batcher.retrieve("a"), batcher.retrieve("b"), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(run()))
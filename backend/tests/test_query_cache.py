@@ -0,0 +1,127 @@
+import asyncio
+import os
+from app.services import query_cache as query_cache_module
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.query_cache import (
+    QueryCache, MemoryCacheBackend, SQLiteCacheBackend, normalize_query, create_query_cache, generation_is_older
+)
+
+
+def test_normalized_queries_share_an_entry():
+    cache = QueryCache(MemoryCacheBackend(10, 1 << 20), ttl_seconds=60)
+    assert normalize_query("  What is the  Q3 budget?? ") == "what is the q3 budget"
+
+    cache.put("What is the Q3 budget?", {"deck": None}, [{"text": "42"}], generation=1)
+    assert cache.get("what is the q3 budget", {"deck": None}, generation=1) == [{"text": "42"}]
+    assert cache.get("what is the q3 budget", {"deck": "a.pptx"}, generation=1) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1 and cache.stats()["hit_rate"] == 0.5
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = QueryCache(MemoryCacheBackend(max_entries=2, max_bytes=1 << 20), ttl_seconds=60)
+    cache.put("a", None, "A")
+    cache.put("b", None, "B")
+    cache.get("a", None)
+    cache.put("c", None, "C")
+    assert cache.get("b", None) is None and cache.get("a", None) == "A"
+
+    small = QueryCache(MemoryCacheBackend(max_entries=100, max_bytes=200), ttl_seconds=60)
+    for n in range(5):
+        small.put(f"q{n}", None, "x" * 50)
+    stats = small.stats()
+    assert stats["bytes"] <= 200 and stats["entries"] == 2 and stats["evictions"] == 3
+
+    # The byte budget counts UTF-8 bytes: 80 two-byte characters take 160
+    accented = MemoryCacheBackend(max_entries=100, max_bytes=200)
+    for n in range(2):
+        accented.put(f"q{n}", "é" * 80, "", float("inf"))
+    assert accented.size() == (1, 162)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache_module.time, "time", lambda: now[0])
+    cache = QueryCache(MemoryCacheBackend(10, 1 << 20), ttl_seconds=30)
+    cache.put("q", None, "answer")
+    now[0] += 29
+    assert cache.get("q", None) == "answer"
+    now[0] += 2
+    assert cache.get("q", None) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_new_generation_drops_older_entries():
+    cache = QueryCache(MemoryCacheBackend(10, 1 << 20), ttl_seconds=60)
+    cache.put("q", None, "old", generation=1)
+    cache.put("gemini", {"context": "abc"}, "answer")
+    assert cache.get("q", None, generation=2) is None
+    # Generation-independent entries survive
+    assert cache.stats()["entries"] == 1 and cache.stats()["invalidations"] == 1
+    assert cache.get("gemini", {"context": "abc"}) == "answer"
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    db_path = os.path.join(tmp_path, "cache.sqlite3")
+    worker1 = create_query_cache("sqlite", max_entries=2, max_mb=1, ttl_seconds=60, db_path=db_path)
+    worker2 = QueryCache(SQLiteCacheBackend(db_path, 2, 1 << 20), ttl_seconds=60)
+
+    worker1.put("q1", {"top_k": 3}, [{"text": "one"}], generation=5)
+    assert worker2.get("Q1?", {"top_k": 3}, generation=5) == [{"text": "one"}]
+    worker2.put("q2", None, "two", generation=5)
+    worker1.get("q1", {"top_k": 3}, generation=5)
+    worker2.put("q3", None, "three", generation=5)
+    # q2 was the least recently used of the three
+    assert worker1.get("q2", None, generation=5) is None
+    assert worker1.stats()["entries"] == 2
+    worker1.close()
+    worker2.close()
+
+
+def test_lagging_worker_keeps_entries_of_newer_generations(tmp_path):
+    db_path = os.path.join(tmp_path, "cache.sqlite3")
+    reloaded = QueryCache(SQLiteCacheBackend(db_path, 10, 1 << 20), ttl_seconds=60)
+    lagging = QueryCache(SQLiteCacheBackend(db_path, 10, 1 << 20), ttl_seconds=60)
+
+    reloaded.put("q", None, "new", generation=6)
+    # The worker that has not reloaded yet does not drop the newer entry
+    lagging.put("q", None, "old", generation=5)
+    assert lagging.get("q", None, generation=5) == "old"
+    assert reloaded.get("q", None, generation=6) == "new"
+    # Once it reloads too, its own older entries go
+    assert lagging.get("q", None, generation=6) == "new"
+    assert lagging.stats()["entries"] == 1 and lagging.stats()["invalidations"] == 1
+    reloaded.close()
+    lagging.close()
+
+
+def test_generation_order():
+    assert generation_is_older("3", "4") and not generation_is_older("4", "3")
+    assert generation_is_older("3.1.4", "3.2.4") and not generation_is_older("3.1.4", "2.2.4")
+    assert not generation_is_older("", "4") and not generation_is_older("3", "3.1")
+
+
+def test_hybrid_search_is_cached_until_the_index_changes(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    retriever.add_deck("a.pptx", ["budget forecast", "hiring plan"])
+    cache = QueryCache(MemoryCacheBackend(100, 1 << 20), ttl_seconds=60)
+
+    async def run():
+        batcher = QueryBatcher(retriever, max_wait_ms=1)
+        await batcher.start()
+        hybrid = HybridRetriever(batcher, cache=cache)
+        try:
+            first = await hybrid.search("budget", top_k=1, mode="dense")
+            second = await hybrid.search("Budget?", top_k=1, mode="dense")
+            await asyncio.get_running_loop().run_in_executor(None, retriever.add_deck, "b.pptx", ["budget review"])
+            third = await hybrid.search("budget", top_k=1, mode="dense")
+            return first, second, third
+        finally:
+            await batcher.stop()
+
+    (hits1, timings1), (hits2, timings2), (hits3, timings3) = asyncio.run(run())
+    assert timings1["cache"]["hit"] is False and "dense" in timings1
+    assert timings2["cache"]["hit"] is True and "dense" not in timings2
+    assert hits2[0]["text"] == hits1[0]["text"] == "budget forecast"
+    assert timings3["cache"]["hit"] is False and cache.stats()["invalidations"] == 1
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import re
+import time
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.ppt_retriever import PPTRetriever
+from app.services.query_batcher import QueryBatcher
+from app.services.reranker import Reranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the share of question words in the chunk; records every pair it scores."""
+
+    def __init__(self, pair_seconds=0.0):
+        self.pair_seconds = pair_seconds
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs.extend(pairs)
+        time.sleep(self.pair_seconds * len(pairs))
+        scores = []
+        for query, text in pairs:
+            words = set(re.findall(r"\w+", query.lower()))
+            scores.append(len(words & set(re.findall(r"\w+", text.lower()))) / len(words))
+        return scores
+
+
+def hits(texts):
+    return [{"id": n, "text": text, "deck": "a.pptx", "slides": (n + 1, n + 1), "score": -n}
+            for n, text in enumerate(texts)]
+
+
+def test_rerank_orders_by_cross_encoder_and_caches_scores():
+    model = FakeCrossEncoder()
+    reranker = Reranker(model=model, candidates=4, batch_size=2, budget_ms=1000)
+    candidates = hits(["team offsite agenda", "budget review", "the launch date moved to May", "launch risks",
+                       "appendix"])
+
+    ranked, info = reranker.rerank("When is the launch date?", candidates, top_k=3)
+
+    assert [hit["id"] for hit in ranked] == [2, 3, 0]
+    assert ranked[0]["rerank_score"] == 0.6 and ranked[0]["slides"] == (3, 3)
+    assert info["candidates"] == 4 and info["scored"] == 4 and info["cached"] == 0 and not info["truncated"]
+    # Same question (up to case and punctuation), same chunks: no pair is scored again
+    _, info = reranker.rerank("when is the launch date", candidates, top_k=3)
+    assert info["scored"] == 0 and info["cached"] == 4 and len(model.pairs) == 4
+
+
+def test_budget_leaves_lower_ranked_candidates_unscored():
+    model = FakeCrossEncoder(pair_seconds=0.01)
+    reranker = Reranker(model=model, candidates=20, batch_size=4, budget_ms=60)
+    candidates = hits([f"slide {n} notes" for n in range(19)] + ["launch date"])
+
+    ranked, info = reranker.rerank("launch date", candidates, top_k=20)
+
+    # Batches stop once the next one would overrun the budget; the best-retrieved were scored first
+    assert info["truncated"] and 4 <= info["scored"] < 20
+    assert [text for _, text in model.pairs] == [hit["text"] for hit in candidates[:info["scored"]]]
+    assert "rerank_score" not in ranked[-1] and ranked[-1]["id"] == 19
+
+
+def test_hybrid_retriever_reranks_a_wider_candidate_list(tmp_path, fake_encoder):
+    retriever = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    answer = "the launch date is May 4 after the board signs off on the quarterly plan and budget"
+    retriever.add_deck("a.pptx", [f"launch update {n}" for n in range(10)] + [answer])
+    reranker = Reranker(model=FakeCrossEncoder(), candidates=11, budget_ms=1000)
+
+    async def run(reranker):
+        batcher = QueryBatcher(retriever, max_wait_ms=1)
+        await batcher.start()
+        try:
+            return await HybridRetriever(batcher, reranker=reranker).search("launch date", top_k=1, mode="dense")
+        finally:
+            await batcher.stop()
+
+    # The long answer chunk is diluted in embedding space, so dense search alone ranks the short updates above it
+    assert asyncio.run(run(None))[0][0]["text"] != answer
+    reranked, timings = asyncio.run(run(reranker))
+    assert reranked[0]["text"] == answer
+    assert timings["rerank"]["candidates"] == 11 and timings["rerank"]["budget_ms"] == 1000
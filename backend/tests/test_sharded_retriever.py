@@ -0,0 +1,104 @@
+import os
+import pytest
+from app.services.ppt_retriever import PPTRetriever
+from app.services.sharded_retriever import ShardedRetriever, collapse_shards, shard_for, merge_top_k
+
+DECKS = {
+    "deck0.pptx": ["budget forecast for 2024", "hiring plan for engineering"],
+    "deck1.pptx": ["budget review meeting", "office move to Berlin"],
+    "deck2.pptx": ["launch date for the mobile app", "pricing tiers and discounts"],
+    "deck3.pptx": ["security audit findings", "customer churn analysis"],
+}
+
+
+def make_sharded(tmp_path, encoder, n_shards):
+    return ShardedRetriever(n_shards, index_dir=os.path.join(tmp_path, "shards"), model=encoder)
+
+
+def add_decks(retriever):
+    for deck, chunks in DECKS.items():
+        retriever.add_deck(deck, chunks)
+
+
+def test_merge_top_k_orders_hits_across_shards():
+    shard_hits = [[{"id": 0, "score": -0.5}, {"id": 2, "score": -2.0}], [], [{"id": 1, "score": -1.0}]]
+    assert [hit["id"] for hit in merge_top_k(shard_hits, 2)] == [0, 1]
+
+
+def test_sharded_search_matches_single_index(tmp_path, fake_encoder):
+    single = PPTRetriever(index_path=os.path.join(tmp_path, "single", "faiss.index"), model=fake_encoder)
+    sharded = make_sharded(tmp_path, fake_encoder, 3)
+    add_decks(single)
+    add_decks(sharded)
+
+    # Each deck is written to its home shard only
+    for deck in DECKS:
+        assert deck in sharded.shards[shard_for(deck, 3)].list_decks()
+    assert sharded.list_decks() == single.list_decks()
+    assert sum(shard["num_chunks"] for shard in sharded.stats()["shards"]) == 8
+
+    for query in ("budget", "launch pricing", "security churn"):
+        expected = single.search(query, top_k=4)
+        hits = sharded.search(query, top_k=4)
+        # Equal scores may come back in another order, so only the best hit's text is compared
+        assert [round(hit["score"], 5) for hit in hits] == [round(hit["score"], 5) for hit in expected]
+        assert hits[0]["text"] == expected[0]["text"]
+        assert len({hit["id"] for hit in hits}) == len(hits)
+    # BM25 statistics are per shard, so only the set of keyword hits is the same
+    assert {hit["text"] for hit in sharded.lexical_search("budget", top_k=5)} == \
+        {hit["text"] for hit in single.lexical_search("budget", top_k=5)}
+
+    scoped = sharded.search("budget", top_k=5, deck="deck1.pptx")
+    assert [hit["deck"] for hit in scoped] == ["deck1.pptx", "deck1.pptx"]
+    assert sharded.find_deck("deck2_embeddings.json") == "deck2.pptx"
+    sharded.close()
+
+
+def test_remove_deck_and_reload(tmp_path, fake_encoder):
+    sharded = make_sharded(tmp_path, fake_encoder, 2)
+    add_decks(sharded)
+    assert sharded.remove_deck("deck3.pptx") == 2 and sharded.remove_deck("deck3.pptx") == 0
+    sharded.close()
+
+    reloaded = make_sharded(tmp_path, fake_encoder, 2)
+    assert sorted(reloaded.list_decks()) == ["deck0.pptx", "deck1.pptx", "deck2.pptx"]
+    assert reloaded.search("office Berlin", top_k=1)[0]["text"] == "office move to Berlin"
+    reloaded.close()
+
+
+def test_resharding_and_migration_move_vectors_without_reencoding(tmp_path, fake_encoder):
+    legacy = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    add_decks(legacy)
+    encoded = fake_encoder.encoded
+
+    sharded = make_sharded(tmp_path, fake_encoder, 2)
+    sharded.migrate(legacy)
+    assert legacy.list_decks() == {} and len(sharded.list_decks()) == 4
+    sharded.close()
+
+    # Fewer shards: decks in retired or wrong shards move to their new home shard
+    resharded = make_sharded(tmp_path, fake_encoder, 3)
+    assert resharded.list_decks() == {deck: 2 for deck in DECKS}
+    for deck in DECKS:
+        assert list(resharded.shard_of(deck).list_decks()).count(deck) == 1
+    assert fake_encoder.encoded == encoded
+    assert resharded.search("churn", top_k=1)[0]["text"] == "customer churn analysis"
+    resharded.close()
+
+    # Back to one index: the shards' decks move into it rather than being left behind
+    single = PPTRetriever(index_path=os.path.join(tmp_path, "faiss.index"), model=fake_encoder)
+    encoded = fake_encoder.encoded
+    assert collapse_shards(single, os.path.join(tmp_path, "shards")) == 4
+    assert single.list_decks() == {deck: 2 for deck in DECKS} and fake_encoder.encoded == encoded
+    assert single.search("churn", top_k=1)[0]["text"] == "customer churn analysis"
+    emptied = make_sharded(tmp_path, fake_encoder, 3)
+    assert emptied.list_decks() == {}
+    emptied.close()
+
+
+def test_search_before_anything_is_indexed(tmp_path, fake_encoder):
+    sharded = make_sharded(tmp_path, fake_encoder, 2)
+    with pytest.raises(ValueError):
+        sharded.search("anything")
+    assert sharded.lexical_search("anything") == []
+    sharded.close()
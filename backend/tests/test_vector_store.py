@@ -1,5 +1,9 @@
 import os
+import json
+import numpy as np
 import pytest
+from app.services import vector_store
+from app.services.ppt_loader import SlideRecord, save_slide_records
 from app.services.vector_store import process_text_for_embeddings
 from app.config.settings import EXTRACTED_TEXT_DIR, EMBEDDINGS_DIR
 
@@ -27,3 +31,36 @@ def test_process_text_for_embeddings_creates_file():
 
     # Clean up test embeddings
     os.remove(output_path)
+
+
+def test_pending_texts_are_encoded_together_and_memory_mapped(tmp_path, monkeypatch, fake_encoder):
+    texts_dir, embeddings_dir = tmp_path / "texts", tmp_path / "embeddings"
+    texts_dir.mkdir(), embeddings_dir.mkdir()
+    monkeypatch.setattr(vector_store, "EXTRACTED_TEXT_DIR", str(texts_dir))
+    monkeypatch.setattr(vector_store, "EMBEDDINGS_DIR", str(embeddings_dir))
+    monkeypatch.setattr(vector_store, "LEXICAL_INDEX_PATH", str(embeddings_dir / "lexical"))
+    monkeypatch.setattr("app.services.ppt_loader.EXTRACTED_TEXT_DIR", str(texts_dir))
+    records = [SlideRecord("roadmap", 1, "Title 1", "placeholder", "title", "Roadmap"),
+               SlideRecord("roadmap", 2, "Content 2", "placeholder", "body", "Launch moves to May.")]
+    save_slide_records("roadmap.pptx", records)
+    (texts_dir / "roadmap.txt").write_text("Roadmap\nLaunch moves to May.", encoding="utf-8")
+    (texts_dir / "hiring.txt").write_text("Hiring plan\nTwo engineers join in June.", encoding="utf-8")
+    # Written before embeddings were real vectors; still readable
+    (embeddings_dir / "legacy_embeddings.json").write_text(json.dumps({"text": "Old deck.", "embedding": [79]}))
+    # A placeholder newer than its text is still re-encoded into the current format
+    (texts_dir / "budget.txt").write_text("Budget\nTravel is capped.", encoding="utf-8")
+    (embeddings_dir / "budget_embeddings.json").write_text(json.dumps({"text": "Budget", "embedding": [6]}))
+    os.utime(texts_dir / "budget.txt", (0, 0))
+
+    paths = vector_store.process_all_texts(model=fake_encoder)
+
+    assert sorted(paths) == ["budget", "hiring", "roadmap"] and fake_encoder.calls == 1
+    assert vector_store.load_embeddings("budget_embeddings.json")["format"] == vector_store.MANIFEST_FORMAT
+    roadmap = vector_store.load_embeddings("roadmap_embeddings.json")
+    assert isinstance(roadmap["embeddings"], np.memmap) and roadmap["embeddings"].dtype == np.float16
+    assert roadmap["embeddings"].shape == (1, 64) and roadmap["slides"] == [[1, 2]]
+    assert vector_store.embeddings_text(roadmap) == "Roadmap\nLaunch moves to May."
+    assert vector_store.embeddings_text(vector_store.load_embeddings("legacy_embeddings.json")) == "Old deck."
+    assert vector_store.rebuild_lexical_index() == 7
+    # Nothing changed since, so nothing is encoded again
+    assert vector_store.process_all_texts(model=fake_encoder) == {} and fake_encoder.calls == 1
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from fastapi.testclient import TestClient
+import pytest
+from app.main import app
+from app.services.worker_pool import WorkerPool, WorkerPoolFull
+from app.routes.dependencies import get_retriever, get_ingest_pool, get_ingestion_queue
+
+
+def test_pool_rejects_when_workers_and_queue_are_taken():
+    pool = WorkerPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(WorkerPoolFull):
+            await pool.run(lambda: None)
+        release.set()
+        await asyncio.gather(*running)
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(run()) == "ok"
+    assert pool.stats()["rejected"] == 1 and pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_route_returns_503_with_retry_after_when_pool_is_full():
+    pool = WorkerPool("ingest", max_workers=1, max_queue=0, retry_after=7)
+    pool._pending = pool.capacity  # simulate a pool busy with another deck
+    app.dependency_overrides[get_retriever] = lambda: type("Stub", (), {"remove_deck": lambda self, deck: 1})()
+    app.dependency_overrides[get_ingestion_queue] = lambda: object()
+    app.dependency_overrides[get_ingest_pool] = lambda: pool
+    try:
+        response = TestClient(app).delete("/api/upload/upload/ppt/deck.pptx")
+    finally:
+        app.dependency_overrides.clear()
+        pool.shutdown()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
@@ -59,6 +59,15 @@ async function loadEmbeddingsList(retries = 3, delayMs = 500) {
 				opt.textContent = f.replace('_embeddings.json', '');
 				embeddingsSelect.appendChild(opt);
 			});
+			// Indexed decks without an embeddings file of the same name
+			const listed = new Set(files.map(f => f.replace('_embeddings.json', '')));
+			(data.decks || []).forEach(deck => {
+				if (listed.has(deck.replace(/\.[^.]+$/, ''))) return;
+				const opt = document.createElement('option');
+				opt.value = deck;
+				opt.textContent = deck;
+				embeddingsSelect.appendChild(opt);
+			});
 			// If currentEmbeddingsFile is set, select it
 			if (currentEmbeddingsFile) {
 				embeddingsSelect.value = currentEmbeddingsFile;
@@ -88,7 +97,27 @@ messageInput.addEventListener('input', () => {
 	}, 900);
 });
 
-// Upload handling: POST /api/upload/upload/ppt (expects 'file')
+// Poll an ingestion job until it finishes, updating a single progress message
+async function waitForIngestion(jobId, intervalMs = 1000) {
+	const progressEl = document.createElement('div');
+	progressEl.className = 'message bot';
+	messages.appendChild(progressEl);
+	while (true) {
+		const res = await fetch(`/api/upload/upload/jobs/${jobId}`);
+		if (!res.ok) throw new Error(`HTTP ${res.status} ${res.statusText}`);
+		const job = await res.json();
+		const slides = job.slides_total ? ` (slide ${job.slides_done}/${job.slides_total})` : '';
+		progressEl.textContent = `Processing: ${job.stage}${slides} ${Math.round(job.progress * 100)}%`;
+		messages.scrollTop = messages.scrollHeight;
+		if (job.status === 'succeeded' || job.status === 'failed') {
+			progressEl.remove();
+			return job;
+		}
+		await new Promise(r => setTimeout(r, intervalMs));
+	}
+}
+
+// Upload handling: POST /api/upload/upload/ppt (expects 'file'), then poll the ingestion job
 async function uploadPpt() {
 	const file = fileInput.files[0];
 	if (!file) return;
@@ -114,17 +143,21 @@ async function uploadPpt() {
 		}
 
 		const data = await res.json();
-		const embPath = data.embeddings_path || '';
-		const embName = embPath ? embPath.split(/[\\/]/).pop() : '';
-		if (embName) {
-			currentEmbeddingsFile = embName;
-			fileNameSpan.textContent = `${file.name} → ${embName}`;
-			appendMessage(`Uploaded and processed. Embeddings: ${embName}`, 'bot');
-			await loadEmbeddingsList();
-			embeddingsSelect.value = embName;
+		fileNameSpan.textContent = file.name;
+		if (data.duplicate && data.status === 'succeeded') {
+			appendMessage(`${data.deck} is already indexed.`, 'bot');
 		} else {
-			fileNameSpan.textContent = file.name;
-			appendMessage('Uploaded but no embeddings were generated.', 'bot');
+			const job = await waitForIngestion(data.job_id);
+			if (job.status !== 'succeeded') {
+				appendMessage(`Processing failed: ${job.error || 'unknown error'}`, 'bot');
+				return;
+			}
+			const chunks = job.result ? job.result.num_chunks : 0;
+			appendMessage(`Uploaded and processed ${data.deck} (${chunks} chunks indexed).`, 'bot');
+		}
+		if (!currentEmbeddingsFile) {
+			currentEmbeddingsFile = 'ALL';
+			embeddingsSelect.value = 'ALL';
 		}
 	} catch (err) {
 		appendMessage(`Upload failed: ${err.message}`, 'bot');
@@ -138,7 +171,32 @@ embeddingsSelect.addEventListener('change', () => {
   currentEmbeddingsFile = embeddingsSelect.value;
 });
 
-// Chat handling: GET /api/chat/chat/?query=...&embeddings_file=...
+// Split a server-sent event stream into {event, data} objects as chunks arrive
+async function* readEvents(res) {
+	const reader = res.body.getReader();
+	const decoder = new TextDecoder();
+	let buffer = '';
+	while (true) {
+		const { value, done } = await reader.read();
+		if (done) break;
+		buffer += decoder.decode(value, { stream: true });
+		let end;
+		while ((end = buffer.indexOf('\n\n')) !== -1) {
+			const block = buffer.slice(0, end);
+			buffer = buffer.slice(end + 2);
+			let event = 'message';
+			const data = [];
+			block.split('\n').forEach(line => {
+				if (line.startsWith('event:')) event = line.slice(6).trim();
+				else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+			});
+			yield { event, data: data.length ? JSON.parse(data.join('\n')) : null };
+		}
+	}
+}
+
+// Chat handling: GET /api/chat/stream?query=...&embeddings_file=... (server-sent events);
+// the answer bubble fills in token by token as the model generates it
 async function sendChatMessage(text) {
 	if (!text) return;
 	if (!currentEmbeddingsFile) {
@@ -150,7 +208,7 @@ async function sendChatMessage(text) {
 
 	try {
 	const params = new URLSearchParams({ query: text, embeddings_file: currentEmbeddingsFile });
-	const res = await fetch(`/api/chat/?${params.toString()}`, { method: 'GET' });
+	const res = await fetch(`/api/chat/stream?${params.toString()}`, { method: 'GET', headers: { Accept: 'text/event-stream' } });
 		if (!res.ok) {
 			const payload = await res.json().catch(() => ({}));
 			const message = payload.detail || res.statusText || 'Chat request failed';
@@ -158,9 +216,24 @@ async function sendChatMessage(text) {
 			return;
 		}
 
-		const payload = await res.json();
-		const answer = payload.answer || JSON.stringify(payload);
-		appendMessage(answer, 'bot');
+		let answerEl = null;
+		for await (const { event, data } of readEvents(res)) {
+			if (event === 'token') {
+				if (!answerEl) {
+					hideTyping();
+					answerEl = document.createElement('div');
+					answerEl.className = 'message bot';
+					messages.appendChild(answerEl);
+				}
+				answerEl.textContent += data.text;
+				messages.scrollTop = messages.scrollHeight;
+			} else if (event === 'done') {
+				console.log(`chat: first token after ${data.ttft_ms} ms, done after ${data.total_ms} ms`);
+			} else if (event === 'error') {
+				appendMessage(`Chat error: ${data.detail}`, 'bot');
+			}
+		}
+		if (!answerEl) appendMessage('No answer was generated.', 'bot');
 	} catch (err) {
 		appendMessage(`Chat failed: ${err.message}`, 'bot');
 	} finally {